@@ -0,0 +1,88 @@
+"""
+Compare how quickly exited children are reaped by each Process backend.
+
+Starts N children that all exit at the same wall clock deadline, and
+measures the time from that deadline until wait() returns for each of them,
+along with the peak number of threads used while waiting.
+
+    python benchmarks/reap.py --count 1000
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+
+from simpervisor.process import PidfdProcess, POSIXProcess
+
+BACKENDS = {
+    "posix": POSIXProcess,
+    "pidfd": PidfdProcess,
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(backend, count, delay):
+    process_class = BACKENDS[backend]
+    # Leave enough time for all children to start before the deadline
+    deadline = time.time() + delay
+    code = f"import time; time.sleep(max(0, {deadline} - time.time()))"
+
+    procs = [process_class(sys.executable, "-c", code) for _ in range(count)]
+    await asyncio.gather(*(p.start() for p in procs))
+    if time.time() > deadline:
+        raise RuntimeError(f"Starting {count} children took longer than {delay}s")
+
+    peak_threads = threading.active_count()
+    latencies = []
+
+    async def _wait(proc):
+        await proc.wait()
+        latencies.append(time.time() - deadline)
+
+    waiters = asyncio.gather(*(_wait(p) for p in procs))
+    while not waiters.done():
+        peak_threads = max(peak_threads, threading.active_count())
+        await asyncio.sleep(0.01)
+    await waiters
+
+    return {
+        "backend": backend,
+        "count": count,
+        "peak_threads": peak_threads,
+        "reap_latency_p50": percentile(latencies, 0.5),
+        "reap_latency_p99": percentile(latencies, 0.99),
+        "reap_latency_max": max(latencies),
+        "reap_latency_mean": statistics.mean(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=30,
+        help="Seconds after starting until all children exit",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, action="append")
+    args = parser.parse_args()
+
+    for backend in args.backend or BACKENDS:
+        if not BACKENDS[backend].is_supported():
+            print(json.dumps({"backend": backend, "skipped": "unsupported"}))
+            continue
+        result = asyncio.run(run(backend, args.count, args.delay))
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare how quickly children are started by each way of spawning them.
+
+Spawning gets slower as the parent grows: fork() has to copy its page
+tables, and close_fds=True has to close every fd it has open. To measure
+that, the parent first allocates (and touches) `--heap-mb` of memory and
+opens `--fds` sockets, then starts a short lived child N times in a row,
+and reports the time taken by start() & the spawn rate.
+
+    python benchmarks/spawn.py --count 500 --heap-mb 1024 --fds 5000
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import socket
+import time
+
+from simpervisor import EnvTemplate, SupervisedProcess
+from simpervisor.forkserver import ForkServerProcess
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+MODES = {
+    "default": {},
+    "fast": {"fast_spawn": True},
+    "fast_template": {"fast_spawn": True, "env": EnvTemplate(SPAWN_BENCH="1")},
+    "forkserver": {"process_class": ForkServerProcess},
+}
+
+
+async def run(mode, count, command):
+    # Start the same process over & over, like restarts do
+    proc = SupervisedProcess(mode, command, **MODES[mode])
+    # Once untimed, which also starts the fork server's helper
+    await proc.start()
+    await proc.proc.wait()
+    while proc.running:
+        await asyncio.sleep(0)
+    durations = []
+    started = time.perf_counter()
+    for _ in range(count):
+        start = time.perf_counter()
+        await proc.start()
+        durations.append(time.perf_counter() - start)
+        await proc.proc.wait()
+        # Let the supervisor notice the exit before starting again
+        while proc.running:
+            await asyncio.sleep(0)
+    await proc.terminate()
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "count": count,
+        "spawns_per_second": count / sum(durations),
+        "start_p50": percentile(durations, 0.5),
+        "start_p99": percentile(durations, 0.99),
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument(
+        "--heap-mb", type=int, default=512, help="Memory to allocate in the parent"
+    )
+    parser.add_argument(
+        "--fds", type=int, default=2000, help="Sockets to open in the parent"
+    )
+    parser.add_argument("--command", default="true", help="Command to spawn")
+    parser.add_argument("--mode", choices=MODES, action="append")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < args.fds + 100:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, args.fds + 100), hard))
+    heap = bytearray(args.heap_mb * 1024 * 1024)
+    # Touch every page, so they are really mapped
+    for i in range(0, len(heap), 4096):
+        heap[i] = 1
+    sockets = [socket.socket() for _ in range(args.fds)]
+
+    for mode in args.mode or MODES:
+        result = asyncio.run(run(mode, args.count, args.command))
+        result.update(heap_mb=args.heap_mb, fds=args.fds)
+        print(json.dumps(result), flush=True)
+
+    for sock in sockets:
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()
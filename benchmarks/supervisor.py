@@ -0,0 +1,246 @@
+"""
+Benchmark the supervisor's overhead when managing many processes.
+
+Scenarios:
+
+- spawn: start N processes concurrently
+- ready: p50/p99 time to ready for each readiness strategy
+- restart: restarts per second of N crash looping processes
+- reap: time from N processes exiting to their exit being noticed
+- terminate: time to terminate N running processes
+
+Each result is printed as a line of JSON, and optionally written to a file.
+
+    python benchmarks/supervisor.py --count 10 --count 100 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from simpervisor import (
+    ExponentialBackoff,
+    FixedInterval,
+    JitteredBackoff,
+    ProcessGroup,
+    RestartPolicy,
+    SupervisedProcess,
+)
+from simpervisor.forkserver import ForkServerProcess
+from simpervisor.process import PidfdProcess, WindowsProcess
+
+CHILD_SCRIPTS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "tests",
+    "child_scripts",
+)
+NOTIFIER = os.path.join(CHILD_SCRIPTS, "notifier.py")
+
+PROCESS_CLASSES = {
+    "default": None,
+    "pidfd": PidfdProcess,
+    "popen": WindowsProcess,
+    "forkserver": ForkServerProcess,
+}
+
+
+def sleep(seconds, retcode=0):
+    return [
+        sys.executable,
+        "-c",
+        f"import sys, time; time.sleep({seconds}); sys.exit({retcode})",
+    ]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(values):
+    return {
+        "p50": percentile(values, 0.5),
+        "p99": percentile(values, 0.99),
+        "max": max(values),
+    }
+
+
+def make_group(count, cmd, **kwargs):
+    group = ProcessGroup()
+    for i in range(count):
+        group.add(SupervisedProcess(f"bench-{i}", *cmd, **kwargs))
+    return group
+
+
+async def bench_spawn(count, process_class):
+    group = make_group(count, sleep(600), process_class=process_class)
+    start_time = time.perf_counter()
+    await group.start_all()
+    elapsed = time.perf_counter() - start_time
+    spawn_times = [p.metrics.spawn_seconds.sum for p in group]
+    await group.kill_all()
+    return {
+        "elapsed": elapsed,
+        "spawns_per_second": count / elapsed,
+        "spawn_seconds": summarize(spawn_times),
+    }
+
+
+async def _ready_times(count, process_class, ready_delay, make_ready_func, **kwargs):
+    group = make_group(
+        count,
+        [sys.executable, NOTIFIER, str(ready_delay)],
+        notify=True,
+        ready_timeout=60,
+        process_class=process_class,
+        **kwargs,
+    )
+    for process in group:
+        process.ready_func = make_ready_func(process)
+    await group.start_all()
+    try:
+        results = await asyncio.gather(*(p.ready() for p in group))
+        if not all(results):
+            raise RuntimeError("Not all processes became ready")
+        return [p.time_to_ready for p in group], [p.ready_probes for p in group]
+    finally:
+        await group.kill_all()
+
+
+async def bench_ready(count, process_class, ready_delay=1):
+    strategies = {
+        "exponential": ExponentialBackoff(),
+        "fixed": FixedInterval(0.05),
+        "jittered": JitteredBackoff(),
+    }
+    results = {}
+    for name, strategy in strategies.items():
+        # Poll the notify socket's state, so all strategies probe the same thing
+        times, probes = await _ready_times(
+            count,
+            process_class,
+            ready_delay,
+            lambda p: p.notify_socket.__call__,
+            ready_strategy=strategy,
+        )
+        results[name] = dict(summarize(times), probes=summarize(probes))
+
+    # No polling at all, ready() waits for READY=1
+    times, probes = await _ready_times(
+        count, process_class, ready_delay, lambda p: None
+    )
+    results["notify"] = dict(summarize(times), probes=summarize(probes))
+    return results
+
+
+async def bench_restart(count, process_class, duration=5):
+    group = make_group(
+        count,
+        sleep(0, retcode=1),
+        process_class=process_class,
+        restart_policy=RestartPolicy(
+            initial_delay=0, jitter=0, max_restarts=float("inf")
+        ),
+    )
+    await group.start_all()
+    await asyncio.sleep(duration)
+    restarts = sum(p.metrics.restarts for p in group)
+    await group.stop_all(grace_period=5)
+    return {"restarts": restarts, "restarts_per_second": restarts / duration}
+
+
+async def bench_reap(count, process_class, delay=None):
+    # Leave enough time for all children to start before they exit together
+    if delay is None:
+        delay = 1 + count / 50
+    deadline = time.time() + delay
+    code = f"import time; time.sleep(max(0, {deadline} - time.time()))"
+    latencies = []
+
+    def _on_exit(process, retcode):
+        latencies.append(time.time() - deadline)
+
+    group = make_group(
+        count,
+        [sys.executable, "-c", code],
+        process_class=process_class,
+        on_exit=_on_exit,
+    )
+    await group.start_all()
+    if time.time() > deadline:
+        raise RuntimeError(f"Starting {count} children took longer than {delay}s")
+    while len(latencies) < count:
+        await asyncio.sleep(0.01)
+    return summarize(latencies)
+
+
+async def bench_terminate(count, process_class):
+    group = make_group(count, sleep(600), process_class=process_class)
+    await group.start_all()
+    start_time = time.perf_counter()
+    await group.terminate_all()
+    return {"elapsed": time.perf_counter() - start_time}
+
+
+SCENARIOS = {
+    "spawn": bench_spawn,
+    "ready": bench_ready,
+    "restart": bench_restart,
+    "reap": bench_reap,
+    "terminate": bench_terminate,
+}
+
+
+async def run(scenarios, counts, process_class_name):
+    process_class = PROCESS_CLASSES[process_class_name]
+    results = []
+    for count in counts:
+        for scenario in scenarios:
+            result = {
+                "scenario": scenario,
+                "count": count,
+                "process_class": process_class_name,
+                "python": sys.version.split()[0],
+                "platform": sys.platform,
+            }
+            result.update(await SCENARIOS[scenario](count, process_class))
+            print(json.dumps(result), flush=True)
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--count",
+        type=int,
+        action="append",
+        help="Number of processes, can be given multiple times (default 10, 100, 1000)",
+    )
+    parser.add_argument(
+        "--scenario",
+        choices=SCENARIOS,
+        action="append",
+        help="Scenario to run, can be given multiple times (default all)",
+    )
+    parser.add_argument("--process-class", choices=PROCESS_CLASSES, default="default")
+    parser.add_argument("--output", help="Write all results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        run(
+            args.scenario or list(SCENARIOS),
+            args.count or [10, 100, 1000],
+            args.process_class,
+        )
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,45 @@
+import importlib
+
 from ._version import __version__  # noqa
-from .process import KilledProcessError, SupervisedProcess  # noqa
+
+# Public names, and the submodule each comes from. They are only imported
+# when first used, so importing a single submodule stays cheap. Child
+# processes importing atexitasync to install signal handlers don't have to
+# load everything else first.
+_exports = {
+    "SocketActivator": "activation",
+    "ProcessGroup": "group",
+    "IdlePolicy": "idle",
+    "LivenessCheck": "liveness",
+    "OutputCapture": "output",
+    "WarmPool": "pool",
+    "KilledProcessError": "process",
+    "StopResult": "process",
+    "SupervisedProcess": "process",
+    "ExponentialBackoff": "readiness",
+    "FixedInterval": "readiness",
+    "JitteredBackoff": "readiness",
+    "ReadyStrategy": "readiness",
+    "ResourceLimits": "resources",
+    "RestartPolicy": "restart",
+    "ResourceSampler": "sampler",
+    "RotatingFileSink": "sinks",
+    "EnvTemplate": "spawn",
+    "StateFile": "state",
+}
+
+__all__ = ["__version__", *_exports]
+
+
+def __getattr__(name):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    # Found directly from now on
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
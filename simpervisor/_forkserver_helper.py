@@ -0,0 +1,222 @@
+"""
+The helper process of simpervisor.forkserver.ForkServer
+
+Started once by the ForkServer with one end of a SOCK_SEQPACKET socket pair
+as its only argument, and starts child processes on its behalf. Runs as a
+script with nothing but the standard library, so it stays small & cheap to
+fork no matter how big the supervisor gets.
+
+Each request is a JSON message with the fds the child should get attached
+(SCM_RIGHTS). It is answered with the child's pid & a pidfd for it (where
+supported), or the error starting it. Children are reaped when SIGCHLD
+comes in, and their exit codes sent back as they exit. Exits once the
+other end of the socket is closed.
+"""
+
+import array
+import fcntl
+import json
+import os
+import re
+import resource
+import select
+import signal
+import socket
+import subprocess
+import sys
+
+# Big enough for a request with a large environment
+MAX_MESSAGE = 1 << 20
+MAX_FDS = 64
+# Requests start with their id, so it can be found even if they are cut off
+REQUEST_ID = re.compile(rb'\{"id": (\d+)')
+
+
+class RequestError(ValueError):
+    """
+    A request we couldn't read, answered with an error if it has an id
+    """
+
+    def __init__(self, request_id, message):
+        super().__init__(message)
+        self.request_id = request_id
+
+
+def recv_message(sock):
+    """
+    Receive a message & any fds sent with it.
+
+    Returns (None, []) once the other end has closed the socket. Raises
+    RequestError if the message or its fds didn't fit.
+    """
+    fds = array.array("i")
+    try:
+        data, ancdata, flags, _ = sock.recvmsg(
+            MAX_MESSAGE, socket.CMSG_SPACE(MAX_FDS * fds.itemsize)
+        )
+    except ConnectionResetError:
+        # Closed with answers of ours still unread
+        return None, []
+    for level, kind, cmsg_data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(cmsg_data[: len(cmsg_data) - (len(cmsg_data) % fds.itemsize)])
+    if not data:
+        return None, list(fds)
+    if flags & (socket.MSG_TRUNC | socket.MSG_CTRUNC):
+        for fd in fds:
+            os.close(fd)
+        match = REQUEST_ID.match(data)
+        raise RequestError(int(match.group(1)) if match else None, "Request too large")
+    return json.loads(data), list(fds)
+
+
+def send_message(sock, message, fds=()):
+    ancdata = []
+    if fds:
+        ancdata = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+    sock.sendmsg([json.dumps(message).encode()], ancdata)
+
+
+def send_error(sock, request_id, e):
+    send_message(
+        sock,
+        {
+            "id": request_id,
+            "error": type(e).__name__,
+            "errno": getattr(e, "errno", None),
+            "message": getattr(e, "strerror", None) or str(e),
+            "filename": getattr(e, "filename", None),
+        },
+    )
+
+
+def exit_code(status):
+    """
+    Turn a wait status into a returncode like subprocess's
+    """
+    # os.waitstatus_to_exitcode needs Python 3.9
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def reap(sock, children):
+    """
+    Reap every child that exited, & send back its exit code
+    """
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        proc = children.pop(pid, None)
+        if proc is None:
+            continue
+        # Reaped behind its back, so it mustn't try to reap the pid again
+        proc.returncode = exit_code(status)
+        send_message(sock, {"pid": pid, "returncode": proc.returncode})
+
+
+def move_fd(fd, lowest):
+    """
+    Move fd to the lowest free number >= lowest, returning the new number
+    """
+    new_fd = fcntl.fcntl(fd, fcntl.F_DUPFD_CLOEXEC, lowest)
+    os.close(fd)
+    return new_fd
+
+
+def spawn(request, fds, own_fds):
+    """
+    Start the child described by request, with the fds sent along with it
+    """
+    targets = request["pass_fds"]
+    # Move everything out of the way of the numbers the child expects its
+    # pass_fds at, so none are overwritten before they are dup'd
+    fds = [move_fd(fd, max(targets, default=2) + 1) for fd in fds]
+    to_close = list(fds)
+    try:
+        std = {}
+        for stream in ("stdin", "stdout", "stderr"):
+            if request[stream]:
+                std[stream] = fds.pop(0)
+        for fd, target in zip(fds, targets):
+            if target <= 2 or target in own_fds:
+                raise ValueError(f"Can't pass fd {target}")
+            os.dup2(fd, target, inheritable=False)
+            to_close.append(target)
+        return subprocess.Popen(
+            request["args"],
+            env=request["env"],
+            cwd=request["cwd"],
+            start_new_session=request["start_new_session"],
+            pass_fds=targets,
+            **std,
+        )
+    finally:
+        for fd in to_close:
+            os.close(fd)
+
+
+def main(fd):
+    # Keep our own fds far above those children usually get passed at
+    soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit == resource.RLIM_INFINITY:
+        soft_limit = 65536
+    high = max(3, min(soft_limit, 65536) - 8)
+    sock = socket.socket(fileno=move_fd(fd, high))
+    # Children get default handlers back when they exec. We only exit when
+    # the supervisor closes its end, so it is in charge of stopping them.
+    signal.signal(signal.SIGINT, lambda signum, frame: None)
+    signal.signal(signal.SIGTERM, lambda signum, frame: None)
+    # Wake up poll() for each SIGCHLD
+    wakeup_read, wakeup_write = (move_fd(fd, high) for fd in os.pipe())
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    own_fds = {sock.fileno(), wakeup_read, wakeup_write}
+
+    # Unlike epoll, poll doesn't need an fd of its own
+    poller = select.poll()
+    poller.register(sock, select.POLLIN)
+    poller.register(wakeup_read, select.POLLIN)
+    children = {}
+    while True:
+        for ready_fd, _ in poller.poll():
+            if ready_fd == sock.fileno():
+                try:
+                    request, fds = recv_message(sock)
+                except RequestError as e:
+                    if e.request_id is not None:
+                        send_error(sock, e.request_id, e)
+                    continue
+                if request is None:
+                    return
+                try:
+                    proc = spawn(request, fds, own_fds)
+                except Exception as e:
+                    send_error(sock, request["id"], e)
+                    continue
+                children[proc.pid] = proc
+                pidfds = []
+                if hasattr(os, "pidfd_open"):
+                    try:
+                        pidfds.append(os.pidfd_open(proc.pid))
+                    except OSError:
+                        pass
+                send_message(sock, {"id": request["id"], "pid": proc.pid}, pidfds)
+                for pidfd in pidfds:
+                    os.close(pidfd)
+            else:
+                os.read(wakeup_read, 4096)
+                reap(sock, children)
+
+
+if __name__ == "__main__":
+    try:
+        main(int(sys.argv[1]))
+    except (BrokenPipeError, ConnectionResetError):
+        # The supervisor has gone away
+        pass
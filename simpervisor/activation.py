@@ -0,0 +1,78 @@
+"""
+Start supervised processes when the first connection to them comes in
+"""
+
+import asyncio
+
+
+class SocketActivator:
+    """
+    Start a SupervisedProcess on the first connection to its socket.
+
+    The process must be created with `listen_socket=True`. activate() binds
+    its listening socket right away, so clients can connect before the
+    process has even been started. Their connections wait in the kernel's
+    accept backlog until the process accepts them, so none are refused or
+    lost while it starts up. With `lazy=False`, the process is started right
+    away instead of on the first connection. Processes stopped by their
+    IdlePolicy are started again on the next connection.
+    """
+
+    def __init__(self, process, lazy=True):
+        if not process.listen_socket:
+            raise ValueError("Socket activated processes need listen_socket=True")
+        self.process = process
+        process.activator = self
+        self.lazy = lazy
+        self._watching = None
+        self._start_future = None
+        self._activated = asyncio.Event()
+
+    @property
+    def port(self):
+        return self.process.port
+
+    def activate(self):
+        """
+        Bind the listening socket, and start the process once it is needed.
+
+        Returns the port the process will listen on.
+        """
+        process = self.process
+        process._allocate_port()
+        if not self.lazy:
+            self._start()
+        elif not process.running and self._watching is None:
+            # Listening sockets become readable when a connection is waiting
+            # to be accepted
+            self._watching = process._listen_sock.fileno()
+            asyncio.get_running_loop().add_reader(self._watching, self._on_connection)
+        return process.port
+
+    def deactivate(self):
+        """
+        Stop waiting for connections. A running process is left running.
+        """
+        if self._watching is not None:
+            asyncio.get_running_loop().remove_reader(self._watching)
+            self._watching = None
+
+    def _on_connection(self):
+        # Leave the connection for the process to accept
+        self.deactivate()
+        self.process._debug_log(
+            "activated", "Starting {} on first connection", {}, self.process.name
+        )
+        self._start()
+
+    def _start(self):
+        if self._start_future is None or self._start_future.done():
+            self._start_future = asyncio.ensure_future(self.process.start())
+            self._activated.set()
+
+    async def wait_started(self):
+        """
+        Wait for the process to be started after it was activated
+        """
+        await self._activated.wait()
+        await asyncio.shield(self._start_future)
@@ -4,25 +4,53 @@ asyncio aware version of atexit.
 Handles SIGINT and SIGTERM, unlike atexit
 """
 
+import asyncio
+import inspect
 import signal
 import sys
 
-_handlers = []
+# Handlers are kept as keys of a dict, which gives us O(1) add & remove
+# while still calling them in the order they were added.
+_handlers = {}
 
 signal_handler_set = False
 
 
 def add_handler(handler):
+    """
+    Register `handler` to be called with the signal number on SIGINT / SIGTERM.
+
+    `handler` may be a plain function or a coroutine function. Coroutines
+    are scheduled together on the running event loop, and the process exits
+    only after all of them are done.
+    """
     global signal_handler_set
     if not signal_handler_set:
         signal.signal(signal.SIGINT, _handle_signal)
         signal.signal(signal.SIGTERM, _handle_signal)
         signal_handler_set = True
-    _handlers.append(handler)
+    _handlers[handler] = None
 
 
 def remove_handler(handler):
-    _handlers.remove(handler)
+    """
+    Unregister `handler`. Removing a handler that isn't registered is a noop.
+    """
+    _handlers.pop(handler, None)
+
+
+async def _gather(awaitables):
+    await asyncio.gather(*awaitables)
+
+
+def _exit(*args):
+    sys.exit(0)
+
+
+def _schedule(loop, awaitables):
+    # Exit from a plain callback rather than from inside the task, so the
+    # SystemExit propagates out of the loop without an unretrieved task error.
+    loop.create_task(_gather(awaitables)).add_done_callback(_exit)
 
 
 def _handle_signal(signum, *args):
@@ -30,6 +58,25 @@ def _handle_signal(signum, *args):
     # can used with subprocess.Popen.send_signal
     if signum == signal.SIGINT and sys.platform == "win32":
         signum = signal.CTRL_C_EVENT
-    for handler in _handlers:
-        handler(signum)
+
+    # Call every handler in a single pass over a snapshot of the registry,
+    # since handlers may remove themselves while we iterate.
+    awaitables = []
+    for handler in list(_handlers):
+        result = handler(signum)
+        if inspect.isawaitable(result):
+            awaitables.append(result)
+
+    if awaitables:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            # Don't block inside the signal frame, let the loop run the
+            # async cleanup & exit once it is done. The loop may be blocked
+            # waiting for IO, so we need the threadsafe variant to wake it up.
+            loop.call_soon_threadsafe(_schedule, loop, awaitables)
+            return
+        asyncio.run(_gather(awaitables))
     sys.exit(0)
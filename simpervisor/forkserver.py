@@ -0,0 +1,430 @@
+"""
+Start child processes from a small helper process, instead of forking ourselves
+"""
+
+import array
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import weakref
+
+from .poller import get_poller
+from .process import Process, _connect_read_pipe
+
+HELPER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "_forkserver_helper.py"
+)
+# Replies are small, the pidfd is the only fd sent with them
+MAX_REPLY = 4096
+# The most the helper can receive at once, see _forkserver_helper
+MAX_REQUEST = 1 << 20
+MAX_FDS = 64
+
+# One ForkServer per event loop, see get_forkserver()
+_forkservers = weakref.WeakKeyDictionary()
+
+
+class ForkServer:
+    """
+    A helper process that starts child processes for us.
+
+    Forking a process has to copy its page tables, which takes longer the
+    more memory it uses, and blocks the event loop meanwhile. The helper is
+    started once, with nothing but the standard library loaded, and starts
+    every child from then on. So after the first, spawns cost the same no
+    matter how big we get. Start it early with start(), while we are still
+    small.
+
+    Requests go to the helper over a Unix socket, along with the fds the
+    child should get. It answers with the child's pid & a pidfd for it,
+    reaps the child when it exits & sends back its exit code. If the helper
+    dies, children that were still running keep running, and are reported
+    as exited with `unknown_returncode` once they exit (right away without
+    pidfds). A new helper is started for the next child.
+    """
+
+    # Like AdoptedProcess, as we can't know how the children exited
+    unknown_returncode = 255
+    # Seconds a closed helper has to exit before it is killed
+    helper_exit_timeout = 5
+
+    def __init__(self, loop=None):
+        self.loop = loop or asyncio.get_running_loop()
+        self._helper = None
+        self._sock = None
+        self._next_id = 0
+        # Request id -> future for the helper's answer
+        self._spawns = {}
+        # Child pid -> (future for its exit code, pidfd or None)
+        self._exits = {}
+
+    @classmethod
+    def is_supported(cls):
+        """
+        Returns True if fds can be sent over Unix sockets here.
+        """
+        return sys.platform != "win32" and hasattr(socket, "SCM_RIGHTS")
+
+    @property
+    def pid(self):
+        """
+        The pid of the helper process, or None if it isn't running
+        """
+        if self._helper is not None:
+            return self._helper.pid
+
+    def start(self):
+        """
+        Start the helper process, if it isn't running yet
+        """
+        if self._sock is not None:
+            return
+        sock, helper_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self._helper = subprocess.Popen(
+                [sys.executable, "-S", HELPER, str(helper_sock.fileno())],
+                pass_fds=(helper_sock.fileno(),),
+            )
+        except BaseException:
+            sock.close()
+            raise
+        finally:
+            helper_sock.close()
+        sock.setblocking(False)
+        self._sock = sock
+        self.loop.add_reader(sock.fileno(), self._on_readable)
+
+    def close(self):
+        """
+        Stop the helper process. Children it started are left running.
+        """
+        if self._sock is None:
+            return
+        self.loop.remove_reader(self._sock.fileno())
+        # The helper exits once its end of the socket is closed
+        self._sock.close()
+        self._sock = None
+        self._on_helper_exit()
+
+    async def spawn(self, args, fds, pass_fds=(), **kwargs):
+        """
+        Start a child process with the helper.
+
+        `fds` has the fds for the child's stdin, stdout & stderr (or None to
+        inherit the helper's, which are ours), & `pass_fds` the fds the child
+        should get at the same numbers. `env`, `cwd` & `start_new_session`
+        are like for subprocess.Popen. The fds can be closed once this
+        returns.
+
+        Returns (pid, pidfd, exited), where pidfd is None if pidfds aren't
+        supported, and `exited` is a future for the child's exit code.
+        """
+        self.start()
+        request_id = self._next_id
+        self._next_id += 1
+        env = kwargs.get("env")
+        request = {
+            "id": request_id,
+            "args": [os.fsdecode(arg) for arg in args],
+            # Children inherit our environment as it is now, not as it was
+            # when the helper was started
+            "env": dict(os.environ if env is None else env),
+            "cwd": os.fsdecode(kwargs["cwd"]) if kwargs.get("cwd") else None,
+            "start_new_session": bool(kwargs.get("start_new_session")),
+            "pass_fds": list(pass_fds),
+        }
+        for stream, fd in zip(("stdin", "stdout", "stderr"), fds):
+            request[stream] = fd is not None
+        sent_fds = [fd for fd in fds if fd is not None] + list(pass_fds)
+        data = json.dumps(request).encode()
+        if len(data) > MAX_REQUEST or len(sent_fds) > MAX_FDS:
+            # The helper would only get part of it
+            raise ValueError("Request too large")
+
+        reply = self._spawns[request_id] = self.loop.create_future()
+        try:
+            await self._send(data, sent_fds)
+            reply, pidfd, exited = await reply
+        finally:
+            self._spawns.pop(request_id, None)
+        if "error" in reply:
+            if reply["errno"] is not None:
+                # Becomes the matching subclass, like FileNotFoundError
+                raise OSError(reply["errno"], reply["message"], reply["filename"])
+            raise ValueError(reply["message"])
+        return reply["pid"], pidfd, exited
+
+    async def _send(self, data, fds):
+        ancdata = []
+        if fds:
+            ancdata = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+        while True:
+            if self._sock is None:
+                raise ConnectionError("The fork server helper exited")
+            try:
+                self._sock.sendmsg([data], ancdata)
+                return
+            except BlockingIOError:
+                pass
+            # The helper hasn't caught up yet
+            writable = self.loop.create_future()
+            fd = self._sock.fileno()
+            self.loop.add_writer(
+                fd, lambda: writable.done() or writable.set_result(None)
+            )
+            try:
+                await writable
+            finally:
+                self.loop.remove_writer(fd)
+
+    def _on_readable(self):
+        while self._sock is not None:
+            fds = array.array("i")
+            try:
+                data, ancdata, _, _ = self._sock.recvmsg(
+                    MAX_REPLY,
+                    socket.CMSG_SPACE(fds.itemsize),
+                    getattr(socket, "MSG_CMSG_CLOEXEC", 0),
+                )
+            except BlockingIOError:
+                return
+            except OSError:
+                data, ancdata = b"", []
+            for level, kind, cmsg_data in ancdata:
+                if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                    fds.frombytes(
+                        cmsg_data[: len(cmsg_data) - (len(cmsg_data) % fds.itemsize)]
+                    )
+            if not data:
+                self.close()
+                return
+            self._on_message(json.loads(data), list(fds))
+
+    def _on_message(self, message, fds):
+        if "id" in message:
+            pidfd = fds[0] if fds else None
+            exited = None
+            if "pid" in message:
+                # The child may exit before spawn() gets to see this
+                exited = self.loop.create_future()
+                self._exits[message["pid"]] = (exited, pidfd)
+                if pidfd is not None:
+                    exited.add_done_callback(lambda f: os.close(pidfd))
+            reply = self._spawns.get(message["id"])
+            if reply is not None and not reply.done():
+                reply.set_result((message, pidfd, exited))
+        else:
+            exited, _ = self._exits.pop(message["pid"], (None, None))
+            if exited is not None and not exited.done():
+                exited.set_result(message["returncode"])
+
+    def _on_helper_exit(self):
+        for reply in self._spawns.values():
+            if not reply.done():
+                reply.set_exception(ConnectionError("The fork server helper exited"))
+        for exited, pidfd in self._exits.values():
+            if exited.done():
+                continue
+            if pidfd is None:
+                exited.set_result(self.unknown_returncode)
+            else:
+                # Its pidfd still tells us when it exits, just not how
+                self.loop.add_reader(pidfd, self._on_orphan_exit, exited, pidfd)
+        self._exits = {}
+        helper, self._helper = self._helper, None
+        if helper is not None and helper.poll() is None:
+            # It exits once its end of the socket is closed. Reap it with the
+            # shared Poller, without blocking the event loop meanwhile.
+            try:
+                poller = get_poller()
+            except RuntimeError:
+                # No running loop, subprocess reaps it once it is collected
+                return
+            poller.register(helper.poll)
+            self.loop.call_later(
+                self.helper_exit_timeout,
+                lambda: helper.poll() is None and helper.kill(),
+            )
+
+    def _on_orphan_exit(self, exited, pidfd):
+        self.loop.remove_reader(pidfd)
+        if not exited.done():
+            exited.set_result(self.unknown_returncode)
+
+
+def get_forkserver():
+    """
+    Return the ForkServer for the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    forkserver = _forkservers.get(loop)
+    if forkserver is None:
+        forkserver = _forkservers[loop] = ForkServer(loop)
+    return forkserver
+
+
+class ForkServerProcess(Process):
+    """
+    A process started by the event loop's ForkServer, instead of by forking us.
+
+    Pass as `process_class` to SupervisedProcess. stdin, stdout & stderr
+    may be PIPE, DEVNULL, STDOUT (for stderr), a file or an fd. stdout &
+    stderr pipes are exposed as asyncio StreamReaders, but stdin is a
+    regular file object. Besides those, `env`, `cwd`, `pass_fds` &
+    `start_new_session` are supported. All fds we don't pass are closed in
+    the child.
+    """
+
+    supported_kwargs = {
+        "stdin",
+        "stdout",
+        "stderr",
+        "env",
+        "cwd",
+        "pass_fds",
+        "start_new_session",
+        # Always closed, as the helper's fds are no use to the child
+        "close_fds",
+        "limit",
+    }
+
+    _pid = None
+    _pidfd = None
+    _exited = None
+
+    @classmethod
+    def is_supported(cls):
+        """
+        Returns True if a ForkServer can be used here.
+        """
+        return ForkServer.is_supported()
+
+    def _child_fds(self, kwargs):
+        """
+        Return the fds for the child's stdin, stdout & stderr.
+
+        Also returns our ends of any pipes, and fds to close once the child
+        has been started.
+        """
+        ours = {}
+        to_close = []
+        child_fds = []
+        for stream in ("stdin", "stdout", "stderr"):
+            spec = kwargs.get(stream)
+            if spec is None:
+                fd = None
+            elif spec == subprocess.PIPE:
+                read_fd, write_fd = os.pipe()
+                if stream == "stdin":
+                    fd, ours[stream] = read_fd, write_fd
+                else:
+                    fd, ours[stream] = write_fd, read_fd
+                to_close.append(fd)
+            elif spec == subprocess.DEVNULL:
+                fd = os.open(os.devnull, os.O_RDWR)
+                to_close.append(fd)
+            elif spec == subprocess.STDOUT and stream == "stderr":
+                fd = child_fds[1] if child_fds[1] is not None else 1
+            elif isinstance(spec, int):
+                fd = spec
+            else:
+                fd = spec.fileno()
+            child_fds.append(fd)
+        return child_fds, ours, to_close
+
+    async def start(self):
+        """
+        Start the process through the ForkServer
+        """
+        kwargs = dict(self._proc_kwargs)
+        unsupported = set(kwargs) - self.supported_kwargs
+        if unsupported:
+            raise ValueError(
+                f"{', '.join(sorted(unsupported))} can't be used with {type(self).__name__}"
+            )
+        limit = kwargs.pop("limit", 2**16)
+        child_fds, ours, to_close = self._child_fds(kwargs)
+        try:
+            self._pid, self._pidfd, self._exited = await get_forkserver().spawn(
+                self._proc_cmd,
+                child_fds,
+                pass_fds=tuple(kwargs.get("pass_fds", ())),
+                env=kwargs.get("env"),
+                cwd=kwargs.get("cwd"),
+                start_new_session=kwargs.get("start_new_session"),
+            )
+        except BaseException:
+            for fd in ours.values():
+                os.close(fd)
+            raise
+        finally:
+            for fd in to_close:
+                os.close(fd)
+
+        self._stdin = self._stdout = self._stderr = None
+        if "stdin" in ours:
+            self._stdin = open(ours["stdin"], "wb", buffering=0)
+        if "stdout" in ours:
+            self._stdout = await _connect_read_pipe(
+                open(ours["stdout"], "rb", 0), limit
+            )
+        if "stderr" in ours:
+            self._stderr = await _connect_read_pipe(
+                open(ours["stderr"], "rb", 0), limit
+            )
+
+    async def wait(self):
+        """
+        Wait for the process to stop and return the process exit code.
+        """
+        # Shield the shared future, so cancelled waiters don't cancel it
+        return await asyncio.shield(self._exited)
+
+    def get_kill_signal(self):
+        """
+        Returns the OS signal used for kill the child process.
+        """
+        return signal.SIGKILL
+
+    def send_signal(self, signum):
+        """
+        Send the OS signal to the process.
+
+        Uses the pidfd if we have one, so we can never signal another process
+        that reused the pid.
+        """
+        if self.returncode is not None:
+            raise ProcessLookupError(f"Process {self._pid} has exited")
+        if self._pidfd is not None:
+            # Closed by the ForkServer once the process has exited
+            signal.pidfd_send_signal(self._pidfd, signum)
+        else:
+            os.kill(self._pid, signum)
+
+    @property
+    def pid(self):
+        return self._pid
+
+    @property
+    def returncode(self):
+        if self._exited is not None and self._exited.done():
+            return self._exited.result()
+
+    @property
+    def stdin(self):
+        if self._pid is not None:
+            return self._stdin
+
+    @property
+    def stdout(self):
+        if self._pid is not None:
+            return self._stdout
+
+    @property
+    def stderr(self):
+        if self._pid is not None:
+            return self._stderr
@@ -0,0 +1,137 @@
+"""
+Manage many supervised processes together
+"""
+
+import asyncio
+
+from .atexitasync import add_handler, remove_handler
+
+
+class ProcessGroup:
+    """
+    A registry of SupervisedProcess instances, keyed by their name.
+
+    Processes added to a group share a single signal handler owned by the
+    group, instead of registering one handler each. Bulk operations run
+    concurrently, with at most `concurrency` of them in flight at once.
+    """
+
+    def __init__(self, concurrency=None):
+        # Maximum number of processes acted on at the same time by the bulk
+        # operations. None means no limit.
+        self.concurrency = concurrency
+        self._processes = {}
+        self._handler_registered = False
+
+    def add(self, process):
+        """
+        Add a SupervisedProcess to this group.
+
+        Process names must be unique within a group.
+        """
+        if process.name in self._processes:
+            raise ValueError(f"Process {process.name} is already in this group")
+        if process._group is not None:
+            raise ValueError(f"Process {process.name} is already in another group")
+        if process.running:
+            # The group's handler takes over from the process' own one
+            remove_handler(process._handle_signal)
+        process._group = self
+        self._processes[process.name] = process
+        if not self._handler_registered:
+            add_handler(self._handle_signal)
+            self._handler_registered = True
+        return process
+
+    def remove(self, name):
+        """
+        Remove the process called `name` from this group & return it.
+
+        The process is not stopped. If it is running, it goes back to
+        handling signals on its own.
+        """
+        process = self._processes.pop(name)
+        process._group = None
+        if process.running:
+            add_handler(process._handle_signal)
+        if not self._processes and self._handler_registered:
+            remove_handler(self._handle_signal)
+            self._handler_registered = False
+        return process
+
+    def get(self, name, default=None):
+        return self._processes.get(name, default)
+
+    def __getitem__(self, name):
+        return self._processes[name]
+
+    def __contains__(self, name):
+        return name in self._processes
+
+    def __iter__(self):
+        return iter(list(self._processes.values()))
+
+    def __len__(self):
+        return len(self._processes)
+
+    async def _run_all(self, method, processes, *args):
+        """
+        Await `method(*args)` on each of `processes`, limited by `concurrency`
+        """
+        if self.concurrency is None:
+            return await asyncio.gather(*(getattr(p, method)(*args) for p in processes))
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _run(process):
+            async with semaphore:
+                return await getattr(process, method)(*args)
+
+        return await asyncio.gather(*(_run(p) for p in processes))
+
+    async def start_all(self):
+        """
+        Start every process in the group that hasn't been explicitly killed.
+        """
+        await self._run_all("start", [p for p in self if not p._killed])
+
+    def _started(self):
+        """
+        Return the processes that were started & not explicitly killed yet.
+
+        Includes those that exited & are waiting to be restarted.
+        """
+        return [p for p in self if p.proc is not None and not p._killed]
+
+    async def terminate_all(self):
+        """
+        Send SIGTERM to every started process in the group & reap them.
+
+        Processes waiting to be restarted aren't restarted.
+        """
+        await self._run_all("terminate", self._started())
+
+    async def kill_all(self):
+        """
+        Send SIGKILL to every started process in the group & reap them.
+
+        Processes waiting to be restarted aren't restarted.
+        """
+        await self._run_all("kill", self._started())
+
+    async def stop_all(self, grace_period=None):
+        """
+        Stop every process in the group, see SupervisedProcess.stop().
+
+        Returns a dict mapping each process name to its StopResult.
+        """
+        processes = list(self)
+        results = await self._run_all("stop", processes, grace_period)
+        return {p.name: result for p, result in zip(processes, results)}
+
+    def _handle_signal(self, signum):
+        # One shared handler for all processes in the group, so a single
+        # signal doesn't fan out into one handler call per process.
+        for process in self:
+            if process.running:
+                process._handle_signal(signum)
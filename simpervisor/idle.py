@@ -0,0 +1,73 @@
+"""
+Idle policies, to stop supervised processes nobody is using
+"""
+
+import inspect
+
+from .procfs import count_connections, process_cpu_time
+
+
+class IdlePolicy:
+    """
+    Configuration for stopping a running process once it has been idle.
+
+    Every `interval` seconds (timeout / 10 by default), the process is
+    checked for activity. It is active if any of these are true:
+
+    - `activity_func(process)` (which may be a coroutine) returns a value
+      different from the last check. Return something that changes when the
+      process does work, like a request count or the time of the last
+      request.
+    - With `cpu_threshold` set, it used more than that many seconds of CPU
+      time since the last check, read from /proc/<pid>/stat.
+    - With `connections=True`, there are established TCP connections to its
+      allocated port, read from /proc/net/tcp.
+
+    After `timeout` seconds without activity, the process is stopped with
+    SupervisedProcess.stop(restartable=True), so start() can bring it back.
+    """
+
+    def __init__(
+        self,
+        timeout,
+        activity_func=None,
+        cpu_threshold=None,
+        connections=False,
+        interval=None,
+    ):
+        if activity_func is None and cpu_threshold is None and not connections:
+            raise ValueError(
+                "One of activity_func, cpu_threshold or connections must be given"
+            )
+        self.timeout = timeout
+        self.activity_func = activity_func
+        self.cpu_threshold = cpu_threshold
+        self.connections = connections
+        self.interval = interval if interval is not None else timeout / 10
+
+    async def check(self, process, state):
+        """
+        Return True if `process` was active since the last check.
+
+        `state` is a dict kept by the process between checks, and is empty
+        for the first check after it started.
+        """
+        active = False
+        if self.activity_func is not None:
+            value = self.activity_func(process)
+            if inspect.isawaitable(value):
+                value = await value
+            if "activity" in state and state["activity"] != value:
+                active = True
+            state["activity"] = value
+        if self.cpu_threshold is not None:
+            cpu_time = process_cpu_time(process.pid)
+            if cpu_time is not None:
+                last = state.get("cpu_time", cpu_time)
+                if cpu_time - last > self.cpu_threshold:
+                    active = True
+                state["cpu_time"] = cpu_time
+        if self.connections and process.port is not None:
+            if count_connections(process.port):
+                active = True
+        return active
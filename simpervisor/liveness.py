@@ -0,0 +1,59 @@
+"""
+Liveness checks, to find & restart supervised processes that are hung
+"""
+
+import asyncio
+import time
+
+
+class LivenessCheck:
+    """
+    Configuration for periodically checking a running process is alive.
+
+    Checks start once ready() succeeds. Every `interval` seconds, `func` is
+    awaited with the SupervisedProcess (just like ready_func), and must
+    return True within `timeout` seconds. With `watchdog=True`, the process
+    must instead have sent WATCHDOG=1 to its notify socket within the last
+    `interval` seconds.
+
+    After `failures` consecutive failed checks, the process is sent SIGTERM,
+    then its kill signal if it hasn't exited after `kill_timeout` seconds,
+    and is then restarted.
+    """
+
+    def __init__(
+        self,
+        func=None,
+        interval=10,
+        timeout=5,
+        failures=3,
+        kill_timeout=5,
+        watchdog=False,
+    ):
+        if func is None and not watchdog:
+            raise ValueError("Either func or watchdog=True must be given")
+        self.func = func
+        self.interval = interval
+        self.timeout = timeout
+        self.failures = failures
+        self.kill_timeout = kill_timeout
+        self.watchdog = watchdog
+
+    async def check(self, process, since):
+        """
+        Return True if `process` is alive.
+
+        `since` is the monotonic time monitoring started at, and counts as a
+        heartbeat for watchdog checks.
+        """
+        if self.watchdog:
+            notify_socket = process.notify_socket
+            last_heartbeat = max(since, notify_socket.last_watchdog or since)
+            if time.monotonic() - last_heartbeat > self.interval:
+                return False
+        if self.func is not None:
+            try:
+                return await asyncio.wait_for(self.func(process), self.timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
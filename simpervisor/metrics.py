@@ -0,0 +1,172 @@
+"""
+Dependency free metrics for supervised processes
+"""
+
+import bisect
+import time
+from collections import Counter
+
+# Default histogram buckets, in seconds
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+
+PROBE_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """
+    Count observed values in buckets with fixed upper bounds
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One more count for values above the largest bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        Yield (upper bound, count of values <= upper bound) pairs, ending
+        with an infinite upper bound
+        """
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class ProcessMetrics:
+    """
+    Metrics collected by a single SupervisedProcess
+    """
+
+    def __init__(self):
+        # How long Process.start() took
+        self.spawn_seconds = Histogram()
+        # How long successful ready() calls took, & how many probes they ran
+        self.ready_seconds = Histogram()
+        self.ready_probes = Histogram(PROBE_BUCKETS)
+        # How long we waited to acquire the process lock
+        self.lock_wait_seconds = Histogram()
+        self.starts = 0
+        self.restarts = 0
+        # Exit code -> number of times the process exited with it
+        self.exit_codes = Counter()
+        # Monotonic time the running process was started at
+        self.started_at = None
+        # CPU seconds & peak memory of exited children, and how many were
+        # killed for going over their memory limit. Only known for children
+        # in their own cgroup, see ResourceLimits.
+        self.cpu_seconds = 0
+        self.peak_memory = 0
+        self.oom_kills = 0
+
+    @property
+    def uptime(self):
+        """
+        Seconds the current process has been running for, or 0
+        """
+        if self.started_at is None:
+            return 0
+        return time.monotonic() - self.started_at
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def to_prometheus(processes, prefix="simpervisor"):
+    """
+    Return metrics of `processes` in the Prometheus text exposition format
+    """
+    processes = list(processes)
+    lines = []
+
+    def _family(name, type_, help_):
+        lines.append(f"# HELP {prefix}_{name} {help_}")
+        lines.append(f"# TYPE {prefix}_{name} {type_}")
+
+    histograms = [
+        ("spawn_seconds", "Time taken to spawn the process"),
+        ("ready_seconds", "Time taken for the process to become ready"),
+        ("ready_probes", "Number of probes run until the process was ready"),
+        ("lock_wait_seconds", "Time spent waiting for the process lock"),
+    ]
+    for name, help_ in histograms:
+        _family(name, "histogram", help_)
+        for process in processes:
+            label = f'process="{_escape(process.name)}"'
+            histogram = getattr(process.metrics, name)
+            for bound, count in histogram.cumulative():
+                lines.append(
+                    f'{prefix}_{name}_bucket{{{label},le="{_format_bound(bound)}"}} {count}'
+                )
+            lines.append(f"{prefix}_{name}_sum{{{label}}} {histogram.sum}")
+            lines.append(f"{prefix}_{name}_count{{{label}}} {histogram.count}")
+
+    counters = [
+        ("starts_total", "starts", "Number of times the process was started"),
+        ("restarts_total", "restarts", "Number of automatic restarts"),
+        (
+            "oom_kills_total",
+            "oom_kills",
+            "Number of times the process ran out of memory",
+        ),
+    ]
+    for name, attr, help_ in counters:
+        _family(name, "counter", help_)
+        for process in processes:
+            label = f'process="{_escape(process.name)}"'
+            lines.append(f"{prefix}_{name}{{{label}}} {getattr(process.metrics, attr)}")
+
+    _family("exits_total", "counter", "Number of process exits by exit code")
+    for process in processes:
+        label = f'process="{_escape(process.name)}"'
+        for code, count in sorted(process.metrics.exit_codes.items()):
+            lines.append(f'{prefix}_exits_total{{{label},code="{code}"}} {count}')
+
+    _family("cpu_seconds_total", "counter", "CPU time used by the process")
+    for process in processes:
+        label = f'process="{_escape(process.name)}"'
+        lines.append(f"{prefix}_cpu_seconds_total{{{label}}} {process.cpu_seconds}")
+
+    _family("memory_peak_bytes", "gauge", "Most memory the process used at once")
+    for process in processes:
+        label = f'process="{_escape(process.name)}"'
+        lines.append(f"{prefix}_memory_peak_bytes{{{label}}} {process.peak_memory}")
+
+    _family("up", "gauge", "Whether the process is running")
+    for process in processes:
+        label = f'process="{_escape(process.name)}"'
+        lines.append(f"{prefix}_up{{{label}}} {int(process.running)}")
+
+    _family("uptime_seconds", "gauge", "Seconds the process has been running")
+    for process in processes:
+        label = f'process="{_escape(process.name)}"'
+        lines.append(f"{prefix}_uptime_seconds{{{label}}} {process.metrics.uptime}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,194 @@
+"""
+sd_notify style readiness notification from child processes.
+
+Children find the address of our socket in the NOTIFY_SOCKET environment
+variable, and send newline separated KEY=VALUE datagrams to it, like
+READY=1 once they are ready. See `man sd_notify` for the protocol.
+"""
+
+import asyncio
+import os
+import secrets
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import time
+
+from .probes import Probe
+
+# pid, uid & gid of the sender, attached to each message with SO_PASSCRED
+CREDENTIALS = struct.Struct("3i")
+
+
+class NotifySocket(Probe):
+    """
+    A Unix datagram socket a single child process reports its state to.
+
+    Can be used as a ready_func, completing ready() as soon as the child
+    sends READY=1 without any polling.
+
+    Where the kernel tells us who sent a message (Linux), messages are only
+    accepted from the child given to watch(), from the MAINPID it reported,
+    or from processes in its process group (if it has one of its own), like
+    systemd does. Anyone could send to our abstract socket otherwise.
+    Elsewhere, the socket is in a directory only we can get to.
+    """
+
+    def __init__(self):
+        self.address = None
+        self._sock = None
+        self._tempdir = None
+        self._loop = None
+        self._waiters = []
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the state reported by the previous child
+        """
+        self.ready = False
+        self.stopping = False
+        self.status = None
+        self.main_pid = None
+        self.last_watchdog = None
+        self.pid = None
+        # (sender pid, data) of messages that came in before watch()
+        self._early = []
+
+    def watch(self, pid):
+        """
+        Accept messages from the child with `pid`, including any it sent
+        before we knew its pid
+        """
+        self.pid = pid
+        early, self._early = self._early, []
+        for sender, data in early:
+            self._handle_from(sender, data)
+
+    def open(self):
+        """
+        Create & bind the socket, and start listening for messages.
+
+        Uses an abstract socket on Linux, and a socket file in a private
+        temporary directory elsewhere.
+        """
+        if self._sock is not None:
+            return self.address
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            if sys.platform.startswith("linux"):
+                name = f"simpervisor-{os.getpid()}-{secrets.token_hex(8)}"
+                sock.bind("\0" + name)
+                # '@' marks abstract sockets in NOTIFY_SOCKET
+                self.address = "@" + name
+            else:
+                self._tempdir = tempfile.mkdtemp(prefix="simpervisor-")
+                self.address = os.path.join(self._tempdir, "notify")
+                sock.bind(self.address)
+            if hasattr(socket, "SO_PASSCRED"):
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_PASSCRED, 1)
+            sock.setblocking(False)
+        except BaseException:
+            sock.close()
+            raise
+
+        self._sock = sock
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._on_readable)
+        return self.address
+
+    def close(self):
+        """
+        Stop listening & clean up the socket
+        """
+        if self._sock is None:
+            return
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        if self._tempdir is not None:
+            shutil.rmtree(self._tempdir, ignore_errors=True)
+            self._tempdir = None
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(False)
+        self._waiters.clear()
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, ancdata, _, _ = self._sock.recvmsg(
+                    4096, socket.CMSG_SPACE(CREDENTIALS.size)
+                )
+            except (BlockingIOError, InterruptedError):
+                return
+            if not hasattr(socket, "SO_PASSCRED"):
+                self.handle_message(data)
+                continue
+            sender = None
+            for level, kind, cmsg_data in ancdata:
+                if (
+                    level == socket.SOL_SOCKET
+                    and kind == socket.SCM_CREDENTIALS
+                    and len(cmsg_data) >= CREDENTIALS.size
+                ):
+                    sender, _, _ = CREDENTIALS.unpack_from(cmsg_data)
+            if sender is not None:
+                self._handle_from(sender, data)
+
+    def _handle_from(self, sender, data):
+        if self.pid is None:
+            # The child may be quicker to talk than we are to learn its pid
+            self._early.append((sender, data))
+        elif self._accepts(sender):
+            self.handle_message(data)
+
+    def _accepts(self, sender):
+        """
+        Return True if `sender` is our child, or belongs to it
+        """
+        if sender in (self.pid, self.main_pid):
+            return True
+        try:
+            group = os.getpgid(self.pid)
+            # Sharing our own process group doesn't make a process the child's
+            return group != os.getpgrp() and os.getpgid(sender) == group
+        except OSError:
+            return False
+
+    def handle_message(self, data):
+        """
+        Update our state from a single datagram sent by the child
+        """
+        for line in data.split(b"\n"):
+            key, _, value = line.partition(b"=")
+            if key == b"READY" and value == b"1":
+                self.ready = True
+                for waiter in self._waiters:
+                    if not waiter.done():
+                        waiter.set_result(True)
+                self._waiters.clear()
+            elif key == b"STOPPING" and value == b"1":
+                self.stopping = True
+            elif key == b"STATUS":
+                self.status = value.decode(errors="replace")
+            elif key == b"MAINPID" and value.isdigit():
+                self.main_pid = int(value)
+            elif key == b"WATCHDOG" and value == b"1":
+                self.last_watchdog = time.monotonic()
+
+    async def __call__(self, process):
+        return self.ready
+
+    async def wait_ready(self, process):
+        """
+        Wait for the child to send READY=1
+        """
+        if self.ready:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        return await waiter
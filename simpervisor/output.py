@@ -0,0 +1,190 @@
+"""
+Capture output of supervised processes without ever blocking them
+"""
+
+import asyncio
+import inspect
+import logging
+
+log = logging.getLogger("simpervisor")
+
+
+class RingBuffer:
+    """
+    A fixed size buffer keeping the last `size` bytes written to it
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._buffer = bytearray(size)
+        self._pos = 0
+        self._full = False
+
+    def __len__(self):
+        return self.size if self._full else self._pos
+
+    def write(self, data):
+        data = memoryview(data)
+        if len(data) >= self.size:
+            # Only the tail of data fits
+            self._buffer[:] = data[-self.size :]
+            self._pos = 0
+            self._full = True
+            return
+
+        end = self._pos + len(data)
+        if end < self.size:
+            self._buffer[self._pos : end] = data
+            self._pos = end
+        else:
+            # Wrap around to the start of the buffer
+            first = self.size - self._pos
+            self._buffer[self._pos :] = data[:first]
+            self._buffer[: len(data) - first] = data[first:]
+            self._pos = len(data) - first
+            self._full = True
+
+    def getvalue(self):
+        """
+        Return the buffered bytes, oldest first
+        """
+        if not self._full:
+            return bytes(self._buffer[: self._pos])
+        return bytes(self._buffer[self._pos :] + self._buffer[: self._pos])
+
+    def clear(self):
+        self._pos = 0
+        self._full = False
+
+
+class OutputCapture:
+    """
+    Drain a process' stdout & stderr as soon as they are written.
+
+    The last `buffer_size` bytes of each stream are kept in a RingBuffer for
+    post-mortems, so memory use is fixed no matter how much a process
+    writes. Complete lines are passed to `line_callback(stream, line)`, which
+    may be a coroutine. While it runs, no more output is read, so a slow
+    callback eventually blocks the process writing to its pipe instead of
+    using more memory. Lines longer than `max_line_length` are split.
+    Exceptions raised by the callback or listeners are logged, and output
+    keeps being drained.
+
+    The same OutputCapture keeps collecting output across restarts.
+    """
+
+    def __init__(
+        self,
+        buffer_size=64 * 1024,
+        line_callback=None,
+        chunk_size=64 * 1024,
+        max_line_length=64 * 1024,
+    ):
+        self.buffer_size = buffer_size
+        self.line_callback = line_callback
+        self.chunk_size = chunk_size
+        self.max_line_length = max_line_length
+        self.buffers = {
+            "stdout": RingBuffer(buffer_size),
+            "stderr": RingBuffer(buffer_size),
+        }
+        # Called with (stream, data) for every chunk read
+        self._chunk_listeners = []
+        # Called with (stream, line) for every line read
+        self._line_listeners = []
+        # Pumps of all processes whose output is still being read, as the
+        # pipes of a process that was restarted may not be closed yet
+        self._tasks = set()
+
+    def add_chunk_listener(self, listener):
+        self._chunk_listeners.append(listener)
+
+    def remove_chunk_listener(self, listener):
+        self._chunk_listeners.remove(listener)
+
+    def add_line_listener(self, listener):
+        self._line_listeners.append(listener)
+
+    def remove_line_listener(self, listener):
+        self._line_listeners.remove(listener)
+
+    def getvalue(self, stream="stdout"):
+        """
+        Return the last buffer_size bytes written to `stream`
+        """
+        return self.buffers[stream].getvalue()
+
+    def attach(self, process):
+        """
+        Start draining the pipes of a freshly started Process
+        """
+        for stream in ("stdout", "stderr"):
+            reader = getattr(process, stream)
+            if reader is not None:
+                task = asyncio.ensure_future(self._pump(stream, reader))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def wait_closed(self):
+        """
+        Wait until the output of all attached processes has been read
+        """
+        await asyncio.gather(*self._tasks)
+
+    async def _pump(self, stream, reader):
+        buffer = self.buffers[stream]
+        # The start of a line whose newline hasn't been read yet
+        partial = bytearray()
+        while True:
+            data = await reader.read(self.chunk_size)
+            if not data:
+                break
+            buffer.write(data)
+            for listener in self._chunk_listeners:
+                try:
+                    listener(stream, data)
+                except Exception:
+                    log.exception(f"Output chunk listener {listener!r} failed")
+            if self.line_callback is not None or self._line_listeners:
+                await self._split_lines(stream, data, partial)
+
+        # Whatever is left didn't end with a newline, but is still a line
+        if partial:
+            await self._emit(stream, bytes(partial))
+
+    async def _split_lines(self, stream, data, partial):
+        start = 0
+        while True:
+            end = data.find(b"\n", start) + 1
+            if not end:
+                break
+            if partial:
+                partial += data[start:end]
+                line = bytes(partial)
+                partial.clear()
+            else:
+                line = data[start:end]
+            await self._emit(stream, line)
+            start = end
+
+        partial += data[start:]
+        while len(partial) >= self.max_line_length:
+            line = bytes(partial[: self.max_line_length])
+            del partial[: self.max_line_length]
+            await self._emit(stream, line)
+
+    async def _emit(self, stream, line):
+        # A failing callback mustn't stop the pipe being drained, or the
+        # process would eventually block writing to it
+        for listener in self._line_listeners:
+            try:
+                listener(stream, line)
+            except Exception:
+                log.exception(f"Output line listener {listener!r} failed")
+        if self.line_callback is not None:
+            try:
+                result = self.line_callback(stream, line)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                log.exception(f"Output line callback {self.line_callback!r} failed")
@@ -0,0 +1,101 @@
+"""
+A single event loop timer polling many processes for their exit
+"""
+
+import asyncio
+import weakref
+
+# One Poller per event loop, see get_poller()
+_pollers = weakref.WeakKeyDictionary()
+
+
+class Poller:
+    """
+    Wait for processes without a native async wait, by polling them.
+
+    All registered processes are polled in a single sweep, from a single
+    event loop timer, so N processes cost one wakeup instead of N. Sweeps
+    start `min_interval` seconds apart and back off by `factor` while
+    nothing exits, up to `max_interval`. Registering a process, an exit, or
+    a call to wake() (e.g. after sending a signal) resets the interval, as
+    more exits are then likely to follow soon.
+    """
+
+    def __init__(self, loop=None, min_interval=0.01, max_interval=0.5, factor=2):
+        self.loop = loop or asyncio.get_running_loop()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.interval = min_interval
+        # (poll function, future) pairs still waiting for an exit
+        self._waiters = []
+        self._timer = None
+
+    def __len__(self):
+        return len(self._waiters)
+
+    def register(self, poll):
+        """
+        Return a future resolving to the first non-None value `poll()` returns.
+
+        `poll` is usually subprocess.Popen.poll, returning the exit code once
+        the process has exited. It must not block. Cancel the future to stop
+        polling.
+        """
+        future = self.loop.create_future()
+        self._waiters.append((poll, future))
+        self.wake()
+        return future
+
+    def wake(self):
+        """
+        Poll again soon, as a process is expected to exit
+        """
+        self.interval = self.min_interval
+        if not self._waiters:
+            return
+        when = self.loop.time() + self.min_interval
+        if self._timer is not None:
+            if self._timer.when() <= when:
+                return
+            self._timer.cancel()
+        self._timer = self.loop.call_at(when, self._sweep)
+
+    def _sweep(self):
+        self._timer = None
+        waiting = []
+        exited = False
+        for poll, future in self._waiters:
+            if future.done():
+                # Cancelled by whoever was waiting
+                continue
+            try:
+                result = poll()
+            except Exception as e:
+                future.set_exception(e)
+                exited = True
+                continue
+            if result is None:
+                waiting.append((poll, future))
+            else:
+                future.set_result(result)
+                exited = True
+        self._waiters = waiting
+
+        if exited:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.factor, self.max_interval)
+        if self._waiters:
+            self._timer = self.loop.call_later(self.interval, self._sweep)
+
+
+def get_poller():
+    """
+    Return the Poller for the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    poller = _pollers.get(loop)
+    if poller is None:
+        poller = _pollers[loop] = Poller(loop)
+    return poller
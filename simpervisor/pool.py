@@ -0,0 +1,158 @@
+"""
+A pool of pre-started processes, handed out as soon as they are needed
+"""
+
+import asyncio
+import inspect
+
+from .process import SupervisedProcess
+
+
+class WarmPool:
+    """
+    Keep `size` ready instances of a command running, to hand out instantly.
+
+    Instances are SupervisedProcesses named `{name}-{n}`, created with `args`
+    & `kwargs` just like a SupervisedProcess. Pass `allocate_port=True` to
+    give each instance its own port.
+
+    acquire() hands out an instance that has already started & is ready, and
+    starts another one in the background to take its place. The caller then
+    owns the instance, and has to stop it. Settings only known at acquire
+    time can't be passed in the environment of an already running process,
+    so they are passed to `on_acquire(process, **params)` instead, which may
+    be a coroutine, to hand them over (over HTTP, a file, etc).
+    """
+
+    def __init__(self, name, *args, size=1, on_acquire=None, retry_delay=1, **kwargs):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.name = name
+        self.size = size
+        self.on_acquire = on_acquire
+        # Seconds to wait before retrying after an instance failed to start,
+        # doubling with each consecutive failure
+        self.retry_delay = retry_delay
+        self._args = args
+        self._kwargs = kwargs
+        self._counter = 0
+        self._failures = 0
+        self._ready = asyncio.Queue()
+        self._starting = set()
+        # acquire() calls waiting for an instance, woken up by close()
+        self._getters = set()
+        self._closed = False
+        # acquire() calls served by an instance that was already ready, and
+        # calls that had to wait for one to start
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """
+        Number of ready instances waiting to be acquired
+        """
+        return self._ready.qsize()
+
+    def _make_process(self):
+        self._counter += 1
+        return SupervisedProcess(
+            f"{self.name}-{self._counter}", *self._args, **self._kwargs
+        )
+
+    def start(self):
+        """
+        Start filling the pool in the background
+        """
+        self._closed = False
+        self._fill()
+
+    def _fill(self):
+        """
+        Start as many instances as the pool is missing
+        """
+        missing = self.size - self._ready.qsize() - len(self._starting)
+        for _ in range(missing):
+            task = asyncio.ensure_future(self._start_one())
+            self._starting.add(task)
+            task.add_done_callback(self._starting.discard)
+
+    async def _start_one(self):
+        if self._failures:
+            await asyncio.sleep(self.retry_delay * 2 ** (self._failures - 1))
+        process = self._make_process()
+        try:
+            await process.start()
+            ready = await process.ready()
+        except asyncio.CancelledError:
+            if process.proc is not None:
+                await process.stop()
+            raise
+        except Exception:
+            process.log.exception(f"Failed to start {process.name}")
+            ready = False
+        if not ready or self._closed:
+            # Nothing to stop if the spawn itself failed
+            if process.proc is not None:
+                await process.stop()
+            if not self._closed:
+                self._failures += 1
+                process.log.warning(f"{process.name} didn't become ready, retrying")
+                # Make room for our replacement
+                self._starting.discard(asyncio.current_task())
+                self._fill()
+            return
+        self._failures = 0
+        self._ready.put_nowait(process)
+
+    async def acquire(self, **params):
+        """
+        Return a ready SupervisedProcess, waiting for one if none are ready.
+
+        `params` are passed on to on_acquire. Raises RuntimeError if the
+        pool is closed, including while waiting.
+        """
+        if self._closed:
+            raise RuntimeError(f"Pool {self.name} is closed")
+        if self._ready.empty():
+            self.misses += 1
+        else:
+            self.hits += 1
+        while True:
+            # Make sure an instance is on its way for us, & for the next caller
+            self._fill()
+            getter = asyncio.ensure_future(self._ready.get())
+            self._getters.add(getter)
+            try:
+                process = await getter
+            except asyncio.CancelledError:
+                if self._closed:
+                    raise RuntimeError(f"Pool {self.name} is closed") from None
+                raise
+            finally:
+                self._getters.discard(getter)
+            if process.running:
+                break
+            # Exited while waiting in the pool
+            await process.stop()
+        self._fill()
+
+        if self.on_acquire is not None:
+            result = self.on_acquire(process, **params)
+            if inspect.isawaitable(result):
+                await result
+        return process
+
+    async def close(self):
+        """
+        Stop all instances that haven't been acquired
+        """
+        self._closed = True
+        for getter in list(self._getters):
+            getter.cancel()
+        for task in list(self._starting):
+            task.cancel()
+        await asyncio.gather(*self._starting, return_exceptions=True)
+        processes = []
+        while not self._ready.empty():
+            processes.append(self._ready.get_nowait())
+        await asyncio.gather(*(process.stop() for process in processes))
@@ -0,0 +1,124 @@
+"""
+Hand out free ports to supervised processes
+"""
+
+import errno
+import itertools
+import socket
+
+from .probes import Probe
+
+
+class PortAllocator:
+    """
+    Pick ports for supervised processes to listen on.
+
+    Ports handed out are tracked in a set until released, so processes
+    sharing a PortAllocator never get the same port, even if the first one
+    hasn't started listening yet. Ports are picked by the kernel, or from
+    `port_range` if given. Each port is checked by binding it, and with
+    `bind=True` that socket is kept listening, so a process can inherit it
+    & connections are queued until it accepts them.
+    """
+
+    def __init__(self, host="127.0.0.1", port_range=None, backlog=128):
+        self.host = host
+        self.port_range = port_range
+        self.backlog = backlog
+        self._in_use = set()
+        if port_range is not None:
+            # Keep going round the range, so released ports aren't reused
+            # right away
+            self._candidates = itertools.cycle(port_range)
+
+    def __contains__(self, port):
+        return port in self._in_use
+
+    def __len__(self):
+        return len(self._in_use)
+
+    def _bind(self, port):
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((self.host, port))
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def _try_ports(self):
+        if self.port_range is None:
+            # Let the kernel pick, skipping ports we've handed out that
+            # nothing listens on yet
+            for _ in range(100):
+                yield 0
+        else:
+            for _ in range(len(self.port_range)):
+                port = next(self._candidates)
+                if port not in self._in_use:
+                    yield port
+
+    def allocate(self, bind=False):
+        """
+        Return a (port, socket) tuple, with a free port marked as in use.
+
+        With `bind=True`, socket is a listening socket bound to the port,
+        which the caller must close. Otherwise it is None.
+        """
+        for port in self._try_ports():
+            try:
+                sock = self._bind(port)
+            except OSError as e:
+                if e.errno == errno.EADDRINUSE:
+                    continue
+                raise
+            port = sock.getsockname()[1]
+            if port in self._in_use:
+                sock.close()
+                continue
+            self._in_use.add(port)
+            if bind:
+                sock.listen(self.backlog)
+                return port, sock
+            sock.close()
+            return port, None
+        raise OSError(errno.EADDRINUSE, "No free ports left to allocate")
+
+    def listen(self, port):
+        """
+        Return a listening socket bound to `port`, which we already handed out
+        """
+        sock = self._bind(port)
+        sock.listen(self.backlog)
+        return sock
+
+    def reserve(self, port):
+        """
+        Mark `port` as in use, e.g. by a process we adopted
+        """
+        self._in_use.add(port)
+
+    def release(self, port):
+        """
+        Mark `port` as free again
+        """
+        self._in_use.discard(port)
+
+
+# Shared by all processes that don't bring their own allocator
+default_allocator = PortAllocator()
+
+
+class ListeningProbe(Probe):
+    """
+    Ready as soon as the process is running with its listening socket.
+
+    The socket was bound & listening before the process started, so the
+    kernel accepts connections & queues them until the process accepts
+    them. Used by default for processes given a listening socket.
+    """
+
+    async def __call__(self, process):
+        return process.running
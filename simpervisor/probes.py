@@ -0,0 +1,273 @@
+"""
+Reusable readiness probes, to be passed as SupervisedProcess' ready_func
+"""
+
+import asyncio
+import os
+import re
+import socket
+
+
+class Probe:
+    """
+    Abstract class for readiness probes.
+
+    Probes are awaited with the SupervisedProcess being checked, and return
+    True once it is ready. Probes that can find out on their own when the
+    process is ready also implement `wait_ready`, and ready() awaits that
+    instead of polling.
+    """
+
+    async def __call__(self, process):
+        raise NotImplementedError
+
+    def reset(self):
+        """
+        Forget anything seen of the previous process, before a new one starts
+        """
+
+    def close(self):
+        """
+        Release any resources held by the probe
+        """
+
+
+class TCPProbe(Probe):
+    """
+    Ready when a TCP connection to host:port succeeds
+    """
+
+    def __init__(self, port, host="127.0.0.1"):
+        self.host = host
+        self.port = int(port)
+        self._address = None
+
+    async def _connect(self):
+        loop = asyncio.get_running_loop()
+        if self._address is None:
+            # Resolve once, instead of on every probe
+            family, type_, proto, _, address = (
+                await loop.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)
+            )[0]
+            self._address = (family, type_, proto, address)
+        family, type_, proto, address = self._address
+        sock = socket.socket(family, type_, proto)
+        sock.setblocking(False)
+        try:
+            await loop.sock_connect(sock, address)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    async def __call__(self, process):
+        try:
+            sock = await self._connect()
+        except OSError:
+            return False
+        sock.close()
+        return True
+
+
+class UnixSocketProbe(Probe):
+    """
+    Ready when a connection to the Unix domain socket at path succeeds
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    async def __call__(self, process):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            await asyncio.get_running_loop().sock_connect(sock, self.path)
+        except OSError:
+            return False
+        finally:
+            sock.close()
+        return True
+
+
+class HTTPProbe(TCPProbe):
+    """
+    Ready when GET http://host:port/path returns a status in ok_status.
+
+    Speaks just enough HTTP/1.1 to do this, and keeps the connection alive
+    between probes when the server allows it.
+    """
+
+    # Give up on responses with headers larger than this
+    max_header_size = 65536
+
+    def __init__(self, port, host="127.0.0.1", path="/", ok_status=range(200, 400)):
+        super().__init__(port, host)
+        self.path = path
+        self.ok_status = ok_status
+        self._request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "User-Agent: simpervisor\r\n"
+            "\r\n"
+        ).encode()
+        self._buffer = bytearray(4096)
+        self._sock = None
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    async def _recv(self):
+        n = await asyncio.get_running_loop().sock_recv_into(self._sock, self._buffer)
+        if n == 0:
+            raise ConnectionResetError("Connection closed by server")
+        return memoryview(self._buffer)[:n]
+
+    async def _get_status(self):
+        loop = asyncio.get_running_loop()
+        await loop.sock_sendall(self._sock, self._request)
+
+        data = bytearray()
+        while b"\r\n\r\n" not in data:
+            data += await self._recv()
+            if len(data) > self.max_header_size:
+                raise ValueError("Response headers too large")
+        head, _, body = bytes(data).partition(b"\r\n\r\n")
+        status_line, *header_lines = head.split(b"\r\n")
+        version, status = status_line.split(None, 2)[:2]
+        headers = {}
+        for line in header_lines:
+            key, _, value = line.partition(b":")
+            headers[key.strip().lower()] = value.strip().lower()
+
+        keep_alive = version == b"HTTP/1.1" and headers.get(b"connection") != b"close"
+        if b"content-length" in headers:
+            # Drain the body, so the connection can be reused
+            remaining = int(headers[b"content-length"]) - len(body)
+            while remaining > 0:
+                remaining -= len(await self._recv())
+        else:
+            # Chunked or close-delimited bodies aren't worth parsing just to
+            # reuse the connection
+            keep_alive = False
+
+        if not keep_alive:
+            self.close()
+        return int(status)
+
+    async def __call__(self, process):
+        # Retry once if a kept-alive connection turns out to be stale
+        for _ in range(2):
+            reused = self._sock is not None
+            try:
+                if self._sock is None:
+                    self._sock = await self._connect()
+                status = await self._get_status()
+            except (OSError, ValueError):
+                self.close()
+                if reused:
+                    continue
+                return False
+            except BaseException:
+                # Cancelled halfway through a request, so the connection is
+                # in an unknown state
+                self.close()
+                raise
+            return status in self.ok_status
+        return False
+
+
+class FileProbe(Probe):
+    """
+    Ready when a file exists at path
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    async def __call__(self, process):
+        return os.path.exists(self.path)
+
+
+class LineProbe(Probe):
+    """
+    Ready when a line of the process' output matches pattern.
+
+    The process must either capture its output with an OutputCapture, or
+    be started with stdout (or stderr) set to asyncio.subprocess.PIPE. Lines
+    are read as they are written, so ready() completes as soon as the
+    matching line is printed without polling. Without an OutputCapture, the
+    rest of the output is read & thrown away once a line matched, so the
+    process never blocks writing to the pipe.
+    """
+
+    def __init__(self, pattern, stream="stdout"):
+        if isinstance(pattern, str):
+            pattern = pattern.encode()
+        self.pattern = re.compile(pattern)
+        self.stream = stream
+        self.matched = False
+        # Tasks reading pipes we are done with until they are closed
+        self._drains = set()
+
+    def feed_line(self, line):
+        """
+        Check a single line of output
+        """
+        if not self.matched and self.pattern.search(line):
+            self.matched = True
+
+    def reset(self):
+        self.matched = False
+
+    async def __call__(self, process):
+        return self.matched
+
+    async def wait_ready(self, process):
+        """
+        Read lines from the process until one matches
+        """
+        if getattr(process, "output", None) is not None:
+            return await self._wait_captured(process.output)
+
+        reader = getattr(process.proc, self.stream, None)
+        if reader is None:
+            raise ValueError(
+                f"LineProbe needs an OutputCapture, or {self.stream} set to "
+                "asyncio.subprocess.PIPE"
+            )
+        while not self.matched:
+            line = await reader.readline()
+            if not line:
+                # Process closed its output, so it won't ever be ready
+                return False
+            self.feed_line(line)
+        drain = asyncio.ensure_future(self._drain(reader))
+        self._drains.add(drain)
+        drain.add_done_callback(self._drains.discard)
+        return True
+
+    async def _drain(self, reader):
+        while await reader.read(64 * 1024):
+            pass
+
+    async def _wait_captured(self, output):
+        """
+        Watch lines as the OutputCapture reads them until one matches
+        """
+        matched = asyncio.get_running_loop().create_future()
+
+        def _listener(stream, line):
+            if stream == self.stream:
+                self.feed_line(line)
+                if self.matched and not matched.done():
+                    matched.set_result(True)
+
+        output.add_line_listener(_listener)
+        try:
+            if self.matched:
+                return True
+            return await matched
+        finally:
+            output.remove_line_listener(_listener)
@@ -3,13 +3,29 @@ Simple asynchronous process supervisor
 """
 
 import asyncio
+import enum
+import inspect
 import logging
+import os
+import re
+import shutil
 import signal
 import subprocess
 import sys
 import time
+from contextlib import asynccontextmanager
+from types import MappingProxyType
 
 from .atexitasync import add_handler, remove_handler
+from .metrics import ProcessMetrics
+from .notify import NotifySocket
+from .output import OutputCapture
+from .poller import get_poller
+from .ports import ListeningProbe, default_allocator
+from .procfs import process_cpu_time, process_peak_memory, process_start_time
+from .readiness import ExponentialBackoff
+from .spawn import EnvTemplate
+from .timers import get_shared_timer
 
 
 class KilledProcessError(Exception):
@@ -20,6 +36,19 @@ class KilledProcessError(Exception):
     """
 
 
+class StopResult(enum.Enum):
+    """
+    How a process exited when SupervisedProcess.stop() was called
+    """
+
+    # Exited within the grace period after being sent its stop signal
+    GRACEFUL = "graceful"
+    # Had to be sent its kill signal after the grace period
+    KILLED = "killed"
+    # Wasn't running, or had already been stopped
+    ALREADY_DEAD = "already-dead"
+
+
 class Process:
     """
     Abstract class to start, wait and send signals to running processes in a OS agnostic way
@@ -34,6 +63,13 @@ class Process:
         self._proc_cmd = cmd
         self._proc_kwargs = kwargs
 
+    @classmethod
+    def is_supported(cls):
+        """
+        Returns True if this kind of process can be used on this system.
+        """
+        return True
+
     async def start(self):
         """
         Start the process
@@ -69,6 +105,16 @@ class Process:
         if self._proc:
             return self._proc.returncode
 
+    @property
+    def stdout(self):
+        if self._proc:
+            return self._proc.stdout
+
+    @property
+    def stderr(self):
+        if self._proc:
+            return self._proc.stderr
+
 
 class POSIXProcess(Process):
     """
@@ -96,9 +142,106 @@ class POSIXProcess(Process):
         return signal.SIGKILL
 
 
+async def _connect_read_pipe(pipe, limit):
+    """
+    Wrap a readable pipe file object in an asyncio StreamReader
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=limit)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    return reader
+
+
+class PidfdProcess(POSIXProcess):
+    """
+    A process reaped through a pidfd watched by the event loop (Linux >= 5.3).
+
+    asyncio's child watchers use a thread per child or scan all children on
+    every SIGCHLD, depending on the Python version. A pidfd becomes readable
+    when its process exits, so each exit is a single event loop callback.
+
+    stdout & stderr pipes are exposed as asyncio StreamReaders, but stdin is
+    a regular file object.
+    """
+
+    _supported = None
+    _pidfd = None
+
+    @classmethod
+    def is_supported(cls):
+        """
+        Returns True if the kernel & Python support pidfds.
+        """
+        if cls._supported is None:
+            try:
+                os.close(os.pidfd_open(os.getpid()))
+                cls._supported = True
+            except (AttributeError, OSError):
+                cls._supported = False
+        return cls._supported
+
+    async def start(self):
+        """
+        Start the process using subprocess.Popen & watch its pidfd
+        """
+        loop = asyncio.get_running_loop()
+        kwargs = dict(self._proc_kwargs)
+        # Only meaningful for asyncio streams
+        limit = kwargs.pop("limit", 2**16)
+
+        self._proc = subprocess.Popen(list(self._proc_cmd), **kwargs)
+        self._exited = loop.create_future()
+        self._pidfd = os.pidfd_open(self._proc.pid)
+        loop.add_reader(self._pidfd, self._on_exit)
+
+        self._stdout = self._stderr = None
+        if self._proc.stdout is not None:
+            self._stdout = await _connect_read_pipe(self._proc.stdout, limit)
+        if self._proc.stderr is not None:
+            self._stderr = await _connect_read_pipe(self._proc.stderr, limit)
+
+    def _on_exit(self):
+        asyncio.get_running_loop().remove_reader(self._pidfd)
+        os.close(self._pidfd)
+        self._pidfd = None
+        # The process has exited, so this reaps it without blocking
+        self._exited.set_result(self._proc.wait())
+
+    async def wait(self):
+        """
+        Wait for the process to stop and return the process exit code.
+        """
+        # Shield the shared future, so cancelled waiters don't cancel it
+        return await asyncio.shield(self._exited)
+
+    def send_signal(self, signum):
+        """
+        Send the OS signal to the process.
+
+        Uses the pidfd while we have it, so we can never signal another
+        process that reused the pid.
+        """
+        if self._pidfd is not None:
+            signal.pidfd_send_signal(self._pidfd, signum)
+        elif self._proc.returncode is None:
+            self._proc.send_signal(signum)
+        else:
+            raise ProcessLookupError(f"Process {self._proc.pid} has exited")
+
+    @property
+    def stdout(self):
+        if self._proc:
+            return self._stdout
+
+    @property
+    def stderr(self):
+        if self._proc:
+            return self._stderr
+
+
 class WindowsProcess(Process):
     """
-    A process that uses subprocess API to start and wait (uses busy polling).
+    A process that uses subprocess API to start, and the shared Poller to wait.
     """
 
     async def start(self):
@@ -106,6 +249,7 @@ class WindowsProcess(Process):
         Starts the process using subprocess.Popen API
         """
         self._proc = subprocess.Popen(list(self._proc_cmd), **self._proc_kwargs)
+        self._poller = get_poller()
 
     async def wait(self):
         """
@@ -114,16 +258,22 @@ class WindowsProcess(Process):
         subprocess.Popen.wait() is a blocking call which can cause the asyncio
         event loop to remain blocked until the child process is terminated.
 
-        To circumvent this behavior, we use busy polling with asyncio.sleep to check
-        whether the child process is alive or not and keeping the asyncio event
-        loop running.
+        To circumvent this behavior, the process is polled by the event loop's
+        shared Poller, which checks all such processes in a single sweep.
 
         See https://github.com/jupyter/jupyter_client/blob/main/jupyter_client/provisioning/local_provisioner.py#L54_L55 for similar use.
         """
-        while self._proc.poll() is None:
-            await asyncio.sleep(0.5)
+        await self._poller.register(self._proc.poll)
         return self._proc.wait()
 
+    def send_signal(self, signum):
+        """
+        Send the OS signal to the process, and look out for its exit.
+        """
+        super().send_signal(signum)
+        if self._proc:
+            self._poller.wake()
+
     def get_kill_signal(self):
         """
         Returns the OS signal used for kill the child process.
@@ -135,6 +285,108 @@ class WindowsProcess(Process):
         return signal.SIGTERM
 
 
+class AdoptedProcess(Process):
+    """
+    A process started by an earlier supervisor, that we attach to by pid.
+
+    The process isn't our child, so its exit status can't be known, and is
+    reported as `unknown_returncode`. Exits are noticed through a pidfd on
+    Linux >= 5.3, and by polling /proc with the shared Poller otherwise.
+    stdout & stderr aren't available.
+    """
+
+    # Non-zero, so adopted processes that exit are restarted like crashes
+    unknown_returncode = 255
+
+    def __init__(self, pid, *cmd, **kwargs):
+        super().__init__(*cmd, **kwargs)
+        self._pid = pid
+        self._start_time = None
+        self._returncode = None
+        self._pidfd = None
+
+    @classmethod
+    def is_supported(cls):
+        """
+        Returns True if processes can be identified by their start time here.
+        """
+        return process_start_time(os.getpid()) is not None
+
+    async def start(self):
+        """
+        Attach to the running process
+        """
+        loop = asyncio.get_running_loop()
+        self._start_time = process_start_time(self._pid)
+        if self._start_time is None:
+            raise ProcessLookupError(f"Process {self._pid} isn't running")
+        self._exited = loop.create_future()
+        if PidfdProcess.is_supported():
+            self._pidfd = os.pidfd_open(self._pid)
+            # The pid may have been reused between reading its start time &
+            # opening the pidfd
+            if process_start_time(self._pid) != self._start_time:
+                os.close(self._pidfd)
+                self._pidfd = None
+                raise ProcessLookupError(f"Process {self._pid} isn't running")
+            loop.add_reader(self._pidfd, self._on_exit)
+        else:
+            future = get_poller().register(self._poll)
+            future.add_done_callback(lambda f: self._on_exit())
+
+    def _poll(self):
+        if process_start_time(self._pid) != self._start_time:
+            return self.unknown_returncode
+
+    def _on_exit(self):
+        if self._pidfd is not None:
+            asyncio.get_running_loop().remove_reader(self._pidfd)
+            os.close(self._pidfd)
+            self._pidfd = None
+        self._returncode = self.unknown_returncode
+        self._exited.set_result(self._returncode)
+
+    async def wait(self):
+        """
+        Wait for the process to stop and return unknown_returncode.
+        """
+        return await asyncio.shield(self._exited)
+
+    def get_kill_signal(self):
+        """
+        Returns the OS signal used for kill the child process.
+        """
+        return signal.SIGKILL
+
+    def send_signal(self, signum):
+        """
+        Send the OS signal to the process, if it is still the one we adopted.
+        """
+        if self._pidfd is not None:
+            signal.pidfd_send_signal(self._pidfd, signum)
+        elif self._returncode is None and self._poll() is None:
+            os.kill(self._pid, signum)
+            get_poller().wake()
+        else:
+            raise ProcessLookupError(f"Process {self._pid} has exited")
+
+    @property
+    def pid(self):
+        return self._pid
+
+    @property
+    def returncode(self):
+        return self._returncode
+
+    @property
+    def stdout(self):
+        return None
+
+    @property
+    def stderr(self):
+        return None
+
+
 class SupervisedProcess:
     def __init__(
         self,
@@ -143,20 +395,161 @@ class SupervisedProcess:
         always_restart=False,
         ready_func=None,
         ready_timeout=5,
+        ready_strategy=None,
         log=None,
+        restart_policy=None,
+        notify=False,
+        liveness=None,
+        stop_signal=signal.SIGTERM,
+        stop_grace_period=10,
+        process_class=None,
+        log_compact=False,
+        on_start=None,
+        on_exit=None,
+        on_ready=None,
+        on_restart=None,
+        output=None,
+        output_sink=None,
+        state_file=None,
+        allocate_port=False,
+        listen_socket=False,
+        port_allocator=None,
+        idle=None,
+        resources=None,
+        kill_tree=False,
+        fast_spawn=False,
         **kwargs,
     ):
         self.always_restart = always_restart
+        # Optional RestartPolicy. Without one, processes are restarted
+        # immediately every time they need to be.
+        self.restart_policy = restart_policy
         self.name = name
+        # Process subclass used to start the child, picked based on platform
+        # by default. Falls back to the default if it isn't supported here.
+        self.process_class = process_class
         self._proc_args = args
         self._proc_kwargs = kwargs
         self.ready_func = ready_func
         self.ready_timeout = ready_timeout
+        # Timeout of 5 secs per probe is needed as DNS resolution of localhost
+        # on Windows takes significant time.
+        if ready_strategy is None:
+            ready_strategy = ExponentialBackoff(probe_timeout=5)
+        self.ready_strategy = ready_strategy
+        # Seconds the last successful ready() call took, and how many times it
+        # called ready_func
+        self.time_to_ready = None
+        self.ready_probes = 0
+        # With notify=True, children are told where to send sd_notify style
+        # messages in $NOTIFY_SOCKET, and ready() waits for READY=1 unless a
+        # ready_func is given.
+        self.notify_socket = NotifySocket() if notify else None
+        # Signal stop() sends first, and how long it waits before killing
+        self.stop_signal = stop_signal
+        self.stop_grace_period = stop_grace_period
+        # Optional LivenessCheck, run periodically once we are ready
+        self.liveness = liveness
+        if liveness is not None and liveness.watchdog and not notify:
+            raise ValueError("Watchdog liveness checks need notify=True")
+        self._liveness_timer = None
+        self._liveness_task = None
+        self._liveness_failures = 0
+        self._liveness_since = None
+        # Set when a hung process is killed, so it is restarted no matter how
+        # it exits
+        self._force_restart = False
+        # Optional IdlePolicy, stopping the process while nobody uses it
+        self.idle = idle
+        self._idle_timer = None
+        self._idle_task = None
+        self._idle_state = {}
+        self._idle_since = None
+        # True while stopped for being idle. start() brings it back.
+        self.idle_stopped = False
+        # Set by a SocketActivator, to start us again after an idle stop
+        self.activator = None
+        # Optional ResourceLimits applied to each child, and the cgroup the
+        # current child is in, if any
+        self.resources = resources
+        self.cgroup = None
+        # Why the last child exited: "oom" if it was killed for going over
+        # its memory limit, None otherwise
+        self.exit_reason = None
+        # ProcessSamples, set once added to a ResourceSampler
+        self.samples = None
+        # With kill_tree=True, the child is started in a new session, and
+        # signals go to its whole process group (& cgroup.kill is used to
+        # kill its cgroup, if it has one). Waiting for the child only ends
+        # once all of them are gone, and anything left when the child exits
+        # on its own is killed, so no grandchildren are left behind.
+        if kill_tree and sys.platform == "win32":
+            raise ValueError("Killing process trees isn't supported on Windows")
+        self.kill_tree = kill_tree
+        # With fast_spawn=True, children are started without closing fds
+        # (unless close_fds is given), with the command's full path & a
+        # snapshot of os.environ taken once, so subprocess can use
+        # posix_spawn. Use an EnvTemplate as env for the same benefits
+        # without the rest.
+        self.fast_spawn = fast_spawn
+        self._executable = None
+        self._env_template = None
         self.proc = None
+        # Watches, reaps & restarts the process while it is running
+        self._restart_process_future = None
+        # With allocate_port=True, a free port is picked from port_allocator
+        # (shared by all processes by default) when first started. It is
+        # passed in $PORT, and replaces {port} in the command & env values.
+        # With listen_socket=True, the port is also bound & listening, and
+        # the socket's fd is inherited by the process & passed in
+        # $SIMPERVISOR_LISTEN_FD. The port & socket are kept across restarts.
+        if (allocate_port or listen_socket) and port_allocator is None:
+            port_allocator = default_allocator
+        self.port_allocator = port_allocator if allocate_port or listen_socket else None
+        self.listen_socket = listen_socket
+        if listen_socket and sys.platform == "win32":
+            raise ValueError("Passing listening sockets isn't supported on Windows")
+        if listen_socket and ready_func is None and not notify:
+            self.ready_func = ListeningProbe()
+        self.port = None
+        self._listen_sock = None
+        self.metrics = ProcessMetrics()
+        # Optional callbacks, called with this SupervisedProcess (and the exit
+        # code for on_exit). They may be plain functions or coroutines.
+        self.on_start = on_start
+        self.on_exit = on_exit
+        self.on_ready = on_ready
+        self.on_restart = on_restart
+        # Optional OutputCapture draining the child's stdout & stderr, and an
+        # optional sink (like a RotatingFileSink) the captured output is
+        # written to. Output is captured with default settings if needed.
+        if output_sink is not None and output is None:
+            output = OutputCapture()
+        if output is not None and sys.platform == "win32":
+            raise ValueError("Capturing output isn't supported on Windows")
+        self.output = output
+        self.output_sink = output_sink
+        if output_sink is not None:
+            output_sink.attach(output)
+        # Optional StateFile the child is recorded in, so a new supervisor
+        # can adopt it if we go away. Signals aren't propagated to children
+        # that are meant to outlive us.
+        self.state_file = state_file
+        if state_file is not None and output is not None:
+            raise ValueError("Output of processes in a state file can't be captured")
+        # True if the running process was adopted rather than started by us
+        self.adopted = False
         if log is None:
             self.log = logging.getLogger("simpervisor")
         else:
             self.log = log
+        # Metadata added to every log record, computed once. The compact form
+        # leaves out the command & its kwargs, which include the whole env.
+        log_extras = {"proccess-name": self.name}
+        if not log_compact:
+            log_extras["process-args"] = self._proc_args
+            log_extras["process-kwargs"] = self._proc_kwargs
+        self._log_extras = MappingProxyType(log_extras)
 
         # asyncio.Process has no 'poll', so we keep that state internally
         self.running = False
@@ -172,32 +565,416 @@ class SupervisedProcess:
         # signals is synchronous.
         self._proc_lock = asyncio.Lock()
 
+        # Set by ProcessGroup when this process is added to one. Processes in
+        # a group have their signals propagated by the group's handler.
+        self._group = None
+
     def _debug_log(self, action, message, extras=None, *args):
         """
         Log debug message with some added meta information.
 
-        Makes structured logging easier
+        Makes structured logging easier. Does no work at all unless debug
+        logging is enabled.
         """
-        base_extras = {
-            "action": action,
-            "proccess-name": self.name,
-            "process-args": self._proc_args,
-            "process-kwargs": self._proc_kwargs,
-        }
+        if not self.log.isEnabledFor(logging.DEBUG):
+            return
+        base_extras = dict(self._log_extras, action=action)
         if extras:
             base_extras.update(extras)
         # Call .format() explicitly here, since we wanna use new style {} formatting
         self.log.debug(message.format(*args), extra=base_extras)
 
+    async def _run_hook(self, hook, *args):
+        """
+        Call an on_* hook if it is set, awaiting it if needed.
+
+        Exceptions are logged, so a failing hook can't stop us restarting or
+        cleaning up after the process.
+        """
+        if hook is None:
+            return
+        try:
+            result = hook(self, *args)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            self.log.exception(f"Hook {hook!r} of {self.name} failed")
+
+    @asynccontextmanager
+    async def _locked(self):
+        """
+        Hold the process lock, recording how long we waited for it
+        """
+        start_time = time.monotonic()
+        async with self._proc_lock:
+            self.metrics.lock_wait_seconds.observe(time.monotonic() - start_time)
+            yield
+
+    def _record_exit(self, retcode):
+        """
+        Record the exit of the current process in our metrics.
+
+        Returns the seconds the process was up for, or None if its exit was
+        already recorded.
+        """
+        if self.metrics.started_at is None:
+            return None
+        uptime = self.metrics.uptime
+        self.metrics.started_at = None
+        self.metrics.exit_codes[retcode] += 1
+        return uptime
+
+    @property
+    def cpu_seconds(self):
+        """
+        CPU time used by all our children so far, including the current one
+        """
+        current = None
+        if self.running:
+            if self.cgroup is not None:
+                current = self.cgroup.cpu_seconds()
+            else:
+                current = process_cpu_time(self.pid)
+        return self.metrics.cpu_seconds + (current or 0)
+
+    @property
+    def peak_memory(self):
+        """
+        Most memory in bytes any of our children used at once, as far as known
+        """
+        current = None
+        if self.running:
+            if self.cgroup is not None:
+                current = self.cgroup.peak_memory()
+            else:
+                current = process_peak_memory(self.pid)
+        return max(self.metrics.peak_memory, current or 0)
+
+    def _apply_resources(self):
+        """
+        Apply our resource limits to the freshly started child
+        """
+        self.exit_reason = None
+        if self.resources is None:
+            return
+        name = re.sub(r"[^\w.-]", "_", f"{self.name}-{self.proc.pid}")
+        self.cgroup = self.resources.apply(self.proc.pid, name)
+
+    def _release_cgroup(self):
+        """
+        Account for the exited child's resource use, & remove its cgroup
+        """
+        cgroup, self.cgroup = self.cgroup, None
+        if cgroup is None:
+            return
+        self.metrics.cpu_seconds += cgroup.cpu_seconds() or 0
+        self.metrics.peak_memory = max(
+            self.metrics.peak_memory, cgroup.peak_memory() or 0
+        )
+        if cgroup.oom_kills():
+            self.exit_reason = "oom"
+            self.metrics.oom_kills += 1
+        cgroup.remove()
+
+    def _send_signal(self, signum, proc=None):
+        """
+        Send signum to the child, and with kill_tree to its whole tree.
+
+        Raises ProcessLookupError if there was nothing left to signal.
+        """
+        if proc is None:
+            proc = self.proc
+        if not self.kill_tree:
+            proc.send_signal(signum)
+            return
+        sent = False
+        try:
+            proc.send_signal(signum)
+            sent = True
+        except ProcessLookupError:
+            # The child may be gone, but not the rest of its group
+            pass
+        if self.cgroup is not None and signum == proc.get_kill_signal():
+            try:
+                # Also gets processes that left the process group
+                self.cgroup.kill()
+                sent = True
+            except OSError:
+                # Kernel too old
+                pass
+        try:
+            os.killpg(proc.pid, signum)
+            sent = True
+        except ProcessLookupError:
+            pass
+        if not sent:
+            raise ProcessLookupError(f"Process {proc.pid} has exited")
+
+    def _tree_alive(self, proc):
+        """
+        Return True if any process in the child's tree is still running
+        """
+        if self.cgroup is not None:
+            populated = self.cgroup.populated()
+            if populated is not None:
+                return populated
+        try:
+            os.killpg(proc.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    async def _wait(self, proc=None):
+        """
+        Wait for the child to exit & return its exit code.
+
+        With kill_tree, also wait for the rest of its tree to be gone.
+        """
+        if proc is None:
+            proc = self.proc
+        retcode = await proc.wait()
+        if self.kill_tree and self._tree_alive(proc):
+            await get_poller().register(lambda: None if self._tree_alive(proc) else 0)
+        return retcode
+
     def _handle_signal(self, signal):
+        if self.state_file is not None:
+            # Leave the child running, for the next supervisor to adopt
+            self.state_file.flush()
+            return
         # Child processes should handle SIGTERM / SIGINT & close,
         # which should trigger self._restart_process_if_needed
         # We don't explicitly reap child processes
-        self.proc.send_signal(signal)
+        self._send_signal(signal)
         # Don't restart process after it is reaped
         self._killed = True
         self._debug_log("signal", "Propagated signal {} to {}", {}, signal, self.name)
 
+    def _get_process_class(self):
+        """
+        Return the Process subclass to start the child process with
+        """
+        process_class = self.process_class
+        if process_class is not None and not process_class.is_supported():
+            self._debug_log(
+                "unsupported-process-class",
+                "{} isn't supported here, falling back to the default",
+                {},
+                process_class.__name__,
+            )
+            process_class = None
+        if process_class is None and self.state_file is not None:
+            # asyncio kills children whose transports are still open when the
+            # event loop goes away, so use Popen for children that outlive us
+            if PidfdProcess.is_supported():
+                process_class = PidfdProcess
+            else:
+                process_class = WindowsProcess
+        if process_class is None:
+            # Child process is created based on platform
+            if sys.platform == "win32":
+                process_class = WindowsProcess
+            else:
+                process_class = POSIXProcess
+        return process_class
+
+    def _allocate_port(self):
+        """
+        Pick our port, if we need one & don't have one yet
+        """
+        if self.port_allocator is None:
+            return
+        if self.port is None:
+            self.port, self._listen_sock = self.port_allocator.allocate(
+                bind=self.listen_socket
+            )
+            return
+        # Our port from before we last exited, or that of an adopted process,
+        # which held the socket itself
+        self.port_allocator.reserve(self.port)
+        if self.listen_socket and self._listen_sock is None:
+            self._listen_sock = self.port_allocator.listen(self.port)
+
+    def _release_port(self):
+        if self._listen_sock is not None:
+            self._listen_sock.close()
+            self._listen_sock = None
+        if self.port_allocator is not None and self.port is not None:
+            self.port_allocator.release(self.port)
+
+    def _get_proc_args(self):
+        """
+        Return the command to start the child process with
+        """
+        args = self._proc_args
+        if self.fast_spawn and args and not os.path.dirname(args[0]):
+            # subprocess only uses posix_spawn for commands with a path.
+            # Look for it where the child would, in the PATH of its env.
+            if self._executable is None:
+                path = os.pathsep.join(os.get_exec_path(self._proc_kwargs.get("env")))
+                self._executable = shutil.which(args[0], path=path) or args[0]
+            args = (self._executable,) + tuple(args[1:])
+        if self.port is None:
+            return args
+        port = str(self.port)
+        return [str(arg).replace("{port}", port) for arg in args]
+
+    def _get_proc_kwargs(self):
+        """
+        Return the keyword arguments to start the child process with
+        """
+        kwargs = self._proc_kwargs
+        extra_env = {}
+        substitutions = None
+        if self.port is not None:
+            port = str(self.port)
+            extra_env["PORT"] = port
+            substitutions = {"{port}": port}
+            if self._listen_sock is not None:
+                fd = self._listen_sock.fileno()
+                extra_env["SIMPERVISOR_LISTEN_FD"] = str(fd)
+                pass_fds = tuple(kwargs.get("pass_fds", ())) + (fd,)
+                kwargs = dict(kwargs, pass_fds=pass_fds)
+        if self.notify_socket is not None:
+            extra_env["NOTIFY_SOCKET"] = self.notify_socket.open()
+            if self.liveness is not None and self.liveness.watchdog:
+                extra_env["WATCHDOG_USEC"] = str(int(self.liveness.interval * 1e6))
+        env = kwargs.get("env")
+        if env is None and self.fast_spawn:
+            # Snapshot os.environ once, instead of subprocess encoding it
+            # again for every child
+            if self._env_template is None:
+                self._env_template = EnvTemplate()
+            env = self._env_template
+        elif extra_env and not isinstance(env, EnvTemplate):
+            env = EnvTemplate(env)
+        if isinstance(env, EnvTemplate):
+            kwargs = dict(kwargs, env=env.render(extra_env, substitutions))
+        if self.fast_spawn and not kwargs.get("pass_fds"):
+            # Python's own fds aren't inheritable (PEP 446), so there's
+            # nothing to close, and subprocess can use posix_spawn. It can't
+            # with pass_fds, which need close_fds anyway.
+            kwargs = dict(kwargs, close_fds=kwargs.get("close_fds", False))
+        if self.kill_tree:
+            # Its own process group, with the same id as its pid
+            kwargs = dict(kwargs, start_new_session=True)
+        if self.output is not None:
+            # Pipe whatever streams weren't explicitly redirected elsewhere
+            pipes = {
+                stream: asyncio.subprocess.PIPE
+                for stream in ("stdout", "stderr")
+                if kwargs.get(stream) is None
+            }
+            kwargs = dict(kwargs, **pipes)
+        return kwargs
+
+    def _start_liveness(self):
+        """
+        Start periodically checking that the process is alive
+        """
+        if self.liveness is None or self._liveness_timer is not None:
+            return
+        self._liveness_failures = 0
+        self._liveness_since = time.monotonic()
+        self._liveness_timer = get_shared_timer().schedule(
+            self.liveness.interval, self._on_liveness_timer
+        )
+
+    def _stop_liveness(self):
+        if self._liveness_timer is not None:
+            self._liveness_timer.cancel()
+            self._liveness_timer = None
+
+    def _on_liveness_timer(self):
+        # Called from the shared timer, so must not block. Skip this round if
+        # the previous check is still running.
+        if self._liveness_task is None or self._liveness_task.done():
+            self._liveness_task = asyncio.ensure_future(self._check_liveness())
+
+    async def _check_liveness(self):
+        if await self.liveness.check(self, self._liveness_since):
+            self._liveness_failures = 0
+            return
+        self._liveness_failures += 1
+        self._debug_log(
+            "liveness-failed",
+            "Liveness check {} of {} failed for {}",
+            {"failures": self._liveness_failures},
+            self._liveness_failures,
+            self.liveness.failures,
+            self.name,
+        )
+        if self._liveness_failures >= self.liveness.failures:
+            await self._restart_hung()
+
+    async def _restart_hung(self):
+        """
+        Stop a hung process, escalating from SIGTERM to its kill signal.
+
+        The process is restarted by _restart_process_if_needed once it exits.
+        """
+        self._stop_liveness()
+        if not self.running or self._killed:
+            return
+        self.log.warning(f"{self.name} failed its liveness checks, restarting it")
+        self._force_restart = True
+        proc = self.proc
+        try:
+            self._send_signal(signal.SIGTERM, proc)
+            await asyncio.wait_for(
+                asyncio.shield(self._wait(proc)), self.liveness.kill_timeout
+            )
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            try:
+                self._send_signal(proc.get_kill_signal(), proc)
+            except ProcessLookupError:
+                pass
+
+    def _start_idle(self):
+        """
+        Start periodically checking whether the process is idle
+        """
+        if self.idle is None or self._idle_timer is not None:
+            return
+        self._idle_state = {}
+        self._idle_since = time.monotonic()
+        self._idle_timer = get_shared_timer().schedule(
+            self.idle.interval, self._on_idle_timer
+        )
+
+    def _stop_idle(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _on_idle_timer(self):
+        # Called from the shared timer, so must not block
+        if self._idle_task is None or self._idle_task.done():
+            self._idle_task = asyncio.ensure_future(self._check_idle())
+
+    async def _check_idle(self):
+        if not self.running or self._killed:
+            return
+        now = time.monotonic()
+        if await self.idle.check(self, self._idle_state):
+            self._idle_since = now
+            return
+        if now - self._idle_since < self.idle.timeout:
+            return
+        self.log.info(
+            f"{self.name} was idle for {now - self._idle_since:.0f}s, stopping it"
+        )
+        self._stop_idle()
+        await self.stop(restartable=True)
+        self.idle_stopped = True
+        if self.activator is not None:
+            # Start again on the next connection
+            self.activator.activate()
+
     async def start(self):
         """
         Start the process if it isn't already running.
@@ -209,7 +986,7 @@ class SupervisedProcess:
         # We could concurrently be in any other part of the code where
         # process is started or killed. So we check for that as soon
         # as we aquire the lock and behave accordingly.
-        async with self._proc_lock:
+        async with self._locked():
             if self.running:
                 # Don't wanna start it again, if we're already running
                 return
@@ -219,18 +996,48 @@ class SupervisedProcess:
                 )
             self._debug_log("try-start", "Trying to start {}", {}, self.name)
 
-            # Child process is created based on platform
-            if sys.platform == "win32":
-                self.proc = WindowsProcess(*self._proc_args, **self._proc_kwargs)
-            else:
-                self.proc = POSIXProcess(*self._proc_args, **self._proc_kwargs)
+            if self.notify_socket is not None:
+                self.notify_socket.reset()
+            reset_probe = getattr(self.ready_func, "reset", None)
+            if reset_probe is not None:
+                reset_probe()
+
+            if not await self._adopt():
+                self._allocate_port()
+                kwargs = self._get_proc_kwargs()
+                self.proc = self._get_process_class()(*self._get_proc_args(), **kwargs)
 
-            # Start the child process
-            await self.proc.start()
-            self._debug_log("started", "Started {}", {}, self.name)
+                # Start the child process
+                start_time = time.monotonic()
+                try:
+                    await self.proc.start()
+                except BaseException:
+                    # Nothing was started, so there is nothing to stop either
+                    self.proc = None
+                    raise
+                try:
+                    self._apply_resources()
+                except BaseException:
+                    self._send_signal(self.proc.get_kill_signal())
+                    await self._wait()
+                    raise
+                self.metrics.started_at = time.monotonic()
+                self.metrics.spawn_seconds.observe(self.metrics.started_at - start_time)
+                self.metrics.starts += 1
+                self._debug_log("started", "Started {}", {}, self.name)
+                if self.state_file is not None:
+                    self.state_file.record(
+                        self.name, self.proc.pid, self._proc_args, self.port
+                    )
+            if self.output is not None:
+                self.output.attach(self.proc)
+            if self.notify_socket is not None:
+                self.notify_socket.watch(self.proc.pid)
 
             self._killed = False
             self.running = True
+            self.idle_stopped = False
+            self._start_idle()
 
             # Spin off a coroutine to watch, reap & restart process if needed
             # We don't wanna do this multiple times, so this is also inside the lock
@@ -239,7 +1046,40 @@ class SupervisedProcess:
             )
 
             # This handler is removed when process stops
-            add_handler(self._handle_signal)
+            if self._group is None:
+                add_handler(self._handle_signal)
+
+        await self._run_hook(self.on_start)
+
+    async def _adopt(self):
+        """
+        Attach to our child left running by a previous supervisor, if any.
+
+        Returns True if a process matching our name & command was adopted.
+        """
+        self.adopted = False
+        if self.state_file is None or not AdoptedProcess.is_supported():
+            return False
+        pid = self.state_file.find_running(self.name, self._proc_args)
+        if pid is None:
+            return False
+        proc = AdoptedProcess(pid, *self._proc_args)
+        try:
+            await proc.start()
+        except (ProcessLookupError, PermissionError):
+            return False
+        self.proc = proc
+        self.adopted = True
+        port = self.state_file.get(self.name).get("port")
+        if port is not None and self.port_allocator is not None:
+            self.port = port
+            self.port_allocator.reserve(port)
+        self.metrics.started_at = time.monotonic()
+        if self.notify_socket is not None:
+            # It can't know our new socket, and was presumably ready already
+            self.notify_socket.ready = True
+        self._debug_log("adopted", "Adopted {} with pid {}", {}, self.name, pid)
+        return True
 
     async def _restart_process_if_needed(self):
         """
@@ -249,14 +1089,64 @@ class SupervisedProcess:
         exits. If we restart the process, `start()` sets this up again.
         """
         retcode = await self.proc.wait()
+        if self.kill_tree and self._tree_alive(self.proc):
+            # Don't leave anything the child started behind
+            try:
+                self._send_signal(self.proc.get_kill_signal())
+            except ProcessLookupError:
+                pass
+            await self._wait()
         # FIXME: Do we need to aquire a lock somewhere in this method?
-        remove_handler(self._handle_signal)
+        if self._group is None:
+            remove_handler(self._handle_signal)
+        self._stop_liveness()
+        self._stop_idle()
         self._debug_log(
             "exited", "{} exited with code {}", {"code": retcode}, self.name, retcode
         )
         self.running = False
-        if (not self._killed) and (self.always_restart or retcode != 0):
+        self._release_cgroup()
+        if self.state_file is not None:
+            self.state_file.forget(self.name)
+        uptime = self._record_exit(retcode)
+        if self.restart_policy is not None:
+            self.restart_policy.record_exit(retcode, uptime)
+        await self._run_hook(self.on_exit, retcode)
+        force_restart, self._force_restart = self._force_restart, False
+        if self.exit_reason == "oom":
+            self.log.warning(f"{self.name} was killed for going over its memory limit")
+            if not self.resources.restart_on_oom:
+                await self._release_resources()
+                return
+        if (not self._killed) and (
+            self.always_restart or retcode != 0 or force_restart
+        ):
+            if self.restart_policy is not None:
+                delay = self.restart_policy.next_delay()
+                if delay is None:
+                    self.log.warning(
+                        f"Not restarting {self.name}, it restarted too often recently"
+                    )
+                    await self._release_resources()
+                    return
+                self._debug_log(
+                    "restart-wait",
+                    "Restarting {} in {}s",
+                    {"delay": delay},
+                    self.name,
+                    delay,
+                )
+                # terminate() & kill() cancel us while we sleep here
+                await asyncio.sleep(delay)
+            self.metrics.restarts += 1
+            await self._run_hook(self.on_restart)
             await self.start()
+            if self.liveness is not None and (self.ready_func or self.notify_socket):
+                # Liveness checks only resume once we're ready again
+                await self.ready()
+        else:
+            # Not coming back, unless start() is called again
+            await self._release_resources()
 
     async def _signal_and_wait(self, signum):
         """
@@ -269,20 +1159,120 @@ class SupervisedProcess:
         """
 
         # Aquire lock to modify process sate
-        async with self._proc_lock:
+        async with self._locked():
             # Don't yield control between sending signal & calling wait
             # This way, we don't end up in a call to _restart_process_if_needed
             # and possibly restarting. We also set _killed, just to be sure.
-            self.proc.send_signal(signum)
+            try:
+                self._send_signal(signum)
+            except ProcessLookupError:
+                # Process has already exited, and might be waiting to be
+                # restarted. Either way, there's nothing left to signal.
+                pass
             self._killed = True
 
             # We cancel the restart watcher & wait for the process to finish,
             # since we return only after the process has been reaped
-            self._restart_process_future.cancel()
-            await self.proc.wait()
-            self.running = False
-            # Remove signal handler *after* the process is done
+            if self._restart_process_future is not None:
+                self._restart_process_future.cancel()
+            self._stop_liveness()
+            self._stop_idle()
+            await self._wait()
+            await self._cleanup_after_stop()
+
+    async def _cleanup_after_stop(self, final=True):
+        """
+        Clean up after the process has been explicitly stopped & reaped.
+
+        Resources kept across restarts are only released if `final`.
+        """
+        self.running = False
+        self._release_cgroup()
+        if self._record_exit(self.proc.returncode) is not None:
+            await self._run_hook(self.on_exit, self.proc.returncode)
+        # Remove signal handler *after* the process is done
+        if self._group is None:
             remove_handler(self._handle_signal)
+        if self.state_file is not None:
+            self.state_file.forget(self.name)
+        if final:
+            # We'll never be started again
+            await self._release_resources()
+
+    async def _release_resources(self):
+        """
+        Release the resources kept across restarts, once there are none to come
+        """
+        self._release_port()
+        if self.notify_socket is not None:
+            self.notify_socket.close()
+        if self.output_sink is not None:
+            # Give the last of the output a moment to be read before we close
+            # the sink, without waiting forever for grandchildren holding the
+            # pipes open.
+            try:
+                await asyncio.wait_for(asyncio.shield(self.output.wait_closed()), 1)
+            except asyncio.TimeoutError:
+                pass
+            self.output_sink.close()
+
+    async def stop(self, grace_period=None, restartable=False):
+        """
+        Send stop_signal to process, and its kill signal if it hasn't exited
+        after grace_period seconds. Returns once the process is reaped.
+
+        Unlike terminate() & kill(), this never raises KilledProcessError.
+        Returns a StopResult telling how the process exited. With
+        `restartable=True`, the process can be started again later, and
+        keeps its port & notify socket until then.
+        """
+        if grace_period is None:
+            grace_period = self.stop_grace_period
+        if self.proc is None:
+            # Never started, or starting it failed after picking our port
+            if not restartable:
+                self._release_port()
+            return StopResult.ALREADY_DEAD
+
+        async with self._locked():
+            if self._killed:
+                return StopResult.ALREADY_DEAD
+            self._killed = True
+            if self._restart_process_future is not None:
+                self._restart_process_future.cancel()
+            self._stop_liveness()
+            self._stop_idle()
+
+            result = StopResult.ALREADY_DEAD
+            if self.proc.returncode is None:
+                try:
+                    self._send_signal(self.stop_signal)
+                    await asyncio.wait_for(asyncio.shield(self._wait()), grace_period)
+                    result = StopResult.GRACEFUL
+                except ProcessLookupError:
+                    pass
+                except asyncio.TimeoutError:
+                    self._debug_log(
+                        "stop-timeout",
+                        "{} didn't stop within {}s, killing it",
+                        {"grace_period": grace_period},
+                        self.name,
+                        grace_period,
+                    )
+                    try:
+                        self._send_signal(self.proc.get_kill_signal())
+                        result = StopResult.KILLED
+                    except ProcessLookupError:
+                        pass
+                await self._wait()
+
+            await self._cleanup_after_stop(final=not restartable)
+            if restartable:
+                self._killed = False
+            self._debug_log(
+                "stopped", "Stopped {}: {}", {"result": result.value}, self.name, result
+            )
+            return result
 
     async def terminate(self):
         """
@@ -307,60 +1297,107 @@ class SupervisedProcess:
         signum = self.proc.get_kill_signal()
         return await self._signal_and_wait(signum)
 
+    async def _ready_done(self, elapsed):
+        """
+        Record that ready() succeeded after elapsed seconds
+        """
+        self.time_to_ready = elapsed
+        self.metrics.ready_seconds.observe(elapsed)
+        self.metrics.ready_probes.observe(self.ready_probes)
+        self._start_liveness()
+        await self._run_hook(self.on_ready)
+
     async def ready(self):
         """
         Wait for process to become 'ready'
+
+        ready_func is called repeatedly, with intervals decided by
+        ready_strategy, until it returns True or ready_timeout seconds pass.
         """
         # FIXME: Should this be internal and part of 'start'?
         # FIXME: Do we need some locks here?
-        # Repeatedly run ready_func with a timeout until it returns true
-        # FIXME, parameterize these numbers
-        start_time = time.time()
-        wait_time = 0.01
+        # Use a monotonic clock, so wall clock jumps don't affect our timeout
+        start_time = time.monotonic()
+        deadline = start_time + self.ready_timeout
+        intervals = self.ready_strategy.intervals()
+        self.ready_probes = 0
 
-        while True:
-            if time.time() - start_time > self.ready_timeout:
-                # We have exceeded our timeout, so return
+        ready_func = self.ready_func
+        if ready_func is None:
+            ready_func = self.notify_socket
+        wait_ready = getattr(ready_func, "wait_ready", None)
+        if wait_ready is not None:
+            # The probe tells us when we're ready, no need to poll it
+            if self._killed or not self.proc:
                 return False
+            try:
+                is_ready = await asyncio.wait_for(wait_ready(self), self.ready_timeout)
+            except asyncio.TimeoutError:
+                is_ready = False
+            self.ready_probes = 1
+            if is_ready:
+                await self._ready_done(time.monotonic() - start_time)
+            return is_ready
 
+        while True:
             # Make sure we haven't been killed yet since the last loop
             # We explicitly do *not* check if we are running, since we might be
             # restarting in a loop while the readyness check is happening
             if self._killed or not self.proc:
                 return False
 
-            # FIXME: What's the timeout for each readyness check handler?
             # FIXME: We should probably check again if our process is still running
             # FIXME: Should we be locking something here?
+            # A hanging probe mustn't keep us waiting past the deadline
+            probe_timeout = min(
+                self.ready_strategy.probe_timeout, deadline - time.monotonic()
+            )
+            if probe_timeout <= 0:
+                return False
             try:
-                # Timeout of 5 secs is needed as DNS resolution of localhost
-                # on Windows takes significant time.
-                is_ready = await asyncio.wait_for(self.ready_func(self), 5)
+                is_ready = await asyncio.wait_for(ready_func(self), probe_timeout)
             except asyncio.TimeoutError:
                 is_ready = False
-            cur_time = time.time() - start_time
-            self._debug_log(
-                "ready-wait",
-                "Readyness: {} after {} seconds, next check in {}s",
-                {"wait_time": wait_time, "ready": is_ready, "elapsed_time": cur_time},
-                is_ready,
-                cur_time,
-                wait_time,
-            )
+            self.ready_probes += 1
+
+            now = time.monotonic()
+            cur_time = now - start_time
+            # Check before calling _debug_log, so we don't even build the
+            # extras for every probe when debug logging is off.
+            debug = self.log.isEnabledFor(logging.DEBUG)
             if is_ready:
+                await self._ready_done(cur_time)
+                if debug:
+                    self._debug_log(
+                        "ready",
+                        "{} ready after {} seconds",
+                        {"elapsed_time": cur_time, "probes": self.ready_probes},
+                        self.name,
+                        cur_time,
+                    )
                 return True
-            await asyncio.sleep(wait_time)
 
-            # FIXME: Be more sophisticated here with backoff & jitter
-            wait_time = 2 * wait_time
-            if (time.time() + wait_time) > (start_time + self.ready_timeout):
-                # If we wait for wait_time, we'll be over the ready_timeout
-                # So let's clamp wait_time so that wait_time is just enough
-                # to get us to ready_timeout seconds since start_time
-                # FIXME: This means wait_time can be negative...
-                wait_time = (start_time + self.ready_timeout) - time.time() - 0.01
+            remaining = deadline - now
+            if remaining <= 0:
+                # We have exceeded our timeout, so return
+                return False
 
-        return False
+            # Never sleep past the deadline
+            wait_time = min(next(intervals), remaining)
+            if debug:
+                self._debug_log(
+                    "ready-wait",
+                    "Readyness: {} after {} seconds, next check in {}s",
+                    {
+                        "wait_time": wait_time,
+                        "ready": is_ready,
+                        "elapsed_time": cur_time,
+                    },
+                    is_ready,
+                    cur_time,
+                    wait_time,
+                )
+            await asyncio.sleep(wait_time)
 
     # Pass through methods specific methods from proc
     # We don't pass through everything, just a subset we know is safe
@@ -0,0 +1,99 @@
+"""
+Read information about processes from /proc, on Linux
+"""
+
+import os
+
+# Clock ticks per second, the unit of times in /proc/<pid>/stat
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# TCP connection state in /proc/net/tcp
+TCP_ESTABLISHED = "01"
+
+
+def read_stat(pid):
+    """
+    Return the fields of /proc/<pid>/stat after the command name, or None.
+
+    The command name is in parentheses & may contain spaces, so fields are
+    counted from the last ')'. Field N of `man proc` is at index N - 3.
+    Returns None if the process doesn't exist or has exited, or if there is
+    no /proc.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    fields = stat[stat.rindex(b")") + 2 :].split()
+    if fields[0] in (b"Z", b"X"):
+        # Exited, and just waiting to be reaped
+        return None
+    return fields
+
+
+def process_start_time(pid):
+    """
+    Return when process `pid` started, in clock ticks since boot.
+
+    Together with the pid, this identifies a process even if its pid is
+    reused later. Returns None if the process isn't running, or if the start
+    time can't be found on this platform (only Linux is supported).
+    """
+    fields = read_stat(pid)
+    if fields is None:
+        return None
+    # starttime is field 22
+    return int(fields[19])
+
+
+def process_cpu_time(pid):
+    """
+    Return seconds of CPU time process `pid` used in user & kernel mode.
+
+    Returns None if the process isn't running, or on platforms without /proc.
+    """
+    fields = read_stat(pid)
+    if fields is None:
+        return None
+    # utime & stime are fields 14 & 15
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def count_connections(port):
+    """
+    Return the number of established TCP connections to local `port`.
+
+    Connections still waiting to be accepted are counted too. Returns None
+    on platforms without /proc.
+    """
+    count = 0
+    found = False
+    for path in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(path) as f:
+                # Skip the header
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    local_port = int(fields[1].rsplit(":", 1)[1], 16)
+                    if local_port == port and fields[3] == TCP_ESTABLISHED:
+                        count += 1
+        except OSError:
+            continue
+        found = True
+    return count if found else None
+
+
+def process_peak_memory(pid):
+    """
+    Return the peak resident memory of process `pid` in bytes, or None
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
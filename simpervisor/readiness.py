@@ -0,0 +1,84 @@
+"""
+Strategies deciding how often SupervisedProcess.ready() runs its ready_func
+"""
+
+import itertools
+import random
+
+
+class ReadyStrategy:
+    """
+    Abstract class deciding how long to wait between readiness probes.
+
+    `probe_timeout` is how long a single call to ready_func may take before
+    it is considered failed. Intervals between probes never exceed
+    `max_interval`, so a long sleep can't overshoot the moment the process
+    becomes ready by much.
+    """
+
+    def __init__(self, probe_timeout=5, max_interval=1):
+        self.probe_timeout = probe_timeout
+        self.max_interval = max_interval
+
+    def _intervals(self):
+        """
+        Yield successive, uncapped intervals in seconds
+        """
+        raise NotImplementedError
+
+    def intervals(self):
+        """
+        Yield successive intervals in seconds, capped at max_interval
+        """
+        for interval in self._intervals():
+            yield min(interval, self.max_interval)
+
+
+class FixedInterval(ReadyStrategy):
+    """
+    Probe every `interval` seconds
+    """
+
+    def __init__(self, interval=0.1, **kwargs):
+        super().__init__(**kwargs)
+        self.interval = interval
+
+    def _intervals(self):
+        return itertools.repeat(self.interval)
+
+
+class ExponentialBackoff(ReadyStrategy):
+    """
+    Start probing every `initial` seconds & multiply the interval by `factor`
+    after every probe.
+    """
+
+    def __init__(self, initial=0.01, factor=2, **kwargs):
+        super().__init__(**kwargs)
+        self.initial = initial
+        self.factor = factor
+
+    def _intervals(self):
+        interval = self.initial
+        while True:
+            yield interval
+            # Stop growing once we're capped, so this can't overflow
+            if interval < self.max_interval:
+                interval *= self.factor
+
+
+class JitteredBackoff(ExponentialBackoff):
+    """
+    Exponential backoff with up to `jitter` (a fraction) of each interval
+    randomly added or removed.
+
+    Useful to spread out probes when many processes start at the same time.
+    """
+
+    def __init__(self, jitter=0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.jitter = jitter
+
+    def _intervals(self):
+        for interval in super()._intervals():
+            yield interval * (1 + random.uniform(-self.jitter, self.jitter))
@@ -0,0 +1,276 @@
+"""
+Resource limits & accounting for supervised processes, on Linux
+"""
+
+import errno
+import os
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_keyed(path):
+    """
+    Parse a cgroup file of `key value` lines into a dict
+    """
+    content = _read(path)
+    if content is None:
+        return {}
+    return dict(line.split(None, 1) for line in content.splitlines() if line)
+
+
+def find_own_cgroup():
+    """
+    Return the directory of the cgroup v2 we are in, or None
+    """
+    mounts = _read("/proc/self/mounts") or ""
+    mount_point = None
+    for line in mounts.splitlines():
+        fields = line.split()
+        if len(fields) > 2 and fields[2] == "cgroup2":
+            mount_point = fields[1]
+            break
+    if mount_point is None:
+        return None
+    for line in (_read("/proc/self/cgroup") or "").splitlines():
+        if line.startswith("0::"):
+            return os.path.join(mount_point, line[3:].lstrip("/"))
+    return None
+
+
+class Cgroup:
+    """
+    A cgroup v2 directory holding a single supervised child
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def create(cls, parent, name):
+        path = os.path.join(parent, name)
+        os.makedirs(path, exist_ok=True)
+        return cls(path)
+
+    def write(self, filename, value):
+        with open(os.path.join(self.path, filename), "w") as f:
+            f.write(str(value))
+
+    def add(self, pid):
+        self.write("cgroup.procs", pid)
+
+    def pids(self):
+        """
+        Return the pids of all processes in the cgroup
+        """
+        content = _read(os.path.join(self.path, "cgroup.procs")) or ""
+        return [int(pid) for pid in content.split()]
+
+    def populated(self):
+        """
+        Return True if any processes are left in the cgroup, or below it.
+
+        Returns None if that can't be told.
+        """
+        populated = _read_keyed(os.path.join(self.path, "cgroup.events")).get(
+            "populated"
+        )
+        return populated == "1" if populated is not None else None
+
+    def kill(self):
+        """
+        SIGKILL all processes in the cgroup at once (Linux >= 5.14)
+        """
+        self.write("cgroup.kill", 1)
+
+    def cpu_seconds(self):
+        """
+        Return the CPU time used by all processes that were in the cgroup
+        """
+        usage = _read_keyed(os.path.join(self.path, "cpu.stat")).get("usage_usec")
+        return int(usage) / 1e6 if usage is not None else None
+
+    def peak_memory(self):
+        """
+        Return the most memory the cgroup used at once, in bytes (Linux >= 5.19)
+        """
+        peak = _read(os.path.join(self.path, "memory.peak"))
+        return int(peak) if peak is not None else None
+
+    def oom_kills(self):
+        """
+        Return how many processes were killed for going over memory.max
+        """
+        events = _read_keyed(os.path.join(self.path, "memory.events"))
+        return int(events.get("oom_kill", 0))
+
+    def remove(self):
+        """
+        Remove the cgroup, once it has no processes left
+        """
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            pass
+
+
+class ResourceLimits:
+    """
+    Limits applied to each child process, right after it is started.
+
+    - `memory`: bytes of memory the child may use, as memory.max of its
+      cgroup. It is killed by the OOM killer if it uses more. Without a
+      cgroup, this falls back to RLIMIT_AS (address space), which makes
+      allocations fail instead.
+    - `cpu_weight`: relative share of CPU time, 1 - 10000 (default 100)
+    - `cpu_quota`: CPUs the child may use at most, e.g. 0.5 or 2
+    - `pids`: number of processes & threads the child may have
+    - `open_files`: number of file descriptors the child may have open
+    - `rlimits`: dict of any other `resource.RLIMIT_*` -> (soft, hard)
+
+    Each child gets its own cgroup v2 under `cgroup_parent`, which must be
+    delegated to us. With the default of "auto", our own cgroup is used if
+    it has the needed controllers available. If it has processes in it
+    (like ours), we first move into a `supervisor` leaf below it, since
+    cgroups with controllers enabled for their children can't have any.
+    Without a usable cgroup, only rlimits are applied.
+
+    Children are moved into their cgroup & have their rlimits set right
+    after they start, without a preexec_fn, which isn't safe with threads.
+    Whatever they do in that brief moment is unlimited.
+
+    With `restart_on_oom=False`, children killed for using too much memory
+    aren't restarted.
+    """
+
+    def __init__(
+        self,
+        memory=None,
+        cpu_weight=None,
+        cpu_quota=None,
+        pids=None,
+        open_files=None,
+        rlimits=None,
+        cgroup_parent="auto",
+        restart_on_oom=True,
+        cpu_period=100000,
+    ):
+        if resource is None or not hasattr(resource, "prlimit"):
+            raise ValueError("Resource limits are only supported on Linux")
+        self.memory = memory
+        self.cpu_weight = cpu_weight
+        self.cpu_quota = cpu_quota
+        self.cpu_period = cpu_period
+        self.pids = pids
+        self.open_files = open_files
+        self.rlimits = dict(rlimits or {})
+        self.cgroup_parent = cgroup_parent
+        self.restart_on_oom = restart_on_oom
+        # Resolved cgroup parent, False if there is none we can use
+        self._parent = None
+
+    def _controllers(self):
+        controllers = set()
+        if self.memory is not None:
+            controllers.add("memory")
+        if self.cpu_weight is not None or self.cpu_quota is not None:
+            controllers.add("cpu")
+        if self.pids is not None:
+            controllers.add("pids")
+        return controllers
+
+    def _enable_controllers(self, parent):
+        """
+        Enable the controllers we need for children of `parent`.
+
+        Returns False if they aren't available there.
+        """
+        controllers = self._controllers()
+        available = set(
+            (_read(os.path.join(parent, "cgroup.controllers")) or "").split()
+        )
+        if not controllers <= available:
+            return False
+        enabled = set(
+            (_read(os.path.join(parent, "cgroup.subtree_control")) or "").split()
+        )
+        missing = controllers - enabled
+        if not missing:
+            return True
+        subtree_control = " ".join(f"+{name}" for name in sorted(missing))
+        try:
+            Cgroup(parent).write("cgroup.subtree_control", subtree_control)
+        except OSError as e:
+            if e.errno != errno.EBUSY:
+                raise
+            # Processes in parent, so move them to a leaf of their own
+            leaf = Cgroup.create(parent, "supervisor")
+            for pid in Cgroup(parent).pids():
+                leaf.add(pid)
+            Cgroup(parent).write("cgroup.subtree_control", subtree_control)
+        return True
+
+    def get_cgroup_parent(self):
+        """
+        Return the cgroup directory to create child cgroups in, or None
+        """
+        if self._parent is None:
+            self._parent = False
+            if self.cgroup_parent == "auto":
+                parent = find_own_cgroup()
+                if parent is not None:
+                    try:
+                        if self._enable_controllers(parent):
+                            self._parent = parent
+                    except OSError:
+                        # Not delegated to us
+                        pass
+            elif self.cgroup_parent is not None:
+                if not self._enable_controllers(self.cgroup_parent):
+                    raise ValueError(
+                        f"Controllers {self._controllers()} aren't available in {self.cgroup_parent}"
+                    )
+                self._parent = self.cgroup_parent
+        return self._parent or None
+
+    def apply(self, pid, name):
+        """
+        Apply limits to process `pid`, returning the Cgroup it was put in.
+
+        Returns None if no cgroup could be used.
+        """
+        cgroup = None
+        parent = self.get_cgroup_parent()
+        rlimits = dict(self.rlimits)
+        if self.open_files is not None:
+            rlimits[resource.RLIMIT_NOFILE] = (self.open_files, self.open_files)
+
+        if parent is not None:
+            cgroup = Cgroup.create(parent, name)
+            if self.memory is not None:
+                cgroup.write("memory.max", self.memory)
+            if self.cpu_weight is not None:
+                cgroup.write("cpu.weight", self.cpu_weight)
+            if self.cpu_quota is not None:
+                quota = int(self.cpu_quota * self.cpu_period)
+                cgroup.write("cpu.max", f"{quota} {self.cpu_period}")
+            if self.pids is not None:
+                cgroup.write("pids.max", self.pids)
+            cgroup.add(pid)
+        elif self.memory is not None:
+            rlimits.setdefault(resource.RLIMIT_AS, (self.memory, self.memory))
+
+        for limit, value in rlimits.items():
+            resource.prlimit(pid, limit, value)
+        return cgroup
@@ -0,0 +1,90 @@
+"""
+Restart policies for supervised processes
+"""
+
+import random
+import time
+from collections import deque
+
+
+class RestartPolicy:
+    """
+    Decide whether & when a supervised process should be restarted.
+
+    Restarts are delayed with exponential backoff & jitter, so a process
+    that crashes on boot doesn't become a tight fork/exec loop. If more than
+    `max_restarts` restarts happen within `window` seconds, the policy trips
+    and no more restarts happen until `reset()` is called.
+    """
+
+    def __init__(
+        self,
+        initial_delay=0.1,
+        max_delay=30,
+        factor=2,
+        jitter=0.1,
+        max_restarts=10,
+        window=60,
+        reset_after=None,
+        history=10,
+    ):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        # Fraction of the delay that is randomly added or removed
+        self.jitter = jitter
+        self.max_restarts = max_restarts
+        self.window = window
+        # A process that stayed up this long is considered healthy again,
+        # and the backoff starts over from initial_delay.
+        self.reset_after = window if reset_after is None else reset_after
+
+        self.restart_count = 0
+        self.exit_codes = deque(maxlen=history)
+        self.tripped = False
+
+        self._failures = 0
+        self._restart_times = deque()
+
+    def record_exit(self, retcode, uptime=None):
+        """
+        Record that the process exited with `retcode` after `uptime` seconds.
+        """
+        self.exit_codes.append(retcode)
+        if uptime is not None and uptime >= self.reset_after:
+            self._failures = 0
+
+    def next_delay(self):
+        """
+        Register a restart & return how many seconds to wait before it.
+
+        Returns None if the policy has tripped, and the process should not be
+        restarted.
+        """
+        if self.tripped:
+            return None
+
+        now = time.monotonic()
+        while self._restart_times and now - self._restart_times[0] > self.window:
+            self._restart_times.popleft()
+        if len(self._restart_times) >= self.max_restarts:
+            self.tripped = True
+            return None
+
+        self._restart_times.append(now)
+        self.restart_count += 1
+
+        delay = min(self.max_delay, self.initial_delay * self.factor**self._failures)
+        if delay < self.max_delay:
+            self._failures += 1
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(delay, 0)
+
+    def reset(self):
+        """
+        Clear the tripped state & backoff, allowing restarts again.
+        """
+        self.tripped = False
+        self._failures = 0
+        self._restart_times.clear()
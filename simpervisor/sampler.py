@@ -0,0 +1,229 @@
+"""
+Sample CPU, memory & fd usage of many supervised processes cheaply
+"""
+
+import os
+import time
+from array import array
+
+from .procfs import CLOCK_TICKS
+from .timers import get_shared_timer
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class TimeSeries:
+    """
+    The last `size` (time, value) samples, kept in two fixed size arrays
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._times = array("d", bytes(8 * size))
+        self._values = array("d", bytes(8 * size))
+        self._pos = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, when, value):
+        self._times[self._pos] = when
+        self._values[self._pos] = value
+        self._pos = (self._pos + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+
+    def last(self):
+        """
+        Return the latest value, or None if there are no samples
+        """
+        if not self._count:
+            return None
+        return self._values[self._pos - 1]
+
+    def query(self, since=None):
+        """
+        Return (time, value) pairs, oldest first, taken at or after `since`
+        """
+        start = self._pos - self._count
+        samples = []
+        for i in range(start, self._pos):
+            when = self._times[i]
+            if since is None or when >= since:
+                samples.append((when, self._values[i]))
+        return samples
+
+
+class ProcessSamples:
+    """
+    Resource usage samples of one SupervisedProcess, as its `samples`.
+
+    Each metric is a TimeSeries with times from time.monotonic():
+
+    - `cpu_percent`: CPU time used since the previous sample, in percent of
+      one CPU
+    - `rss`: resident memory in bytes
+    - `fds`: open file descriptors, if counted
+    """
+
+    metrics = ("cpu_percent", "rss", "fds")
+
+    def __init__(self, history):
+        for metric in self.metrics:
+            setattr(self, metric, TimeSeries(history))
+
+    def query(self, metric, since=None):
+        """
+        Return (time, value) pairs of `metric` taken at or after `since`
+        """
+        if metric not in self.metrics:
+            raise KeyError(f"Unknown metric {metric}")
+        return getattr(self, metric).query(since)
+
+
+class _Files:
+    """
+    The /proc & cgroup files of one process, kept open between sweeps
+    """
+
+    def __init__(self, pid, cgroup):
+        self.pid = pid
+        self.cgroup = cgroup
+        self.fds = {}
+        self.last_cpu = None
+        self.last_time = None
+        paths = {
+            "stat": f"/proc/{pid}/stat",
+            "statm": f"/proc/{pid}/statm",
+        }
+        if cgroup is not None:
+            # Count the whole cgroup, including any grandchildren
+            paths["cpu.stat"] = os.path.join(cgroup.path, "cpu.stat")
+            paths["memory.current"] = os.path.join(cgroup.path, "memory.current")
+        for name, path in paths.items():
+            try:
+                self.fds[name] = os.open(path, os.O_RDONLY)
+            except OSError:
+                pass
+
+    def read(self, name):
+        fd = self.fds.get(name)
+        if fd is None:
+            return None
+        try:
+            return os.pread(fd, 4096, 0)
+        except OSError:
+            return None
+
+    def close(self):
+        for fd in self.fds.values():
+            os.close(fd)
+        self.fds = {}
+
+
+class ResourceSampler:
+    """
+    Sample resource usage of many processes from a single timer.
+
+    Every `interval` seconds, all added SupervisedProcesses that are running
+    are sampled in one sweep, and the last `history` samples are kept in
+    each process' `samples` (a ProcessSamples). The /proc/<pid>/stat &
+    statm files (or cpu.stat & memory.current of the process' cgroup) are
+    opened once per child & re-read with pread. Counting open fds lists
+    /proc/<pid>/fd, which costs more, so it can be turned off with
+    `count_fds=False`. Only supported on Linux.
+    """
+
+    def __init__(self, interval=1, history=300, count_fds=True):
+        self.interval = interval
+        self.history = history
+        self.count_fds = count_fds
+        self._processes = {}
+        self._timer = None
+
+    def add(self, process):
+        """
+        Start sampling `process`, giving it a `samples` attribute
+        """
+        if process.samples is None:
+            process.samples = ProcessSamples(self.history)
+        self._processes.setdefault(process, None)
+
+    def remove(self, process):
+        files = self._processes.pop(process, None)
+        if files is not None:
+            files.close()
+
+    def start(self):
+        """
+        Start sampling every `interval` seconds
+        """
+        if self._timer is None:
+            self._timer = get_shared_timer().schedule(self.interval, self.sample)
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for process in list(self._processes):
+            self.remove(process)
+
+    def _files(self, process):
+        files = self._processes[process]
+        if files is not None and (
+            files.pid != process.pid or files.cgroup is not process.cgroup
+        ):
+            # Restarted since the last sweep
+            files.close()
+            files = None
+        if files is None:
+            files = self._processes[process] = _Files(process.pid, process.cgroup)
+        return files
+
+    def sample(self):
+        """
+        Sample all running processes once
+        """
+        now = time.monotonic()
+        for process, files in self._processes.items():
+            if not process.running or process.pid is None:
+                if files is not None:
+                    files.close()
+                    self._processes[process] = None
+                continue
+            self._sample(process, self._files(process), now)
+
+    def _sample(self, process, files, now):
+        samples = process.samples
+        cpu = rss = None
+        cpu_stat = files.read("cpu.stat")
+        if cpu_stat is not None:
+            for line in cpu_stat.split(b"\n"):
+                if line.startswith(b"usage_usec "):
+                    cpu = int(line.split()[1]) / 1e6
+        else:
+            stat = files.read("stat")
+            if stat is not None:
+                fields = stat[stat.rindex(b")") + 2 :].split()
+                cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        memory = files.read("memory.current")
+        if memory is not None:
+            rss = int(memory)
+        else:
+            statm = files.read("statm")
+            if statm is not None:
+                rss = int(statm.split()[1]) * PAGE_SIZE
+
+        if cpu is not None:
+            if files.last_cpu is not None and now > files.last_time:
+                percent = (cpu - files.last_cpu) / (now - files.last_time) * 100
+                samples.cpu_percent.append(now, percent)
+            files.last_cpu = cpu
+            files.last_time = now
+        if rss is not None:
+            samples.rss.append(now, rss)
+        if self.count_fds:
+            try:
+                samples.fds.append(now, len(os.listdir(f"/proc/{process.pid}/fd")))
+            except OSError:
+                pass
@@ -0,0 +1,182 @@
+"""
+Write captured output of supervised processes to files
+"""
+
+import asyncio
+import gzip
+import os
+import shutil
+import time
+
+
+def _shift_and_compress(path, rotated, backup_count, compress):
+    """
+    Shift path.1 ... path.N up by one, and move `rotated` to path.1
+
+    Runs in a thread, since compressing can take a while.
+    """
+    suffix = ".gz" if compress else ""
+    oldest = f"{path}.{backup_count}{suffix}"
+    if os.path.exists(oldest):
+        os.remove(oldest)
+    for i in range(backup_count - 1, 0, -1):
+        source = f"{path}.{i}{suffix}"
+        if os.path.exists(source):
+            os.replace(source, f"{path}.{i + 1}{suffix}")
+
+    if backup_count < 1:
+        os.remove(rotated)
+    elif compress:
+        with open(rotated, "rb") as src, gzip.open(f"{path}.1.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+    else:
+        os.replace(rotated, f"{path}.1")
+
+
+class RotatingFileSink:
+    """
+    Write output captured by an OutputCapture directly to a file.
+
+    Output is buffered & written in batches of up to `flush_size` bytes, or
+    after `flush_interval` seconds. The file is rotated once it would grow
+    past `max_bytes`, and/or after it has been open for `rotate_interval`
+    seconds. Up to `backup_count` rotated files are kept as path.1, path.2,
+    ..., optionally gzipped. Rotated files are shifted & compressed in
+    `executor` (the event loop's default executor if None), off the loop.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_bytes=None,
+        rotate_interval=None,
+        backup_count=5,
+        compress=False,
+        flush_size=64 * 1024,
+        flush_interval=1,
+        streams=("stdout", "stderr"),
+        executor=None,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.compress = compress
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.streams = streams
+        self.executor = executor
+
+        self._fd = None
+        self._size = 0
+        self._opened_at = None
+        self._pending = []
+        self._pending_size = 0
+        self._flush_handle = None
+        self._rotations = 0
+        # Rotation jobs run one after the other, so backups are shifted in order
+        self._rotation_future = None
+
+    def attach(self, output):
+        """
+        Start writing output captured by `output`
+        """
+        output.add_chunk_listener(self.write)
+
+    def _open(self):
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._size = os.fstat(self._fd).st_size
+        self._opened_at = time.monotonic()
+
+    def write(self, stream, data):
+        """
+        Buffer `data` read from `stream`, to be written in the next batch
+        """
+        if stream not in self.streams:
+            return
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if self._pending_size >= self.flush_size:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.flush_interval, self.flush
+            )
+
+    def _should_rotate(self, size):
+        if self._size == 0:
+            return False
+        if self.max_bytes is not None and self._size + size > self.max_bytes:
+            return True
+        if self.rotate_interval is not None:
+            return time.monotonic() - self._opened_at >= self.rotate_interval
+        return False
+
+    def flush(self):
+        """
+        Write all buffered output to the file
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        data = b"".join(self._pending)
+        self._pending.clear()
+        self._pending_size = 0
+
+        if self._fd is None:
+            self._open()
+        if self._should_rotate(len(data)):
+            self.rotate()
+        os.write(self._fd, data)
+        self._size += len(data)
+
+    def rotate(self):
+        """
+        Start a new file, and shift & compress the current one in a thread
+        """
+        if self._fd is None:
+            return
+        os.close(self._fd)
+        # Move the file out of the way right away, so we can keep writing
+        self._rotations += 1
+        rotated = f"{self.path}.rotating-{os.getpid()}-{self._rotations}"
+        os.replace(self.path, rotated)
+        self._open()
+        self._rotation_future = asyncio.ensure_future(
+            self._finish_rotation(self._rotation_future, rotated)
+        )
+
+    async def _finish_rotation(self, previous, rotated):
+        if previous is not None:
+            try:
+                await previous
+            except Exception:
+                # Already reported by the previous rotation, still try ours
+                pass
+        await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            _shift_and_compress,
+            self.path,
+            rotated,
+            self.backup_count,
+            self.compress,
+        )
+
+    def close(self):
+        """
+        Write any buffered output & close the file
+        """
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    async def wait_rotated(self):
+        """
+        Wait for pending rotations to finish
+        """
+        if self._rotation_future is not None:
+            await asyncio.shield(self._rotation_future)
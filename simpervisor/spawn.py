@@ -0,0 +1,75 @@
+"""
+Helpers to make starting many child processes cheap
+"""
+
+import os
+from collections.abc import Mapping
+
+
+class EnvTemplate(Mapping):
+    """
+    An environment for child processes, built once & reused for each child.
+
+    Takes a snapshot of `base` (os.environ by default) with `overrides`
+    applied, so each child doesn't have to copy & decode os.environ again.
+    Values may contain placeholders like `{port}`, which render() fills in.
+    Can be passed as `env` to SupervisedProcess, or anything taking a
+    mapping. Treat it as read only.
+    """
+
+    def __init__(self, base=None, **overrides):
+        self._env = dict(os.environ if base is None else base)
+        self._env.update(overrides)
+        # Only these need to be looked at when filling in placeholders
+        self._templated = [key for key, value in self._env.items() if "{" in value]
+
+    def __getitem__(self, key):
+        return self._env[key]
+
+    def __iter__(self):
+        return iter(self._env)
+
+    def __len__(self):
+        return len(self._env)
+
+    def render(self, extra=None, substitutions=None):
+        """
+        Return the environment as a dict, with `extra` variables added.
+
+        `substitutions` maps placeholders to what they are replaced with.
+        """
+        env = {**self._env, **extra} if extra else dict(self._env)
+        if substitutions:
+            for key in self._templated:
+                value = env[key]
+                for placeholder, replacement in substitutions.items():
+                    value = value.replace(placeholder, replacement)
+                env[key] = value
+        return env
+
+
+def inheritable_fds():
+    """
+    Return the fds of this process that children would inherit.
+
+    Python creates fds non-inheritable (PEP 446), so this is usually just
+    0, 1 & 2. Anything else leaks into children started with
+    close_fds=False. Only supported where /proc/self/fd or /dev/fd exist.
+    """
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        try:
+            fds = [int(fd) for fd in os.listdir(fd_dir)]
+            break
+        except OSError:
+            continue
+    else:
+        return None
+    inheritable = []
+    for fd in fds:
+        try:
+            if os.get_inheritable(fd):
+                inheritable.append(fd)
+        except OSError:
+            # The fd listdir used, now closed
+            pass
+    return sorted(inheritable)
@@ -0,0 +1,121 @@
+"""
+Persist which processes are running, so a new supervisor can adopt them
+"""
+
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+
+from .procfs import process_start_time
+
+
+def command_hash(args):
+    """
+    Return a hash of the command a process was started with
+    """
+    return hashlib.sha256(json.dumps([str(arg) for arg in args]).encode()).hexdigest()
+
+
+class StateFile:
+    """
+    A JSON file recording the pid, start time, command hash & allocated
+    port of processes.
+
+    SupervisedProcesses given a StateFile record their children in it, and
+    adopt a still running child matching their name & command instead of
+    starting a new one. Many processes can share the same StateFile. Writes
+    go to a temporary file that is renamed over the old one, so a crash never
+    leaves a half written file behind.
+
+    Changes made on an event loop are written `save_delay` seconds later,
+    so starting & stopping many processes rewrites the file once rather than
+    once per change. Call flush() to write them right away. Pending changes
+    are also written when the supervisor exits.
+    """
+
+    def __init__(self, path, save_delay=0.1):
+        self.path = path
+        self.save_delay = save_delay
+        self._records = self._load()
+        self._dirty = False
+        self._save_handle = None
+        atexit.register(self.flush)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return records if isinstance(records, dict) else {}
+
+    def _schedule_save(self):
+        self._dirty = True
+        if self._save_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or not self.save_delay:
+            self.flush()
+            return
+        self._save_handle = loop.call_later(self.save_delay, self.flush)
+
+    def flush(self):
+        """
+        Write pending changes to the file now
+        """
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if self._dirty:
+            self._dirty = False
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._records, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, name):
+        """
+        Return the record of the process called `name`, or None
+        """
+        return self._records.get(name)
+
+    def record(self, name, pid, args, port=None):
+        """
+        Record that the process called `name` is running as `pid`
+        """
+        self._records[name] = {
+            "pid": pid,
+            "start_time": process_start_time(pid),
+            "command_hash": command_hash(args),
+            "port": port,
+        }
+        self._schedule_save()
+
+    def forget(self, name):
+        """
+        Forget the process called `name`, once it is no longer running
+        """
+        if self._records.pop(name, None) is not None:
+            self._schedule_save()
+
+    def find_running(self, name, args):
+        """
+        Return the pid of the still running process called `name`, if it was
+        started with `args`, or None.
+        """
+        record = self.get(name)
+        if record is None or record.get("command_hash") != command_hash(args):
+            return None
+        start_time = record.get("start_time")
+        if start_time is None or process_start_time(record["pid"]) != start_time:
+            # Gone, or the pid now belongs to some other process
+            return None
+        return record["pid"]
@@ -0,0 +1,119 @@
+"""
+A single event loop timer shared by many periodic callbacks
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import weakref
+
+# One SharedTimer per event loop, see get_shared_timer()
+_timers = weakref.WeakKeyDictionary()
+
+
+class TimerHandle:
+    """
+    Returned by SharedTimer.schedule, and used to cancel the callback
+    """
+
+    def __init__(self, callback, interval, periodic):
+        self.callback = callback
+        self.interval = interval
+        self.periodic = periodic
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class SharedTimer:
+    """
+    Run many callbacks from a single event loop timer.
+
+    Deadlines are kept in a heap, and only the earliest one has a timer
+    scheduled on the event loop. Deadlines are rounded up to `resolution`
+    seconds, so callbacks due around the same time run in the same wakeup.
+    Having N periodic callbacks costs one timer instead of N sleeping tasks.
+    """
+
+    def __init__(self, loop=None, resolution=0.05):
+        self.loop = loop or asyncio.get_running_loop()
+        self.resolution = resolution
+        self._heap = []
+        # Tie breaker, so the heap never compares handles
+        self._counter = itertools.count()
+        self._timer = None
+        self._timer_deadline = None
+
+    def __len__(self):
+        return sum(1 for _, _, handle in self._heap if not handle.cancelled)
+
+    def _round(self, when):
+        return math.ceil(when / self.resolution) * self.resolution
+
+    def schedule(self, interval, callback, periodic=True):
+        """
+        Call `callback()` every `interval` seconds (or once if not `periodic`).
+
+        Callbacks run on the event loop & should not block. Returns a
+        TimerHandle that can be cancelled.
+        """
+        handle = TimerHandle(callback, interval, periodic)
+        self._push(self.loop.time() + interval, handle)
+        return handle
+
+    def _push(self, when, handle):
+        when = self._round(when)
+        heapq.heappush(self._heap, (when, next(self._counter), handle))
+        if self._timer_deadline is None or when < self._timer_deadline:
+            self._arm(when)
+
+    def _arm(self, when):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self.loop.call_at(when, self._run)
+        self._timer_deadline = when
+
+    def _run(self):
+        self._timer = None
+        self._timer_deadline = None
+        now = self.loop.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, handle = heapq.heappop(self._heap)
+            if not handle.cancelled:
+                due.append(handle)
+
+        for handle in due:
+            if handle.periodic:
+                self._push(now + handle.interval, handle)
+            try:
+                handle.callback()
+            except Exception as e:
+                self.loop.call_exception_handler(
+                    {"message": "Exception in SharedTimer callback", "exception": e}
+                )
+
+        # Throw away cancelled handles at the top, so we don't wake up for them.
+        # Handles pushed above armed the timer for themselves, which may be
+        # later than what was already waiting, so always arm for the earliest.
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        if self._heap:
+            self._arm(self._heap[0][0])
+        elif self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._timer_deadline = None
+
+
+def get_shared_timer():
+    """
+    Return the SharedTimer for the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    timer = _timers.get(loop)
+    if timer is None:
+        timer = _timers[loop] = SharedTimer(loop)
+    return timer
@@ -0,0 +1,12 @@
+"""
+Greet connections on the listening socket inherited from our supervisor
+"""
+
+import os
+import socket
+
+sock = socket.socket(fileno=int(os.environ["SIMPERVISOR_LISTEN_FD"]))
+while True:
+    conn, _ = sock.accept()
+    conn.sendall(f"hello from {os.getpid()} on {os.environ['PORT']}".encode())
+    conn.close()
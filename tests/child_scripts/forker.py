@@ -0,0 +1,27 @@
+"""
+Start a grandchild, write its pid to a file, and sleep or exit
+"""
+
+import signal
+import subprocess
+import sys
+import time
+
+pidfile, mode = sys.argv[1], sys.argv[2]
+grandchild = subprocess.Popen(
+    [
+        sys.executable,
+        "-c",
+        # Optionally ignore SIGTERM, like a stubborn worker
+        f"import signal, time; {'signal.signal(signal.SIGTERM, signal.SIG_IGN); ' if mode == 'stubborn' else ''}time.sleep(600)",
+    ]
+)
+with open(pidfile, "w") as f:
+    f.write(str(grandchild.pid))
+
+if mode == "exit":
+    # Leave our grandchild behind
+    sys.exit(0)
+if mode == "stubborn":
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+time.sleep(600)
@@ -0,0 +1,24 @@
+"""
+Send sd_notify style messages to $NOTIFY_SOCKET after waiting a while
+"""
+
+import os
+import socket
+import sys
+import time
+
+wait_time = float(sys.argv[1])
+
+address = os.environ["NOTIFY_SOCKET"]
+if address.startswith("@"):
+    # Abstract socket
+    address = "\0" + address[1:]
+
+sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+sock.sendto(b"STATUS=starting", address)
+time.sleep(wait_time)
+sock.sendto(f"READY=1\nSTATUS=serving\nMAINPID={os.getpid()}".encode(), address)
+
+while True:
+    time.sleep(0.1)
+    sock.sendto(b"WATCHDOG=1", address)
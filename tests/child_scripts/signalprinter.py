@@ -14,9 +14,17 @@ def _handle_sigterm(number, received_signum):
     print(f"handler {number} received", int(received_signum), flush=True)
 
 
+async def _handle_sigterm_async(number, received_signum):
+    # Yield to the event loop once, to make sure we're really run as a coroutine
+    await asyncio.sleep(0)
+    _handle_sigterm(number, received_signum)
+
+
 handlercount = int(sys.argv[1])
+use_async = len(sys.argv) > 2 and sys.argv[2] == "async"
 for i in range(handlercount):
-    add_handler(partial(_handle_sigterm, i))
+    handler = _handle_sigterm_async if use_async else _handle_sigterm
+    add_handler(partial(handler, i))
 
 loop = asyncio.get_event_loop()
 try:
@@ -0,0 +1,23 @@
+"""
+Start a child process recorded in a state file, and exit on SIGTERM
+"""
+
+import asyncio
+import sys
+
+from simpervisor import StateFile, SupervisedProcess
+
+
+async def main():
+    proc = SupervisedProcess(
+        "sleeper",
+        *[sys.executable, "-c", "import time; time.sleep(600)"],
+        state_file=StateFile(sys.argv[1]),
+        start_new_session=True,
+    )
+    await proc.start()
+    print(proc.pid, flush=True)
+    await asyncio.Event().wait()
+
+
+asyncio.run(main())
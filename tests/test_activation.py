@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from simpervisor import SocketActivator, SupervisedProcess
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="Passing sockets isn't supported on Windows"
+)
+
+FDSERVER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "child_scripts", "fdserver.py"
+)
+
+
+async def _read(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = await reader.read()
+    writer.close()
+    return data.decode()
+
+
+async def test_lazy_activation():
+    """
+    Processes are started by their first connection, which isn't lost
+    """
+    proc = SupervisedProcess("fdserver", sys.executable, FDSERVER, listen_socket=True)
+    activator = SocketActivator(proc)
+    port = activator.activate()
+    try:
+        await asyncio.sleep(0.2)
+        assert not proc.running
+
+        # Connect before the process even exists
+        assert await asyncio.wait_for(_read(port), 10) == (
+            f"hello from {proc.pid} on {port}"
+        )
+        await activator.wait_started()
+        assert proc.running
+        assert activator._watching is None
+    finally:
+        activator.deactivate()
+        await proc.terminate()
+
+
+async def test_eager_activation():
+    """
+    Processes can also be started right away
+    """
+    proc = SupervisedProcess("fdserver", sys.executable, FDSERVER, listen_socket=True)
+    activator = SocketActivator(proc, lazy=False)
+    port = activator.activate()
+    await activator.wait_started()
+    try:
+        assert proc.running
+        assert await _read(port) == f"hello from {proc.pid} on {port}"
+    finally:
+        await proc.terminate()
+
+
+def test_needs_listen_socket():
+    with pytest.raises(ValueError):
+        SocketActivator(SupervisedProcess("fdserver", sys.executable, FDSERVER))
@@ -8,19 +8,21 @@ import pytest
 
 
 @pytest.mark.parametrize(
-    "signum, handlercount",
+    "signum, handlercount, mode",
     [
-        (signal.SIGTERM, 1),
-        (signal.SIGINT, 1),
-        (signal.SIGTERM, 5),
-        (signal.SIGINT, 5),
+        (signal.SIGTERM, 1, "sync"),
+        (signal.SIGINT, 1, "sync"),
+        (signal.SIGTERM, 5, "sync"),
+        (signal.SIGINT, 5, "sync"),
+        (signal.SIGTERM, 5, "async"),
+        (signal.SIGINT, 5, "async"),
     ],
 )
 @pytest.mark.skipif(
     sys.platform == "win32",
     reason="Testing signals on Windows doesn't seem to be possible",
 )
-def test_atexitasync(signum, handlercount):
+def test_atexitasync(signum, handlercount, mode):
     """
     Test signal handlers receive signals properly
     """
@@ -28,7 +30,7 @@ def test_atexitasync(signum, handlercount):
         os.path.dirname(os.path.abspath(__file__)), "child_scripts", "signalprinter.py"
     )
     proc = subprocess.Popen(
-        [sys.executable, signalprinter_file, str(handlercount)],
+        [sys.executable, signalprinter_file, str(handlercount), mode],
         stdout=subprocess.PIPE,
         text=True,
     )
@@ -49,3 +51,19 @@ def test_atexitasync(signum, handlercount):
     # The code should exit cleanly
     retcode = proc.wait()
     assert retcode == 0
+
+
+def test_add_remove_handler():
+    """
+    Handlers can be added & removed in any order, and removal is idempotent
+    """
+    from simpervisor.atexitasync import _handlers, add_handler, remove_handler
+
+    handlers = [lambda signum: None for _ in range(3)]
+    for handler in handlers:
+        add_handler(handler)
+    remove_handler(handlers[1])
+    remove_handler(handlers[1])
+    assert [h for h in _handlers if h in handlers] == [handlers[0], handlers[2]]
+    for handler in handlers:
+        remove_handler(handler)
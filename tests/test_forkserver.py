@@ -0,0 +1,178 @@
+import asyncio
+import inspect
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+from simpervisor import OutputCapture, SupervisedProcess
+from simpervisor.forkserver import ForkServer, ForkServerProcess, get_forkserver
+from simpervisor.process import PidfdProcess
+
+pytestmark = pytest.mark.skipif(
+    not ForkServer.is_supported(), reason="Fork servers aren't supported here"
+)
+
+FDSERVER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "child_scripts", "fdserver.py"
+)
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+@pytest.fixture
+async def forkserver():
+    forkserver = get_forkserver()
+    forkserver.start()
+    yield forkserver
+    forkserver.close()
+
+
+async def test_exit_code_and_streams(forkserver):
+    """
+    Children are started by the helper, with pipes & exit codes passed back
+    """
+    proc = ForkServerProcess(
+        *python(
+            "import os, sys\n"
+            "print(os.getppid())\n"
+            "sys.stderr.write(sys.stdin.read())\n"
+            "sys.exit(3)"
+        ),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    await proc.start()
+    proc.stdin.write(b"error")
+    proc.stdin.close()
+    assert int(await proc.stdout.read()) == forkserver.pid
+    assert await proc.stderr.read() == b"error"
+    assert await asyncio.wait_for(proc.wait(), 5) == 3
+    assert proc.returncode == 3
+    with pytest.raises(ProcessLookupError):
+        proc.send_signal(signal.SIGTERM)
+
+
+async def test_spawn_errors(forkserver):
+    """
+    Errors starting children are raised like by subprocess
+    """
+    with pytest.raises(FileNotFoundError):
+        await ForkServerProcess("/does/not/exist").start()
+    with pytest.raises(ValueError):
+        await ForkServerProcess("true", preexec_fn=os.getpid).start()
+    with pytest.raises(ValueError):
+        await ForkServerProcess("true", env={"BIG": "x" * (1 << 20)}).start()
+    with pytest.raises(ValueError):
+        await ForkServerProcess("true", pass_fds=range(3, 100)).start()
+    # Requests that do get too large for the helper are answered, not fatal
+    reply = forkserver._spawns[12345] = asyncio.get_running_loop().create_future()
+    fds = [os.dup(0) for _ in range(100)]
+    try:
+        await forkserver._send(b'{"id": 12345}', fds)
+    finally:
+        for fd in fds:
+            os.close(fd)
+    message, _, _ = await asyncio.wait_for(reply, 5)
+    del forkserver._spawns[12345]
+    assert message["message"] == "Request too large"
+    # The helper is still usable
+    proc = ForkServerProcess("true")
+    await proc.start()
+    assert await proc.wait() == 0
+
+
+async def test_restart_and_kill(forkserver):
+    """
+    Processes are restarted, killed & have their output captured as usual
+    """
+    output = OutputCapture()
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *python("import os, time; print(os.getppid(), flush=True); time.sleep(0.1)"),
+        always_restart=True,
+        process_class=ForkServerProcess,
+        output=output,
+    )
+    await proc.start()
+    first_pid = proc.pid
+    await asyncio.sleep(1)
+    assert proc.running
+    assert proc.pid != first_pid
+
+    await proc.kill()
+    assert proc.returncode == -signal.SIGKILL
+    assert not psutil.pid_exists(proc.pid)
+    # All started by the helper
+    parents = output.getvalue("stdout").split()
+    assert len(parents) > 1
+    assert set(parents) == {str(forkserver.pid).encode()}
+
+
+async def test_pass_fds(forkserver):
+    """
+    Passed fds end up at the same numbers in the child
+    """
+    proc = SupervisedProcess(
+        "fdserver",
+        sys.executable,
+        FDSERVER,
+        listen_socket=True,
+        process_class=ForkServerProcess,
+    )
+    await proc.start()
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", proc.port)
+        data = await reader.read()
+        writer.close()
+        assert data.decode() == f"hello from {proc.pid} on {proc.port}"
+    finally:
+        await proc.terminate()
+
+
+@pytest.mark.skipif(
+    not PidfdProcess.is_supported(), reason="pidfds aren't supported here"
+)
+async def test_helper_exit(forkserver):
+    """
+    Children of a helper that died are still watched, & a new helper is
+    started for the next child
+    """
+    proc = ForkServerProcess("sleep", "600")
+    await proc.start()
+    helper = forkserver.pid
+    os.kill(helper, signal.SIGKILL)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(proc.wait(), 0.5)
+    proc.send_signal(signal.SIGKILL)
+    assert await asyncio.wait_for(proc.wait(), 5) == ForkServer.unknown_returncode
+
+    proc = ForkServerProcess("true")
+    await proc.start()
+    assert forkserver.pid != helper
+    assert await proc.wait() == 0
+
+
+async def test_close_reaps_helper():
+    """
+    Closing doesn't block the event loop, & the helper is still reaped
+    """
+    forkserver = get_forkserver()
+    forkserver.start()
+    helper = forkserver._helper
+    start_time = time.monotonic()
+    forkserver.close()
+    assert time.monotonic() - start_time < 0.05
+    assert forkserver.pid is None
+    for _ in range(100):
+        if helper.returncode is not None:
+            break
+        await asyncio.sleep(0.05)
+    assert helper.returncode == 0
@@ -0,0 +1,114 @@
+import asyncio
+import inspect
+import sys
+
+import psutil
+import pytest
+
+from simpervisor import ProcessGroup, RestartPolicy, StopResult, SupervisedProcess
+from simpervisor.atexitasync import _handlers
+
+
+def sleep_forever():
+    return [sys.executable, "-c", "import time; time.sleep(600)"]
+
+
+def make_group(count, **kwargs):
+    name = inspect.stack()[1].function
+    group = ProcessGroup(**kwargs)
+    for i in range(count):
+        group.add(SupervisedProcess(f"{name}-{i}", *sleep_forever()))
+    return group
+
+
+@pytest.mark.parametrize("concurrency", [None, 2])
+async def test_start_terminate_all(concurrency):
+    """
+    Start & terminate all processes in a group
+    """
+    group = make_group(5, concurrency=concurrency)
+    await group.start_all()
+    pids = [p.pid for p in group]
+    assert all(p.running for p in group)
+
+    await group.terminate_all()
+    assert not any(p.running for p in group)
+    assert not any(psutil.pid_exists(pid) for pid in pids)
+
+
+async def test_kill_all():
+    """
+    Kill all processes in a group
+    """
+    group = make_group(3)
+    await group.start_all()
+    await group.kill_all()
+    assert not any(p.running for p in group)
+
+
+async def test_terminate_restarting():
+    """
+    Processes waiting to be restarted aren't restarted after terminate_all()
+    """
+    group = ProcessGroup()
+    crasher = SupervisedProcess(
+        "test_terminate_restarting",
+        sys.executable,
+        "-c",
+        "import sys; sys.exit(1)",
+        restart_policy=RestartPolicy(initial_delay=0.5, jitter=0),
+    )
+    group.add(crasher)
+    await group.start_all()
+    for _ in range(100):
+        if not crasher.running:
+            break
+        await asyncio.sleep(0.01)
+    await group.terminate_all()
+    assert crasher._killed
+    await asyncio.sleep(1)
+    assert crasher.metrics.starts == 1
+    assert not crasher.running
+
+
+async def test_lookup():
+    """
+    Processes can be looked up by name, and names must be unique
+    """
+    group = make_group(2)
+    first = group["test_lookup-0"]
+    assert "test_lookup-1" in group
+    assert group.get("missing") is None
+    assert len(group) == 2
+
+    with pytest.raises(ValueError):
+        group.add(SupervisedProcess("test_lookup-0", *sleep_forever()))
+
+    assert group.remove("test_lookup-0") is first
+    assert "test_lookup-0" not in group
+
+
+async def test_single_signal_handler():
+    """
+    Running processes in a group don't register signal handlers of their own
+    """
+    group = make_group(3)
+    await group.start_all()
+    try:
+        assert group._handle_signal in _handlers
+        for p in group:
+            assert p._handle_signal not in _handlers
+    finally:
+        await group.terminate_all()
+
+
+async def test_stop_all():
+    """
+    Stop all processes in a group & report how they exited
+    """
+    group = make_group(3, concurrency=2)
+    await group.start_all()
+    results = await group.stop_all(grace_period=5)
+    assert results == {p.name: StopResult.GRACEFUL for p in group}
+    assert not any(p.running for p in group)
+    assert set((await group.stop_all()).values()) == {StopResult.ALREADY_DEAD}
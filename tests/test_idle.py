@@ -0,0 +1,137 @@
+import asyncio
+import itertools
+import os
+import sys
+
+import pytest
+
+from simpervisor import IdlePolicy, SocketActivator, SupervisedProcess
+from simpervisor.procfs import process_cpu_time
+
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(600)"]
+FDSERVER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "child_scripts", "fdserver.py"
+)
+needs_proc = pytest.mark.skipif(
+    process_cpu_time(os.getpid()) is None, reason="Needs /proc"
+)
+
+
+async def _wait_for(condition, timeout=5):
+    for _ in range(int(timeout / 0.05)):
+        if condition():
+            return True
+        await asyncio.sleep(0.05)
+    return condition()
+
+
+def test_needs_activity_source():
+    with pytest.raises(ValueError):
+        IdlePolicy(10)
+
+
+async def test_activity_func():
+    """
+    Processes are active when the value activity_func returns changes
+    """
+    values = iter([1, 1, 2, 2])
+    policy = IdlePolicy(10, activity_func=lambda p: next(values))
+    state = {}
+    assert [await policy.check(None, state) for _ in range(4)] == [
+        False,
+        False,
+        True,
+        False,
+    ]
+
+
+async def test_idle_stop_and_restart():
+    """
+    Idle processes are stopped, and can be started again
+    """
+    proc = SupervisedProcess(
+        "sleeper",
+        *SLEEPER,
+        idle=IdlePolicy(0.3, activity_func=lambda p: 0, interval=0.05),
+    )
+    await proc.start()
+    first_pid = proc.pid
+    assert await _wait_for(lambda: proc.idle_stopped)
+    assert not proc.running
+
+    await proc.start()
+    assert proc.running
+    assert not proc.idle_stopped
+    assert proc.pid != first_pid
+    await proc.terminate()
+
+
+async def test_active_keeps_running():
+    """
+    Processes that keep being active are left alone
+    """
+    counter = itertools.count()
+    proc = SupervisedProcess(
+        "sleeper",
+        *SLEEPER,
+        idle=IdlePolicy(0.2, activity_func=lambda p: next(counter), interval=0.05),
+    )
+    await proc.start()
+    await asyncio.sleep(0.6)
+    assert proc.running
+    await proc.terminate()
+    assert not proc.idle_stopped
+
+
+@needs_proc
+async def test_cpu_threshold():
+    """
+    Processes using CPU are active, sleeping ones are idle
+    """
+    idle = IdlePolicy(0.5, cpu_threshold=0.01, interval=0.1)
+    busy = SupervisedProcess(
+        "busy", sys.executable, "-c", "while True: pass", idle=idle
+    )
+    sleeper = SupervisedProcess("sleeper", *SLEEPER, idle=idle)
+    await busy.start()
+    await sleeper.start()
+    try:
+        assert await _wait_for(lambda: sleeper.idle_stopped)
+        assert busy.running
+    finally:
+        await busy.terminate()
+        await sleeper.terminate()
+
+
+async def _read(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = await reader.read()
+    writer.close()
+    return data.decode()
+
+
+@needs_proc
+async def test_reactivate_after_idle():
+    """
+    Socket activated processes are started again on the next connection
+    """
+    proc = SupervisedProcess(
+        "fdserver",
+        sys.executable,
+        FDSERVER,
+        listen_socket=True,
+        idle=IdlePolicy(0.3, connections=True, interval=0.05),
+    )
+    activator = SocketActivator(proc)
+    port = activator.activate()
+    try:
+        assert (await _read(port)).startswith("hello from")
+        first_pid = proc.pid
+        assert await _wait_for(lambda: proc.idle_stopped)
+
+        assert await _read(port) == f"hello from {proc.pid} on {port}"
+        assert proc.pid != first_pid
+        assert proc.port == port
+    finally:
+        activator.deactivate()
+        await proc.terminate()
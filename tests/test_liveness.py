@@ -0,0 +1,115 @@
+import asyncio
+import inspect
+import os
+import sys
+
+import psutil
+import pytest
+
+from simpervisor import LivenessCheck, SupervisedProcess
+
+notifier_file = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "child_scripts", "notifier.py"
+)
+
+
+def hang(ignore_sigterm=False):
+    """
+    A process that never exits on its own, optionally ignoring SIGTERM
+    """
+    code = "import signal, time\n"
+    if ignore_sigterm:
+        code += "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+    code += "print('started', flush=True)\ntime.sleep(600)"
+    return [sys.executable, "-c", code]
+
+
+async def _always_ready(p):
+    return True
+
+
+async def wait_for_new_pid(proc, old_pid, timeout=10):
+    for _ in range(int(timeout / 0.1)):
+        if proc.running and proc.pid != old_pid:
+            return True
+        await asyncio.sleep(0.1)
+    return False
+
+
+@pytest.mark.parametrize("ignore_sigterm", [False, True])
+async def test_hung_process_restarted(ignore_sigterm):
+    """
+    A process failing its liveness checks is killed & restarted
+    """
+    alive = True
+
+    async def _liveness_func(p):
+        return alive
+
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *hang(ignore_sigterm),
+        ready_func=_always_ready,
+        liveness=LivenessCheck(
+            _liveness_func, interval=0.1, failures=2, kill_timeout=0.5
+        ),
+    )
+    await proc.start()
+    try:
+        assert await proc.ready()
+        first_pid = proc.pid
+        await asyncio.sleep(0.5)
+        assert proc.pid == first_pid
+
+        alive = False
+        assert await wait_for_new_pid(proc, first_pid)
+        alive = True
+        assert not psutil.pid_exists(first_pid)
+    finally:
+        await proc.kill()
+
+
+async def test_liveness_timeout():
+    """
+    A liveness check that doesn't return in time counts as a failure
+    """
+
+    async def _liveness_func(p):
+        await asyncio.sleep(10)
+
+    check = LivenessCheck(_liveness_func, timeout=0.1)
+    assert not await check.check(None, 0)
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32",
+    reason="Unix datagram sockets aren't available on Windows",
+)
+async def test_watchdog():
+    """
+    Processes sending WATCHDOG=1 are considered alive
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        notifier_file,
+        "0",
+        notify=True,
+        liveness=LivenessCheck(watchdog=True, interval=0.5, failures=1),
+    )
+    await proc.start()
+    try:
+        assert await proc.ready()
+        first_pid = proc.pid
+        await asyncio.sleep(2)
+        assert proc.pid == first_pid
+        assert proc.notify_socket.last_watchdog is not None
+    finally:
+        await proc.kill()
+
+
+def test_watchdog_needs_notify():
+    with pytest.raises(ValueError):
+        SupervisedProcess(
+            "watchdog", *hang(), liveness=LivenessCheck(watchdog=True, interval=1)
+        )
@@ -0,0 +1,112 @@
+import asyncio
+import inspect
+import sys
+
+from simpervisor import SupervisedProcess
+from simpervisor.metrics import Histogram, to_prometheus
+
+
+def sleep(retcode=0, time=0.1):
+    return [
+        sys.executable,
+        "-c",
+        f"import sys, time; time.sleep({time}); sys.exit({retcode})",
+    ]
+
+
+def test_histogram():
+    histogram = Histogram(buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    assert list(histogram.cumulative()) == [(1, 2), (5, 3), (float("inf"), 4)]
+    assert histogram.sum == 14.5
+    assert histogram.count == 4
+
+
+async def test_process_metrics_and_hooks():
+    """
+    Metrics are recorded & hooks called over a process' lifetime
+    """
+    events = []
+
+    async def _ready_func(p):
+        return True
+
+    async def _on_exit(p, retcode):
+        events.append(("exit", retcode))
+
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *sleep(1, 0.2),
+        always_restart=True,
+        ready_func=_ready_func,
+        on_start=lambda p: events.append("start"),
+        on_ready=lambda p: events.append("ready"),
+        on_restart=lambda p: events.append("restart"),
+        on_exit=_on_exit,
+    )
+    await proc.start()
+    assert await proc.ready()
+    for _ in range(50):
+        if proc.metrics.restarts:
+            break
+        await asyncio.sleep(0.1)
+    await proc.kill()
+
+    assert events[:5] == ["start", "ready", ("exit", 1), "restart", "start"]
+    assert events[-1][0] == "exit"
+    metrics = proc.metrics
+    assert metrics.starts == 2
+    assert metrics.restarts == 1
+    assert metrics.exit_codes[1] == 1
+    assert sum(metrics.exit_codes.values()) == 2
+    assert metrics.spawn_seconds.count == 2
+    assert metrics.ready_seconds.count == 1
+    assert metrics.ready_probes.sum == 1
+    assert metrics.lock_wait_seconds.count == 3
+    assert metrics.uptime == 0
+
+
+async def test_failing_hooks(caplog):
+    """
+    Exceptions from hooks are logged, & don't stop restarts or cleanup
+    """
+    starts = []
+
+    def _on_start(p):
+        starts.append(p.pid)
+        raise RuntimeError("oops")
+
+    async def _on_exit(p, retcode):
+        raise RuntimeError("oops")
+
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *sleep(1, 0.1),
+        always_restart=True,
+        on_start=_on_start,
+        on_exit=_on_exit,
+    )
+    await proc.start()
+    for _ in range(50):
+        if proc.metrics.restarts:
+            break
+        await asyncio.sleep(0.1)
+    assert proc.metrics.restarts
+    await proc.kill()
+    assert not proc.running
+    assert len(starts) >= 2
+    assert "Hook" in caplog.text
+
+
+async def test_prometheus():
+    proc = SupervisedProcess('quote"d', *sleep(0, 600))
+    await proc.start()
+    text = to_prometheus([proc])
+    await proc.kill()
+
+    assert "# TYPE simpervisor_spawn_seconds histogram" in text
+    assert 'simpervisor_spawn_seconds_bucket{process="quote\\"d",le="+Inf"} 1' in text
+    assert 'simpervisor_starts_total{process="quote\\"d"} 1' in text
+    assert 'simpervisor_up{process="quote\\"d"} 1' in text
+    assert text.endswith("\n")
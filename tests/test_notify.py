@@ -0,0 +1,110 @@
+import asyncio
+import inspect
+import os
+import socket
+import sys
+
+import pytest
+
+from simpervisor import SupervisedProcess
+from simpervisor.notify import NotifySocket
+
+notifier_file = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "child_scripts", "notifier.py"
+)
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32",
+    reason="Unix datagram sockets aren't available on Windows",
+)
+
+
+def test_handle_message():
+    """
+    Messages update the reported state
+    """
+    notify = NotifySocket()
+    notify.handle_message(b"STATUS=loading things\nMAINPID=42")
+    assert notify.status == "loading things"
+    assert notify.main_pid == 42
+    assert not notify.ready
+    assert notify.last_watchdog is None
+
+    notify.handle_message(b"READY=1\nWATCHDOG=1")
+    assert notify.ready
+    assert notify.last_watchdog is not None
+
+    notify.reset()
+    assert not notify.ready
+    assert notify.status is None
+
+
+async def test_notify_ready():
+    """
+    ready() completes once the child sends READY=1
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        notifier_file,
+        "0.5",
+        notify=True,
+    )
+    try:
+        await proc.start()
+        assert await proc.ready()
+        assert proc.ready_probes == 1
+        assert 0.5 <= proc.time_to_ready < 2
+        assert proc.notify_socket.status == "serving"
+        assert proc.notify_socket.main_pid == proc.pid
+    finally:
+        await proc.kill()
+    assert proc.notify_socket._sock is None
+
+
+async def test_notify_timeout():
+    """
+    ready() times out if the child never sends READY=1
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        notifier_file,
+        "600",
+        notify=True,
+        ready_timeout=0.5,
+    )
+    try:
+        await proc.start()
+        assert not await proc.ready()
+        assert proc.notify_socket.status == "starting"
+    finally:
+        await proc.kill()
+
+
+@pytest.mark.skipif(
+    not hasattr(socket, "SO_PASSCRED"), reason="Senders aren't known here"
+)
+async def test_notify_other_sender():
+    """
+    Messages from processes other than the child are ignored
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        notifier_file,
+        "600",
+        notify=True,
+        ready_timeout=0.5,
+    )
+    try:
+        await proc.start()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(b"READY=1", "\0" + proc.notify_socket.address[1:])
+        await asyncio.sleep(0.1)
+        assert not proc.notify_socket.ready
+        assert not await proc.ready()
+        # The child's own messages still get through
+        assert proc.notify_socket.status == "starting"
+    finally:
+        await proc.kill()
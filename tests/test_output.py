@@ -0,0 +1,190 @@
+import asyncio
+import inspect
+import sys
+
+import pytest
+
+from simpervisor import OutputCapture, SupervisedProcess
+from simpervisor.output import RingBuffer
+from simpervisor.probes import LineProbe
+from simpervisor.process import PidfdProcess
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="Capturing output isn't supported on Windows"
+)
+
+
+def python(code):
+    return [sys.executable, "-u", "-c", code]
+
+
+@pytest.mark.parametrize(
+    "writes, expected",
+    [
+        ([b"abc"], b"abc"),
+        ([b"abcd", b"ef"], b"cdef"),
+        ([b"ab", b"cd", b"efg"], b"defg"),
+        ([b"abcdefgh"], b"efgh"),
+        ([b"a", b"bcdefgh"], b"efgh"),
+    ],
+)
+def test_ring_buffer(writes, expected):
+    buffer = RingBuffer(4)
+    for data in writes:
+        buffer.write(data)
+    assert buffer.getvalue() == expected
+    assert len(buffer) == len(expected)
+
+
+async def wait_for_exit(proc, timeout=10):
+    for _ in range(int(timeout / 0.05)):
+        if not proc.running:
+            return
+        await asyncio.sleep(0.05)
+    raise TimeoutError(f"{proc.name} is still running")
+
+
+async def test_chatty_process():
+    """
+    A process writing lots of output isn't blocked, and only its tail is kept
+    """
+    output = OutputCapture(buffer_size=1024)
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *python(
+            "import sys\n"
+            "for i in range(100000): print(i)\n"
+            "print('error', file=sys.stderr)"
+        ),
+        output=output,
+    )
+    await proc.start()
+    await wait_for_exit(proc)
+    await output.wait_closed()
+
+    stdout = output.getvalue("stdout")
+    assert len(stdout) == 1024
+    assert stdout.endswith(b"99998\n99999\n")
+    assert output.getvalue("stderr") == b"error\n"
+
+
+async def test_line_callback():
+    """
+    Lines are passed to the callback, including a last line without newline
+    """
+    lines = []
+
+    async def _line_callback(stream, line):
+        await asyncio.sleep(0)
+        lines.append((stream, line))
+
+    output = OutputCapture(line_callback=_line_callback, chunk_size=3)
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *python("import sys; sys.stdout.write('first\\nsecond line\\nlast')"),
+        output=output,
+    )
+    await proc.start()
+    await wait_for_exit(proc)
+    await output.wait_closed()
+    assert lines == [
+        ("stdout", b"first\n"),
+        ("stdout", b"second line\n"),
+        ("stdout", b"last"),
+    ]
+
+
+async def test_failing_callbacks(caplog):
+    """
+    Exceptions from callbacks & listeners are logged, & output is still read
+    """
+
+    def _fail(stream, data):
+        raise RuntimeError("oops")
+
+    output = OutputCapture(line_callback=_fail, chunk_size=1024)
+    output.add_chunk_listener(_fail)
+    output.add_line_listener(_fail)
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *python("for i in range(1000): print(i)"),
+        output=output,
+    )
+    await proc.start()
+    await wait_for_exit(proc)
+    await output.wait_closed()
+    assert output.getvalue("stdout").endswith(b"998\n999\n")
+    assert "Output line callback" in caplog.text
+    assert "Output chunk listener" in caplog.text
+    assert "Output line listener" in caplog.text
+
+
+async def test_capture_across_restarts():
+    """
+    Output of all runs of a process ends up in the same buffer
+    """
+    output = OutputCapture()
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *python("print('run')"),
+        always_restart=True,
+        output=output,
+    )
+    await proc.start()
+    for _ in range(100):
+        if output.getvalue().count(b"run") >= 3:
+            break
+        await asyncio.sleep(0.05)
+    await proc.kill()
+    assert output.getvalue().count(b"run\n") >= 3
+
+
+@pytest.mark.skipif(
+    not PidfdProcess.is_supported(), reason="pidfds aren't supported here"
+)
+async def test_restart_while_draining():
+    """
+    Lines of each run are kept apart, while pipes of earlier runs are still
+    held open by their children
+    """
+    lines = []
+    output = OutputCapture(line_callback=lambda stream, line: lines.append(line))
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *python(
+            "import subprocess, sys\n"
+            "subprocess.Popen(['sleep', '1'])\n"
+            "sys.stdout.write('run\\nstart of a line')"
+        ),
+        always_restart=True,
+        process_class=PidfdProcess,
+        output=output,
+    )
+    await proc.start()
+    for _ in range(100):
+        if len(lines) >= 6:
+            break
+        await asyncio.sleep(0.05)
+    await proc.kill()
+    await output.wait_closed()
+    assert not output._tasks
+    assert len(lines) >= 6
+    assert set(lines) == {b"run\n", b"start of a line"}
+
+
+async def test_line_probe_with_capture():
+    """
+    LineProbe watches lines read by the OutputCapture
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *python("import time; time.sleep(0.2); print('ready now'); time.sleep(600)"),
+        ready_func=LineProbe("ready now"),
+        output=OutputCapture(),
+    )
+    await proc.start()
+    try:
+        assert await proc.ready()
+        assert proc.output.getvalue() == b"ready now\n"
+    finally:
+        await proc.kill()
@@ -0,0 +1,97 @@
+import asyncio
+import inspect
+import signal
+import sys
+import threading
+
+import psutil
+import pytest
+
+from simpervisor import SupervisedProcess
+from simpervisor.process import PidfdProcess, POSIXProcess, WindowsProcess
+
+pytestmark = pytest.mark.skipif(
+    not PidfdProcess.is_supported(), reason="pidfds aren't supported here"
+)
+
+
+def sleep(retcode=0, time=0.1):
+    return [
+        sys.executable,
+        "-c",
+        f"import sys, time; time.sleep({time}); sys.exit({retcode})",
+    ]
+
+
+async def test_exit_code():
+    """
+    Exit codes are reported when the pidfd becomes readable
+    """
+    proc = PidfdProcess(*sleep(3))
+    await proc.start()
+    assert await asyncio.wait_for(proc.wait(), 5) == 3
+    assert proc.returncode == 3
+    with pytest.raises(ProcessLookupError):
+        proc.send_signal(signal.SIGTERM)
+
+
+async def test_restart_and_kill():
+    """
+    Processes are restarted & killed like with the default backend
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *sleep(0),
+        always_restart=True,
+        process_class=PidfdProcess,
+    )
+    threads = threading.active_count()
+    await proc.start()
+    first_pid = proc.pid
+    await asyncio.sleep(1)
+    assert proc.running
+    assert proc.pid != first_pid
+    # No helper threads are used to wait for children
+    assert threading.active_count() == threads
+
+    await proc.kill()
+    assert proc.returncode == -signal.SIGKILL
+    assert not psutil.pid_exists(proc.pid)
+
+
+async def test_stdout_stream():
+    """
+    Pipes are exposed as asyncio streams
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        "-c",
+        "print('hello')",
+        process_class=PidfdProcess,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    await proc.start()
+    assert await proc.proc.stdout.read() == b"hello\n"
+    assert await proc.proc.wait() == 0
+
+
+async def test_fallback():
+    """
+    Unsupported process classes fall back to the platform default
+    """
+
+    class UnsupportedProcess(PidfdProcess):
+        @classmethod
+        def is_supported(cls):
+            return False
+
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *sleep(0, 600),
+        process_class=UnsupportedProcess,
+    )
+    await proc.start()
+    default = WindowsProcess if sys.platform == "win32" else POSIXProcess
+    assert type(proc.proc) is default
+    await proc.kill()
@@ -0,0 +1,85 @@
+import asyncio
+import signal
+import sys
+
+import pytest
+
+from simpervisor.poller import Poller, get_poller
+from simpervisor.process import WindowsProcess
+
+
+async def test_batched_sweep():
+    """
+    All registered processes are polled from a single loop timer
+    """
+    poller = Poller(min_interval=0.01, max_interval=0.05)
+    results = [None] * 50
+    futures = [poller.register(lambda i=i: results[i]) for i in range(50)]
+    assert len(poller) == 50
+
+    await asyncio.sleep(0.1)
+    loop_timers = [
+        h for h in asyncio.get_running_loop()._scheduled if not h.cancelled()
+    ]
+    assert len([h for h in loop_timers if h._callback == poller._sweep]) == 1
+
+    for i in range(50):
+        results[i] = i
+    assert await asyncio.wait_for(asyncio.gather(*futures), 1) == list(range(50))
+    assert len(poller) == 0
+    assert poller._timer is None
+
+
+async def test_adaptive_interval():
+    """
+    Sweeps back off while nothing exits, and speed up on wake()
+    """
+    poller = Poller(min_interval=0.01, max_interval=0.08)
+    future = poller.register(lambda: None)
+    await asyncio.sleep(0.3)
+    assert poller.interval == 0.08
+
+    poller.wake()
+    assert poller.interval == 0.01
+    assert poller._timer.when() <= asyncio.get_running_loop().time() + 0.01
+
+    future.cancel()
+    await asyncio.sleep(0.1)
+    assert len(poller) == 0
+
+
+async def test_poll_exception():
+    """
+    Exceptions raised while polling are passed on to the waiter
+    """
+    poller = Poller()
+
+    def _poll():
+        raise OSError("gone")
+
+    with pytest.raises(OSError):
+        await asyncio.wait_for(poller.register(_poll), 1)
+
+
+async def test_popen_exit_latency():
+    """
+    Popen based processes are noticed exiting quickly after being signalled
+    """
+    procs = [
+        WindowsProcess(sys.executable, "-c", "import time; time.sleep(600)")
+        for _ in range(10)
+    ]
+    for proc in procs:
+        await proc.start()
+    waits = asyncio.gather(*(proc.wait() for proc in procs))
+    # Let the poller back off all the way
+    await asyncio.sleep(1)
+    assert get_poller().interval == get_poller().max_interval
+
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
+    for proc in procs:
+        proc.send_signal(signal.SIGTERM)
+    returncodes = await asyncio.wait_for(waits, 5)
+    assert all(code != 0 for code in returncodes)
+    assert loop.time() - start_time < get_poller().max_interval
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+from simpervisor import WarmPool
+from simpervisor.probes import TCPProbe
+
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(600)"]
+
+
+async def _always_ready(process):
+    return True
+
+
+async def test_acquire_and_refill():
+    """
+    Acquired instances are ready & running, and are replaced in the background
+    """
+    pool = WarmPool("sleeper", *SLEEPER, size=2, ready_func=_always_ready)
+    pool.start()
+    acquired = []
+    try:
+        for _ in range(50):
+            if len(pool) == 2:
+                break
+            await asyncio.sleep(0.1)
+        assert len(pool) == 2
+
+        start_time = time.monotonic()
+        acquired.append(await pool.acquire())
+        assert time.monotonic() - start_time < 0.1
+        assert acquired[0].running
+        assert pool.hits == 1
+
+        acquired.append(await pool.acquire())
+        acquired.append(await pool.acquire())
+        assert len({p.pid for p in acquired}) == 3
+        assert all(p.running for p in acquired)
+        assert pool.misses == 1
+    finally:
+        await pool.close()
+        for process in acquired:
+            await process.terminate()
+    assert len(pool) == 0
+
+
+async def test_port_and_on_acquire():
+    """
+    Each instance gets its own port, and acquire params go to on_acquire
+    """
+    handed_over = {}
+
+    def _on_acquire(process, **params):
+        handed_over[process.name] = params
+
+    httpserver_file = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "child_scripts",
+        "simplehttpserver.py",
+    )
+
+    async def _ready_func(process):
+        return await TCPProbe(process.port)(process)
+
+    pool = WarmPool(
+        "http",
+        sys.executable,
+        httpserver_file,
+        "0",
+        size=2,
+        ready_func=_ready_func,
+        on_acquire=_on_acquire,
+        allocate_port=True,
+    )
+    pool.start()
+    try:
+        first = await pool.acquire(user="alice")
+        second = await pool.acquire(user="bob")
+        assert first.port != second.port
+        assert await _ready_func(first)
+        assert handed_over == {
+            first.name: {"user": "alice"},
+            second.name: {"user": "bob"},
+        }
+    finally:
+        await pool.close()
+        await first.terminate()
+        await second.terminate()
+
+
+async def test_retry_failed_instances():
+    """
+    Instances that don't become ready are stopped & retried
+    """
+    attempts = []
+
+    async def _ready_func(process):
+        attempts.append(process.name)
+        return len(attempts) > 1
+
+    pool = WarmPool(
+        "flaky",
+        *SLEEPER,
+        ready_func=_ready_func,
+        ready_timeout=0.1,
+        retry_delay=0.05,
+    )
+    pool.start()
+    try:
+        process = await asyncio.wait_for(pool.acquire(), 5)
+        assert process.running
+        assert not pool._failures
+    finally:
+        await pool.close()
+        await process.terminate()
+
+
+async def test_retry_failed_spawns():
+    """
+    Instances that can't even be spawned are retried, with backoff
+    """
+    pool = WarmPool("missing", "/does/not/exist", retry_delay=0.05)
+    pool.start()
+    waiter = asyncio.ensure_future(pool.acquire())
+    try:
+        await asyncio.sleep(0.5)
+        assert not waiter.done()
+        assert 2 <= pool._failures <= 5
+    finally:
+        await pool.close()
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(waiter, 5)
+
+
+async def test_close_wakes_acquire():
+    """
+    Closing the pool fails acquire() calls still waiting for an instance
+    """
+
+    async def _never_ready(process):
+        return False
+
+    pool = WarmPool("sleeper", *SLEEPER, ready_func=_never_ready, ready_timeout=600)
+    pool.start()
+    waiter = asyncio.ensure_future(pool.acquire())
+    await asyncio.sleep(0.2)
+    assert not waiter.done()
+
+    await pool.close()
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(waiter, 5)
+    with pytest.raises(RuntimeError):
+        await pool.acquire()
+    assert len(pool) == 0
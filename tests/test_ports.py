@@ -0,0 +1,153 @@
+import asyncio
+import os
+import signal
+import socket
+import sys
+
+import pytest
+
+from simpervisor import SupervisedProcess
+from simpervisor.ports import PortAllocator
+
+FDSERVER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "child_scripts", "fdserver.py"
+)
+
+
+def test_allocate_unique():
+    """
+    Ports are never handed out twice until released
+    """
+    allocator = PortAllocator()
+    ports = [allocator.allocate()[0] for _ in range(20)]
+    assert len(set(ports)) == 20
+    assert len(allocator) == 20
+    assert ports[0] in allocator
+
+    allocator.release(ports[0])
+    assert ports[0] not in allocator
+    assert len(allocator) == 19
+
+
+def test_port_range():
+    """
+    Ports come from port_range, skipping ones in use by anyone
+    """
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        busy_port = busy.getsockname()[1]
+        allocator = PortAllocator(port_range=range(busy_port, busy_port + 3))
+
+        first, _ = allocator.allocate()
+        second, _ = allocator.allocate()
+        assert busy_port not in (first, second)
+        assert {first, second} == {busy_port + 1, busy_port + 2}
+        with pytest.raises(OSError):
+            allocator.allocate()
+
+        allocator.release(first)
+        assert allocator.allocate()[0] == first
+
+
+def test_bind():
+    """
+    Bound sockets are listening on the allocated port
+    """
+    allocator = PortAllocator()
+    port, sock = allocator.allocate(bind=True)
+    with sock:
+        assert sock.getsockname()[1] == port
+        with socket.create_connection(("127.0.0.1", port)):
+            pass
+
+
+async def _read(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = await reader.read()
+    writer.close()
+    return data.decode()
+
+
+async def test_allocate_port():
+    """
+    Allocated ports are passed in $PORT & replace {port}
+    """
+    allocator = PortAllocator()
+    proc = SupervisedProcess(
+        "port",
+        sys.executable,
+        "-c",
+        "import os, sys; sys.exit(0 if sys.argv[1] == os.environ['PORT'] else 1)",
+        "{port}",
+        allocate_port=True,
+        port_allocator=allocator,
+    )
+    await proc.start()
+    port = proc.port
+    assert port in allocator
+    assert await proc.proc.wait() == 0
+    await proc.terminate()
+    assert port not in allocator
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32", reason="Passing sockets isn't supported on Windows"
+)
+async def test_listen_socket():
+    """
+    Processes inherit a listening socket, which is kept across restarts
+    """
+    proc = SupervisedProcess(
+        "fdserver", sys.executable, FDSERVER, always_restart=True, listen_socket=True
+    )
+    await proc.start()
+    try:
+        # Connections are queued by the kernel, so we're ready right away
+        assert await proc.ready()
+        assert proc.ready_probes == 1
+        first_pid = proc.pid
+        assert await _read(proc.port) == f"hello from {first_pid} on {proc.port}"
+
+        proc.proc.send_signal(signal.SIGKILL)
+        for _ in range(50):
+            if proc.running and proc.pid != first_pid:
+                break
+            await asyncio.sleep(0.1)
+        assert await _read(proc.port) == f"hello from {proc.pid} on {proc.port}"
+    finally:
+        await proc.terminate()
+    assert proc._listen_sock is None
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32", reason="Passing sockets isn't supported on Windows"
+)
+async def test_release_after_exit():
+    """
+    Ports & sockets are released once a process exits for good, and taken
+    back if it is started again
+    """
+    allocator = PortAllocator()
+    proc = SupervisedProcess(
+        "exit",
+        *[sys.executable, "-c", "pass"],
+        listen_socket=True,
+        port_allocator=allocator,
+    )
+    await proc.start()
+    port = proc.port
+    assert await proc.proc.wait() == 0
+    for _ in range(50):
+        if proc._listen_sock is None:
+            break
+        await asyncio.sleep(0.1)
+    assert proc._listen_sock is None
+    assert port not in allocator
+
+    await proc.start()
+    assert proc.port == port
+    assert port in allocator
+    assert proc._listen_sock is not None
+    await proc.terminate()
+    assert port not in allocator
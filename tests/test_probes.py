@@ -0,0 +1,194 @@
+import asyncio
+import inspect
+import os
+import sys
+
+import pytest
+
+from simpervisor import OutputCapture, SupervisedProcess
+from simpervisor.probes import FileProbe, HTTPProbe, LineProbe, TCPProbe
+
+httpserver_file = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "child_scripts",
+    "simplehttpserver.py",
+)
+
+
+@pytest.mark.parametrize(
+    "port, probe_class",
+    [
+        ("9006", TCPProbe),
+        ("9007", HTTPProbe),
+    ],
+)
+async def test_network_probes(port, probe_class):
+    """
+    TCP & HTTP probes succeed once the web server is up
+    """
+    env = os.environ.copy()
+    env.update({"PORT": port})
+    probe = probe_class(port)
+
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        httpserver_file,
+        "1",
+        ready_func=probe,
+        ready_timeout=10,
+        env=env,
+    )
+
+    assert not await probe(proc)
+    try:
+        await proc.start()
+        assert await proc.ready()
+        # The probe should keep working after it has succeeded
+        assert await probe(proc)
+        assert await probe(proc)
+    finally:
+        probe.close()
+        await proc.kill()
+
+
+async def test_http_probe_status():
+    """
+    HTTP probe isn't ready when the server responds with an unexpected status
+    """
+    env = os.environ.copy()
+    env.update({"PORT": "9008"})
+
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        httpserver_file,
+        "0",
+        ready_func=TCPProbe(9008),
+        ready_timeout=10,
+        env=env,
+    )
+    probe = HTTPProbe(9008, path="/missing")
+    try:
+        await proc.start()
+        assert await proc.ready()
+        assert not await probe(proc)
+    finally:
+        probe.close()
+        await proc.kill()
+
+
+async def test_file_probe(tmp_path):
+    """
+    File probe is ready once the file exists
+    """
+    path = tmp_path / "ready"
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        "-c",
+        f"import pathlib, time; time.sleep(0.5); pathlib.Path({str(path)!r}).touch(); time.sleep(600)",
+        ready_func=FileProbe(str(path)),
+    )
+    try:
+        await proc.start()
+        assert await proc.ready()
+    finally:
+        await proc.kill()
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32",
+    reason="Reading asyncio subprocess pipes needs the POSIX backend",
+)
+async def test_line_probe():
+    """
+    Line probe is ready as soon as the matching line is printed
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        "-u",
+        "-c",
+        "import time; print('starting'); time.sleep(0.5); print('listening on 8888'); time.sleep(600)",
+        ready_func=LineProbe(r"listening on \d+"),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    try:
+        await proc.start()
+        assert await proc.ready()
+        assert proc.ready_probes == 1
+        assert proc.time_to_ready >= 0.5
+    finally:
+        await proc.kill()
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32",
+    reason="Capturing output isn't supported on Windows",
+)
+async def test_line_probe_after_restart():
+    """
+    A restarted process isn't ready because of its predecessor's output
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        "-u",
+        "-c",
+        "import time; time.sleep(0.5); print('ready now'); time.sleep(600)",
+        ready_func=LineProbe("ready now"),
+        output=OutputCapture(),
+    )
+    try:
+        await proc.start()
+        assert await proc.ready()
+        await proc.stop(restartable=True)
+        await proc.start()
+        assert not proc.ready_func.matched
+        assert await proc.ready()
+        assert proc.time_to_ready >= 0.5
+    finally:
+        await proc.kill()
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32",
+    reason="Reading asyncio subprocess pipes needs the POSIX backend",
+)
+async def test_line_probe_drains_pipe():
+    """
+    Output after the matching line is drained, so the process doesn't block
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        "-u",
+        "-c",
+        "print('ready'); print('x' * 1024 * 1024)",
+        ready_func=LineProbe("ready"),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    await proc.start()
+    assert await proc.ready()
+    assert await asyncio.wait_for(proc.proc.wait(), 5) == 0
+    await proc.stop()
+
+
+async def test_line_probe_without_pipe():
+    """
+    Processes whose output can't be read are refused with a clear error
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        "-c",
+        "import time; time.sleep(600)",
+        ready_func=LineProbe("ready"),
+    )
+    await proc.start()
+    try:
+        with pytest.raises(ValueError):
+            await proc.ready()
+    finally:
+        await proc.kill()
@@ -0,0 +1,113 @@
+import asyncio
+import inspect
+import itertools
+import sys
+import time
+
+import pytest
+
+from simpervisor import (
+    ExponentialBackoff,
+    FixedInterval,
+    JitteredBackoff,
+    SupervisedProcess,
+)
+
+
+def sleep_forever():
+    return [sys.executable, "-c", "import time; time.sleep(600)"]
+
+
+def take(strategy, count):
+    return list(itertools.islice(strategy.intervals(), count))
+
+
+def test_fixed_interval():
+    assert take(FixedInterval(0.5), 3) == [0.5, 0.5, 0.5]
+    assert take(FixedInterval(5, max_interval=2), 2) == [2, 2]
+
+
+def test_exponential_backoff():
+    strategy = ExponentialBackoff(initial=0.25, factor=2, max_interval=1)
+    assert take(strategy, 5) == [0.25, 0.5, 1, 1, 1]
+
+
+def test_jittered_backoff():
+    strategy = JitteredBackoff(initial=1, factor=1, jitter=0.5, max_interval=10)
+    for interval in take(strategy, 50):
+        assert 0.5 <= interval <= 1.5
+
+
+async def test_ready_after_probes():
+    """
+    ready() returns as soon as ready_func succeeds, and records how long it took
+    """
+    calls = 0
+
+    async def _ready_func(p):
+        nonlocal calls
+        calls += 1
+        return calls == 3
+
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *sleep_forever(),
+        ready_func=_ready_func,
+        ready_strategy=FixedInterval(0.05),
+    )
+    await proc.start()
+    try:
+        assert await proc.ready()
+        assert proc.ready_probes == 3
+        assert 0.1 <= proc.time_to_ready < 1
+    finally:
+        await proc.kill()
+
+
+@pytest.mark.parametrize("interval", [0.05, 10])
+async def test_ready_timeout(interval):
+    """
+    ready() gives up at ready_timeout, even if the next interval is longer
+    """
+
+    async def _ready_func(p):
+        return False
+
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *sleep_forever(),
+        ready_func=_ready_func,
+        ready_timeout=0.5,
+        ready_strategy=FixedInterval(interval, max_interval=interval),
+    )
+    await proc.start()
+    try:
+        start_time = time.monotonic()
+        assert not await proc.ready()
+        assert 0.5 <= time.monotonic() - start_time < 1
+        assert proc.time_to_ready is None
+    finally:
+        await proc.kill()
+
+
+async def test_hanging_probe_timeout():
+    """
+    A hanging probe doesn't keep ready() waiting past ready_timeout
+    """
+
+    async def _ready_func(p):
+        await asyncio.sleep(600)
+
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *sleep_forever(),
+        ready_func=_ready_func,
+        ready_timeout=0.5,
+    )
+    await proc.start()
+    try:
+        start_time = time.monotonic()
+        assert not await proc.ready()
+        assert 0.5 <= time.monotonic() - start_time < 1
+    finally:
+        await proc.kill()
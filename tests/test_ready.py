@@ -18,12 +18,11 @@ async def test_ready():
         "simplehttpserver.py",
     )
 
-    port = "9005"
     # We tell our server to wait this many seconds before it starts serving
     ready_time = 3.0
 
     async def _ready_func(p):
-        url = f"http://localhost:{port}"
+        url = f"http://localhost:{p.port}"
         async with aiohttp.ClientSession() as session:
             try:
                 async with session.get(url) as resp:
@@ -33,19 +32,14 @@ async def test_ready():
                 logging.debug("Connection to {} refused", url)
                 return False
 
-    # If env variable is specified to SupervisedProcess, then it needs to be a
-    # copy of OS environment as interpreter related required information is
-    # stored on Windows.
-    env = os.environ.copy()
-    env.update({"PORT": port})
-
     proc = SupervisedProcess(
         "socketserver",
         sys.executable,
         httpserver_file,
         str(ready_time),
         ready_func=_ready_func,
-        env=env,
+        # Pick a free port, passed to the server in $PORT
+        allocate_port=True,
     )
 
     try:
@@ -0,0 +1,103 @@
+import asyncio
+import signal
+import sys
+
+import pytest
+
+from simpervisor import ResourceLimits, SupervisedProcess
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="Resource limits need Linux"
+)
+
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(600)"]
+
+
+def _fake_cgroup_parent(tmp_path, controllers="cpu memory pids"):
+    (tmp_path / "cgroup.controllers").write_text(controllers)
+    (tmp_path / "cgroup.subtree_control").write_text("")
+    return str(tmp_path)
+
+
+async def test_rlimits():
+    """
+    rlimits are set on the child right after it starts
+    """
+    import resource
+
+    proc = SupervisedProcess(
+        "sleeper",
+        *SLEEPER,
+        resources=ResourceLimits(open_files=100, cgroup_parent=None),
+    )
+    await proc.start()
+    try:
+        assert proc.cgroup is None
+        assert resource.prlimit(proc.pid, resource.RLIMIT_NOFILE) == (100, 100)
+        assert proc.cpu_seconds >= 0
+        assert proc.peak_memory > 0
+    finally:
+        await proc.terminate()
+
+
+async def test_cgroup_limits_and_oom(tmp_path):
+    """
+    Each child gets a cgroup with its limits, and OOM kills are reported
+    """
+    parent = _fake_cgroup_parent(tmp_path)
+    exits = []
+    proc = SupervisedProcess(
+        "sleeper",
+        *SLEEPER,
+        resources=ResourceLimits(
+            memory=2**30,
+            cpu_quota=0.5,
+            pids=10,
+            cgroup_parent=parent,
+            restart_on_oom=False,
+        ),
+        on_exit=lambda p, code: exits.append((code, p.exit_reason)),
+    )
+    await proc.start()
+    cgroup = tmp_path / f"sleeper-{proc.pid}"
+    assert proc.cgroup.path == str(cgroup)
+    assert (tmp_path / "cgroup.subtree_control").read_text() == "+cpu +memory +pids"
+    assert (cgroup / "memory.max").read_text() == str(2**30)
+    assert (cgroup / "cpu.max").read_text() == "50000 100000"
+    assert (cgroup / "pids.max").read_text() == "10"
+    assert (cgroup / "cgroup.procs").read_text() == str(proc.pid)
+
+    # Pretend the kernel's OOM killer got it
+    (cgroup / "memory.events").write_text("low 0\nhigh 0\nmax 3\noom 1\noom_kill 1\n")
+    (cgroup / "cpu.stat").write_text("usage_usec 2500000\nuser_usec 2000000\n")
+    (cgroup / "memory.peak").write_text("1234\n")
+    proc.proc.send_signal(signal.SIGKILL)
+    for _ in range(50):
+        if exits:
+            break
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(0.2)
+
+    assert exits == [(-signal.SIGKILL, "oom")]
+    # Not restarted
+    assert not proc.running
+    assert proc.cgroup is None
+    assert proc.metrics.oom_kills == 1
+    assert proc.cpu_seconds == 2.5
+    assert proc.peak_memory == 1234
+
+
+async def test_missing_controllers(tmp_path):
+    """
+    Explicit cgroup parents must have the controllers we need
+    """
+    parent = _fake_cgroup_parent(tmp_path, controllers="cpu")
+    proc = SupervisedProcess(
+        "sleeper",
+        *SLEEPER,
+        resources=ResourceLimits(memory=2**30, cgroup_parent=parent),
+    )
+    with pytest.raises(ValueError):
+        await proc.start()
+    assert not proc.running
+    assert proc.proc.returncode is not None
@@ -0,0 +1,74 @@
+import asyncio
+import inspect
+import sys
+
+from simpervisor import RestartPolicy, SupervisedProcess
+
+
+def crash():
+    return [sys.executable, "-c", "import sys; sys.exit(1)"]
+
+
+def test_backoff():
+    """
+    Delays grow exponentially up to max_delay
+    """
+    policy = RestartPolicy(
+        initial_delay=1, factor=2, max_delay=5, jitter=0, max_restarts=100
+    )
+    assert [policy.next_delay() for _ in range(5)] == [1, 2, 4, 5, 5]
+    assert policy.restart_count == 5
+
+
+def test_jitter():
+    """
+    Jitter keeps delays within the configured fraction
+    """
+    policy = RestartPolicy(initial_delay=1, factor=1, jitter=0.5, max_restarts=100)
+    for _ in range(50):
+        assert 0.5 <= policy.next_delay() <= 1.5
+
+
+def test_reset_after_uptime():
+    """
+    Backoff starts over once a process has stayed up long enough
+    """
+    policy = RestartPolicy(initial_delay=1, jitter=0, reset_after=10)
+    policy.next_delay()
+    policy.next_delay()
+    policy.record_exit(1, uptime=20)
+    assert policy.next_delay() == 1
+    assert list(policy.exit_codes) == [1]
+
+
+def test_trip():
+    """
+    Too many restarts in the window trips the policy until reset
+    """
+    policy = RestartPolicy(max_restarts=2, window=60)
+    assert policy.next_delay() is not None
+    assert policy.next_delay() is not None
+    assert policy.next_delay() is None
+    assert policy.tripped
+    policy.reset()
+    assert policy.next_delay() is not None
+
+
+async def test_crash_loop_trips():
+    """
+    A crash looping process stops being restarted once the policy trips
+    """
+    policy = RestartPolicy(initial_delay=0.01, max_restarts=3, window=60)
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name, *crash(), restart_policy=policy
+    )
+    await proc.start()
+    for _ in range(100):
+        if policy.tripped and not proc.running:
+            break
+        await asyncio.sleep(0.1)
+
+    assert policy.tripped
+    assert not proc.running
+    assert policy.restart_count == 3
+    assert list(policy.exit_codes) == [1] * 4
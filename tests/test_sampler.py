@@ -0,0 +1,95 @@
+import asyncio
+import os
+import signal
+import sys
+
+import pytest
+
+from simpervisor import ResourceSampler, SupervisedProcess
+from simpervisor.sampler import TimeSeries
+
+needs_proc = pytest.mark.skipif(
+    not os.path.exists(f"/proc/{os.getpid()}/stat"), reason="Needs /proc"
+)
+
+
+def test_time_series():
+    """
+    Only the last `size` samples are kept, oldest first
+    """
+    series = TimeSeries(3)
+    assert series.last() is None
+    for i in range(5):
+        series.append(i, i * 10)
+    assert len(series) == 3
+    assert series.last() == 40
+    assert series.query() == [(2, 20), (3, 30), (4, 40)]
+    assert series.query(since=3) == [(3, 30), (4, 40)]
+
+
+@needs_proc
+async def test_sample_processes():
+    """
+    All running processes are sampled, with their files kept open
+    """
+    busy = SupervisedProcess("busy", sys.executable, "-c", "while True: pass")
+    sleeper = SupervisedProcess(
+        "sleeper", sys.executable, "-c", "import time; time.sleep(600)"
+    )
+    sampler = ResourceSampler(interval=0.1, history=5)
+    for process in (busy, sleeper):
+        sampler.add(process)
+        await process.start()
+    sampler.start()
+    try:
+        await asyncio.sleep(1)
+        for process in (busy, sleeper):
+            assert len(process.samples.rss) == 5
+            assert process.samples.rss.last() > 1024 * 1024
+            assert process.samples.fds.last() >= 3
+            assert len(process.samples.query("cpu_percent")) == 5
+        assert busy.samples.cpu_percent.last() > 50
+        assert sleeper.samples.cpu_percent.last() < 50
+
+        fds = dict(sampler._processes[sleeper].fds)
+        await asyncio.sleep(0.3)
+        # Still reading through the same fds
+        assert sampler._processes[sleeper].fds == fds
+    finally:
+        sampler.stop()
+        await busy.terminate()
+        await sleeper.terminate()
+    assert sampler._timer is None
+    assert not sampler._processes
+
+
+@needs_proc
+async def test_restarted_process():
+    """
+    Restarted processes get their new pid's files opened
+    """
+    proc = SupervisedProcess(
+        "sleeper",
+        sys.executable,
+        "-c",
+        "import time; time.sleep(600)",
+        always_restart=True,
+    )
+    sampler = ResourceSampler(interval=0.1, count_fds=False)
+    sampler.add(proc)
+    await proc.start()
+    sampler.sample()
+    first_pid = proc.pid
+    assert sampler._processes[proc].pid == first_pid
+
+    proc.proc.send_signal(signal.SIGKILL)
+    for _ in range(50):
+        if proc.running and proc.pid != first_pid:
+            break
+        await asyncio.sleep(0.1)
+    sampler.sample()
+    assert sampler._processes[proc].pid == proc.pid
+    assert len(proc.samples.rss) == 2
+    assert len(proc.samples.fds) == 0
+    sampler.stop()
+    await proc.terminate()
@@ -1,12 +1,13 @@
 import asyncio
 import inspect
+import logging
 import signal
 import sys
 
 import psutil
 import pytest
 
-from simpervisor import KilledProcessError, SupervisedProcess
+from simpervisor import KilledProcessError, StopResult, SupervisedProcess
 
 SLEEP_TIME = 0.1
 
@@ -145,3 +146,112 @@ async def test_terminate():
     assert proc.returncode == exitcode
     assert not proc.running
     assert not psutil.pid_exists(proc.pid)
+
+
+def ignore_sigterm():
+    """
+    Ignore SIGTERM & sleep forever
+    """
+    return [
+        sys.executable,
+        "-c",
+        "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(600)",
+    ]
+
+
+async def test_stop_graceful():
+    """
+    Processes exiting on their stop signal are stopped gracefully
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name, *sleep(0, 600), always_restart=True
+    )
+
+    await proc.start()
+    assert await proc.stop(grace_period=5) == StopResult.GRACEFUL
+    assert not proc.running
+    assert not psutil.pid_exists(proc.pid)
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32",
+    reason="SIGTERM can't be ignored on Windows",
+)
+async def test_stop_killed():
+    """
+    Processes ignoring their stop signal are killed after the grace period
+    """
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *ignore_sigterm(),
+        stdout=asyncio.subprocess.PIPE,
+    )
+
+    await proc.start()
+    # Make sure the signal handler is set up before we try to stop it
+    await proc.proc.stdout.readline()
+    assert await proc.stop(grace_period=0.5) == StopResult.KILLED
+    assert proc.returncode == -signal.SIGKILL
+    assert not proc.running
+
+
+async def test_stop_already_dead():
+    """
+    Stopping processes that aren't running doesn't raise
+    """
+    proc = SupervisedProcess(inspect.currentframe().f_code.co_name, *sleep(0))
+    assert await proc.stop() == StopResult.ALREADY_DEAD
+
+    await proc.start()
+    await asyncio.sleep(SLEEP_WAIT_TIME)
+    assert await proc.stop() == StopResult.ALREADY_DEAD
+    assert await proc.stop() == StopResult.ALREADY_DEAD
+
+    with pytest.raises(KilledProcessError):
+        await proc.start()
+
+
+async def test_stop_failed_start():
+    """
+    Stopping a process that failed to start doesn't raise
+    """
+    proc = SupervisedProcess(inspect.currentframe().f_code.co_name, "/does/not/exist")
+    with pytest.raises(FileNotFoundError):
+        await proc.start()
+    assert proc.proc is None
+    assert await proc.stop() == StopResult.ALREADY_DEAD
+
+
+@pytest.mark.parametrize("log_compact", [False, True])
+async def test_debug_log(caplog, log_compact):
+    """
+    Debug log records carry the process' metadata
+    """
+    caplog.set_level(logging.DEBUG, logger="simpervisor")
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        *sleep(0, 600),
+        log_compact=log_compact,
+    )
+    await proc.start()
+    await proc.kill()
+
+    record = next(r for r in caplog.records if r.action == "started")
+    assert record.getMessage() == f"Started {proc.name}"
+    assert getattr(record, "proccess-name") == proc.name
+    assert hasattr(record, "process-kwargs") is not log_compact
+
+
+def test_debug_log_disabled(caplog):
+    """
+    Messages aren't even formatted when debug logging is disabled
+    """
+
+    class Message(str):
+        def format(self, *args):
+            raise AssertionError("Message should not be formatted")
+
+    caplog.set_level(logging.INFO, logger="simpervisor")
+    proc = SupervisedProcess("test_debug_log_disabled", *sleep(0))
+    proc._debug_log("test", Message("{}"), {}, "arg")
+    assert not caplog.records
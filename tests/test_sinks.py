@@ -0,0 +1,89 @@
+import asyncio
+import gzip
+import inspect
+import sys
+
+import pytest
+
+from simpervisor import RotatingFileSink, SupervisedProcess
+
+
+async def test_batched_writes(tmp_path):
+    """
+    Output is written once enough is buffered, or the flush interval passes
+    """
+    path = tmp_path / "out.log"
+    sink = RotatingFileSink(str(path), flush_size=10, flush_interval=0.1)
+    sink.write("stdout", b"12345")
+    assert not path.exists()
+    sink.write("stderr", b"67890")
+    assert path.read_bytes() == b"1234567890"
+
+    sink.write("stdout", b"abc")
+    await asyncio.sleep(0.3)
+    assert path.read_bytes() == b"1234567890abc"
+    sink.close()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+async def test_size_rotation(tmp_path, compress):
+    """
+    Files are rotated when they'd grow past max_bytes
+    """
+    path = tmp_path / "out.log"
+    sink = RotatingFileSink(
+        str(path), max_bytes=10, backup_count=2, compress=compress, flush_size=1
+    )
+    for chunk in (b"first\n", b"second\n", b"third\n", b"fourth\n"):
+        sink.write("stdout", chunk)
+    sink.close()
+    await sink.wait_rotated()
+
+    def _read(name):
+        data = (tmp_path / name).read_bytes()
+        return gzip.decompress(data) if compress else data
+
+    suffix = ".gz" if compress else ""
+    assert path.read_bytes() == b"fourth\n"
+    assert _read(f"out.log.1{suffix}") == b"third\n"
+    assert _read(f"out.log.2{suffix}") == b"second\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        ["out.log", f"out.log.1{suffix}", f"out.log.2{suffix}"]
+    )
+
+
+async def test_time_rotation(tmp_path):
+    """
+    Files are rotated when they've been open for rotate_interval
+    """
+    path = tmp_path / "out.log"
+    sink = RotatingFileSink(str(path), rotate_interval=0.1, flush_size=1)
+    sink.write("stdout", b"old\n")
+    await asyncio.sleep(0.2)
+    sink.write("stdout", b"new\n")
+    sink.close()
+    await sink.wait_rotated()
+    assert path.read_bytes() == b"new\n"
+    assert (tmp_path / "out.log.1").read_bytes() == b"old\n"
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32", reason="Capturing output isn't supported on Windows"
+)
+async def test_process_output_sink(tmp_path):
+    """
+    Output of a supervised process ends up in its sink
+    """
+    path = tmp_path / "out.log"
+    proc = SupervisedProcess(
+        inspect.currentframe().f_code.co_name,
+        sys.executable,
+        "-c",
+        "import sys, time; print('hello'); print('oops', file=sys.stderr); sys.stdout.flush(); time.sleep(600)",
+        output_sink=RotatingFileSink(str(path), streams=("stdout",)),
+    )
+    await proc.start()
+    await asyncio.sleep(0.5)
+    await proc.kill()
+    assert path.read_bytes() == b"hello\n"
+    assert proc.output.getvalue("stderr") == b"oops\n"
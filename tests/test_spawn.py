@@ -0,0 +1,132 @@
+import os
+import shutil
+import subprocess
+import sys
+import warnings
+
+import pytest
+
+from simpervisor import EnvTemplate, SupervisedProcess
+from simpervisor.spawn import inheritable_fds
+
+
+def test_env_template():
+    """
+    Templates are snapshots, rendered with extras & placeholders filled in
+    """
+    base = {"A": "1", "URL": "http://localhost:{port}/"}
+    template = EnvTemplate(base, B="2")
+    base["A"] = "changed"
+    assert dict(template) == {"A": "1", "B": "2", "URL": "http://localhost:{port}/"}
+    assert len(template) == 3
+
+    env = template.render({"PORT": "80"}, {"{port}": "80"})
+    assert env == {"A": "1", "B": "2", "URL": "http://localhost:80/", "PORT": "80"}
+    # Rendering doesn't touch the template
+    assert template["URL"] == "http://localhost:{port}/"
+    assert "PORT" not in template
+
+
+def test_env_template_snapshots_environ(monkeypatch):
+    monkeypatch.setenv("SIMPERVISOR_TEST", "before")
+    template = EnvTemplate()
+    monkeypatch.setenv("SIMPERVISOR_TEST", "after")
+    assert template["SIMPERVISOR_TEST"] == "before"
+
+
+@pytest.mark.skipif(inheritable_fds() is None, reason="Can't list fds here")
+def test_inheritable_fds():
+    """
+    Only fds explicitly made inheritable are reported
+    """
+    read_fd, write_fd = os.pipe()
+    try:
+        assert read_fd not in inheritable_fds()
+        os.set_inheritable(read_fd, True)
+        assert read_fd in inheritable_fds()
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+@pytest.mark.skipif(
+    not getattr(subprocess, "_USE_POSIX_SPAWN", False),
+    reason="subprocess doesn't use posix_spawn here",
+)
+async def test_fast_spawn(monkeypatch, tmp_path):
+    """
+    Fast spawns go through posix_spawn, with env & port filled in
+    """
+    spawned = []
+    posix_spawn = subprocess.Popen._posix_spawn
+
+    def _posix_spawn(self, args, executable, *rest):
+        spawned.append(executable)
+        return posix_spawn(self, args, executable, *rest)
+
+    monkeypatch.setattr(subprocess.Popen, "_posix_spawn", _posix_spawn)
+
+    out = tmp_path / "out"
+    proc = SupervisedProcess(
+        "fast",
+        "sh",
+        "-c",
+        f'echo "$PORT $GREETING" > {out}',
+        fast_spawn=True,
+        allocate_port=True,
+        env=EnvTemplate(GREETING="hello {port}"),
+    )
+    await proc.start()
+    assert await proc.proc.wait() == 0
+    await proc.terminate()
+    assert spawned == [shutil.which("sh")]
+    assert out.read_text() == f"{proc.port} hello {proc.port}\n"
+
+
+async def test_fast_spawn_fallback():
+    """
+    Arguments posix_spawn can't handle still work, through fork & exec
+    """
+    proc = SupervisedProcess(
+        "fast",
+        sys.executable,
+        "-c",
+        "import os; assert os.getcwd() == '/'",
+        fast_spawn=True,
+        cwd="/",
+    )
+    await proc.start()
+    assert await proc.proc.wait() == 0
+    await proc.terminate()
+
+
+async def test_fast_spawn_env_path(tmp_path):
+    """
+    Commands are looked up in the PATH of the child's env, like Popen does
+    """
+    out = tmp_path / "out"
+    command = tmp_path / "true"
+    command.write_text(f"#!/bin/sh\necho custom > {out}\n")
+    command.chmod(0o755)
+    proc = SupervisedProcess(
+        "fast", "true", fast_spawn=True, env={"PATH": str(tmp_path)}
+    )
+    await proc.start()
+    assert await proc.proc.wait() == 0
+    await proc.terminate()
+    assert out.read_text() == "custom\n"
+
+
+async def test_fast_spawn_pass_fds():
+    """
+    fds aren't left open with pass_fds, which subprocess would warn about
+    """
+    proc = SupervisedProcess(
+        "fast", sys.executable, "-c", "pass", fast_spawn=True, listen_socket=True
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        await proc.start()
+    assert "close_fds" not in proc._get_proc_kwargs()
+    await proc.proc.wait()
+    await proc.terminate()
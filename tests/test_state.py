@@ -0,0 +1,159 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+
+import pytest
+
+from simpervisor import StateFile, SupervisedProcess
+from simpervisor.process import AdoptedProcess
+from simpervisor.state import process_start_time
+
+pytestmark = pytest.mark.skipif(
+    not AdoptedProcess.is_supported(), reason="Adopting processes isn't supported here"
+)
+
+STATE_SUPERVISOR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "child_scripts", "statesupervisor.py"
+)
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(600)"]
+
+
+def test_state_file(tmp_path):
+    """
+    Records survive reloading, and only match running processes
+    """
+    path = str(tmp_path / "state.json")
+    state = StateFile(path)
+    state.record("me", os.getpid(), ["a", "b"])
+
+    state = StateFile(path)
+    assert state.get("me")["start_time"] == process_start_time(os.getpid())
+    assert state.find_running("me", ["a", "b"]) == os.getpid()
+    # Different command
+    assert state.find_running("me", ["a", "c"]) is None
+    assert state.find_running("someone-else", ["a", "b"]) is None
+
+    # A reused pid has a different start time
+    state._records["me"]["start_time"] -= 1
+    assert state.find_running("me", ["a", "b"]) is None
+
+    state.forget("me")
+    assert StateFile(path).get("me") is None
+
+
+def test_corrupt_state_file(tmp_path):
+    """
+    Unreadable state files are treated as empty
+    """
+    path = tmp_path / "state.json"
+    path.write_text("{not json")
+    assert StateFile(str(path)).get("sleeper") is None
+
+
+async def test_batched_writes(tmp_path):
+    """
+    Changes made on an event loop are written together, a little later
+    """
+    path = str(tmp_path / "state.json")
+    state = StateFile(path, save_delay=0.05)
+    state.record("me", os.getpid(), ["a"])
+    state.record("also-me", os.getpid(), ["b"])
+    state.forget("me")
+    assert not os.path.exists(path)
+    await asyncio.sleep(0.2)
+    assert StateFile(path)._records.keys() == {"also-me"}
+
+    state.forget("also-me")
+    state.flush()
+    assert StateFile(path).get("also-me") is None
+
+
+async def test_adopt_after_supervisor_exits(tmp_path):
+    """
+    Children outlive their supervisor, and are adopted by the next one
+    """
+    path = str(tmp_path / "state.json")
+    supervisor = subprocess.Popen(
+        [sys.executable, STATE_SUPERVISOR, path], stdout=subprocess.PIPE, text=True
+    )
+    pid = int(supervisor.stdout.readline())
+    # Give the signal handlers a bit of time to set up
+    await asyncio.sleep(0.5)
+    supervisor.send_signal(signal.SIGTERM)
+    loop = asyncio.get_running_loop()
+    assert await loop.run_in_executor(None, supervisor.wait, 5) == 0
+    # The child wasn't sent the signal
+    assert process_start_time(pid) is not None
+
+    proc = SupervisedProcess(
+        "sleeper", *SLEEPER, state_file=StateFile(path), notify=True
+    )
+    await proc.start()
+    assert proc.adopted
+    assert proc.pid == pid
+    assert isinstance(proc.proc, AdoptedProcess)
+    # Adopted processes are assumed to be ready already
+    assert await proc.ready()
+
+    await proc.terminate()
+    assert proc.proc.returncode == AdoptedProcess.unknown_returncode
+    assert process_start_time(pid) is None
+    proc.state_file.flush()
+    assert StateFile(path).get("sleeper") is None
+
+
+async def test_restart_adopted(tmp_path):
+    """
+    Adopted processes that exit are restarted as our own children
+    """
+    path = str(tmp_path / "state.json")
+    first = subprocess.Popen(SLEEPER, start_new_session=True)
+    try:
+        state = StateFile(path)
+        state.record("sleeper", first.pid, SLEEPER)
+        state.flush()
+
+        proc = SupervisedProcess("sleeper", *SLEEPER, state_file=StateFile(path))
+        await proc.start()
+        assert proc.adopted
+
+        first.kill()
+        # Reap it, since it is really our child here
+        first.wait()
+        for _ in range(50):
+            if proc.running and proc.pid != first.pid:
+                break
+            await asyncio.sleep(0.1)
+        assert not proc.adopted
+        assert proc.pid != first.pid
+        proc.state_file.flush()
+        assert StateFile(path).get("sleeper")["pid"] == proc.pid
+        await proc.terminate()
+    finally:
+        if first.poll() is None:
+            first.kill()
+            first.wait()
+
+
+async def test_no_adopt_changed_command(tmp_path):
+    """
+    A process started with a different command is left alone
+    """
+    path = str(tmp_path / "state.json")
+    first = subprocess.Popen(SLEEPER)
+    try:
+        state = StateFile(path)
+        state.record("sleeper", first.pid, SLEEPER)
+        state.flush()
+        proc = SupervisedProcess(
+            "sleeper", *SLEEPER, "--changed", state_file=StateFile(path)
+        )
+        await proc.start()
+        assert not proc.adopted
+        assert proc.pid != first.pid
+        await proc.terminate()
+    finally:
+        first.kill()
+        first.wait()
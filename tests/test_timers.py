@@ -0,0 +1,61 @@
+import asyncio
+
+from simpervisor.timers import SharedTimer, get_shared_timer
+
+
+async def test_periodic_and_oneshot():
+    """
+    Periodic callbacks keep running, one shot callbacks run once
+    """
+    timer = SharedTimer(resolution=0.01)
+    calls = {"periodic": 0, "once": 0}
+
+    def _callback(name):
+        calls[name] += 1
+
+    handle = timer.schedule(0.05, lambda: _callback("periodic"))
+    timer.schedule(0.05, lambda: _callback("once"), periodic=False)
+    await asyncio.sleep(0.32)
+    assert 4 <= calls["periodic"] <= 7
+    assert calls["once"] == 1
+
+    handle.cancel()
+    count = calls["periodic"]
+    await asyncio.sleep(0.2)
+    assert calls["periodic"] == count
+    assert len(timer) == 0
+
+
+async def test_single_loop_timer():
+    """
+    Many callbacks share a single event loop timer
+    """
+    timer = get_shared_timer()
+    assert get_shared_timer() is timer
+
+    handles = [timer.schedule(1 + i / 1000, lambda: None) for i in range(100)]
+    loop_timers = [
+        h for h in asyncio.get_running_loop()._scheduled if not h.cancelled()
+    ]
+    assert len([h for h in loop_timers if h._callback == timer._run]) == 1
+    for handle in handles:
+        handle.cancel()
+
+
+async def test_mixed_intervals():
+    """
+    Rescheduling a periodic callback doesn't delay earlier deadlines
+    """
+    timer = SharedTimer(resolution=0.01)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    fired = []
+
+    periodic = timer.schedule(0.3, lambda: None)
+    await asyncio.sleep(0.29)
+    timer.schedule(0.1, lambda: fired.append(loop.time() - start), periodic=False)
+    # Due at ~0.39, after the periodic callback was pushed back to ~0.6
+    await asyncio.sleep(0.4)
+    periodic.cancel()
+    assert len(fired) == 1
+    assert fired[0] < 0.5
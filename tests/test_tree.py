@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from simpervisor import StopResult, SupervisedProcess
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="Process groups aren't supported on Windows"
+)
+
+FORKER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "child_scripts", "forker.py"
+)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # Could be a zombie, if we happen to be its parent
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return True
+
+
+async def _start(tmp_path, mode, **kwargs):
+    pidfile = tmp_path / "grandchild.pid"
+    proc = SupervisedProcess(
+        "forker", sys.executable, FORKER, str(pidfile), mode, kill_tree=True, **kwargs
+    )
+    await proc.start()
+    for _ in range(100):
+        if pidfile.exists() and pidfile.read_text():
+            break
+        await asyncio.sleep(0.05)
+    return proc, int(pidfile.read_text())
+
+
+async def test_terminate_tree(tmp_path):
+    """
+    Grandchildren are terminated along with the child
+    """
+    proc, grandchild = await _start(tmp_path, "sleep")
+    assert _alive(grandchild)
+    assert os.getpgid(grandchild) == proc.pid
+    await proc.terminate()
+    assert not _alive(grandchild)
+
+
+async def test_stop_stubborn_tree(tmp_path):
+    """
+    stop() kills the whole tree if any of it ignores stop_signal
+    """
+    proc, grandchild = await _start(tmp_path, "stubborn")
+    assert await proc.stop(grace_period=0.5) == StopResult.KILLED
+    assert not _alive(grandchild)
+
+
+async def test_child_exits(tmp_path):
+    """
+    Whatever is left when the child exits on its own is killed
+    """
+    exits = []
+    proc, grandchild = await _start(
+        tmp_path, "exit", on_exit=lambda p, code: exits.append(code)
+    )
+    for _ in range(100):
+        if exits:
+            break
+        await asyncio.sleep(0.05)
+    assert exits == [0]
+    assert not _alive(grandchild)